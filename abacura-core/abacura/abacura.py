@@ -5,13 +5,17 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Dict, Optional
 
 import click
+from rich.console import Console
 from textual.app import App
 from textual.binding import Binding
 from textual.screen import Screen
 
 from abacura.config import Config
+from abacura.mud.replay import ReplayReport
 from abacura.mud.session import Session
+from abacura.plugins.session.replay import replay_table
 from abacura.utils import pycharm
+from abacura.utils.lag import LagMonitor
 from abacura.utils.renderables import OutputColors
 from abacura.utils.timer import Timer
 
@@ -25,6 +29,7 @@ class Abacura(App):
     CSS_PATH = ["./css/abacura.css"]
     SCREENS = {}
     START_SESSION: Optional[str] = None
+    REPLAY: Optional[tuple[str, float]] = None
     THEME = "dark"  # Default Textual theme
     COLOR_SYSTEM = "standard"  # Bold makes colors brighter
     
@@ -69,12 +74,19 @@ class Abacura(App):
         # App.BINDINGS = []
         self.sessions: OrderedDict[str, Session] = OrderedDict()
         self.session = "null"
+        threshold = self.config.get_specific_option("global", "lag_threshold_ms", 200)
+        self.lag_monitor: LagMonitor = LagMonitor(threshold=threshold / 1000)
 
     def on_mount(self) -> None:
         """When app is mounted, create first session"""
+        if self.config.get_specific_option("global", "lag_monitor", True):
+            self.lag_monitor.start()
         self.create_session("null")
         if self.START_SESSION:
             self.sessions["null"].connect(self.START_SESSION)
+        elif self.REPLAY:
+            self.create_session("replay")
+            self.sessions["replay"].replay = self.REPLAY
 
     def create_session(self, name: str) -> None:
         """Create a session"""
@@ -109,7 +121,10 @@ class Abacura(App):
 @click.option("-d", "--debug", "debug", type=str)
 @click.option("-s", "--start", "start", type=str)
 @click.option("-i", "--inspector", "inspector", is_flag=True, default=False)
-def main(config, debug, start, inspector):
+@click.option("-r", "--replay", "replay", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", "speed", type=float, default=0, help="Replay speed multiplier, 0 for max speed")
+@click.option("--headless", "headless", is_flag=True, default=False, help="Replay without a screen and exit")
+def main(config, debug, start, inspector, replay, speed, headless):
     if debug:
         host, port = debug.split(":")
         pycharm.PycharmDebugger().connect(host, int(port))
@@ -136,8 +151,16 @@ def main(config, debug, start, inspector):
     app = Abacura(_config, inspector)
 
     Abacura.START_SESSION = start
+    if replay:
+        Abacura.REPLAY = (replay, speed)
 
-    app.run()
+    report = app.run(headless=headless)
+
+    if isinstance(report, ReplayReport):
+        Console().print(replay_table(report))
+
+    if app.return_code:
+        sys.exit(app.return_code)
 
 if getattr(sys, 'frozen', False):
     main(sys.argv[1:])
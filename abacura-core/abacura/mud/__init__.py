@@ -3,7 +3,9 @@ The mud module contains Session objects and protocol handlers
 """
 import re
 import traceback
+from rich.text import Span, Text
 from rich.traceback import Traceback
+from abacura.utils.ansi import tokenize
 from abacura.utils.renderables import AbacuraError, AbacuraWarning, Panel, box
 
 
@@ -11,15 +13,68 @@ ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
 
 class OutputMessage:
+    """
+    A line of output and what is derived from it
+
+    The plain text, style spans and rich Text of a str message are computed together by one
+    pass of the ANSI tokenizer, on first use, and cached until the message is replaced.
+    """
+    __slots__ = ("_message", "_stripped", "_spans", "_text", "gag")
 
     def __init__(self, message: str, gag: bool = False):
-        self.message: str = message
-        if type(message) is str:
-            self.stripped = ansi_escape.sub('', message)
-        else:
-            self.stripped = message
+        self._message = message
+        self._stripped = None if type(message) is str else message
+        self._spans = None
+        self._text = None
         self.gag: bool = gag
 
+    @property
+    def message(self):
+        return self._message
+
+    @message.setter
+    def message(self, message):
+        self._message = message
+        self._stripped = None if type(message) is str else message
+        self._spans = None
+        self._text = None
+
+    def _tokenize(self):
+        self._stripped, self._spans = tokenize(self._message)
+
+    @property
+    def stripped(self):
+        """The message without escape codes"""
+        if self._stripped is None:
+            self._tokenize()
+        return self._stripped
+
+    @property
+    def spans(self) -> list[Span]:
+        """Rich style spans over the stripped text"""
+        if self._spans is None:
+            if type(self._message) is not str:
+                return []
+            self._tokenize()
+        return self._spans
+
+    @property
+    def text(self) -> Text:
+        """Rich Text for a str message, built from the cached tokenization"""
+        if self._text is None:
+            self._text = Text(self.stripped, spans=list(self.spans))
+        return self._text
+
+    def __getstate__(self):
+        return self._message, self.gag
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled before OutputMessage had slots
+            state = state["message"], state.get("gag", False)
+
+        self.__init__(*state)
+
 
 class BaseSession:
     """Base class for all Session objects"""
@@ -0,0 +1,162 @@
+"""
+Socket reads on a dedicated thread
+
+The NetworkThread runs its own asyncio loop that reads the socket, parses telnet, decompresses
+MCCP2 and decodes lines, so a slow screen refresh or plugin on the UI loop does not delay reads.
+Each chunk's decoded events are put on a SimpleQueue and the UI loop is woken to drain
+everything queued so far in one callback.  Writes go the other way through a ThreadSafeTransport.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from queue import SimpleQueue, Empty
+from time import monotonic
+from typing import Callable, Optional
+
+from abacura.mud.telnet import TelnetParser, LineDecoder, LINES
+from abacura.mud.transport import OutboundTransport, ThreadSafeTransport
+
+
+class NetworkThread:
+    """Read, parse and decode a MUD connection on its own thread and event loop"""
+
+    # handoff items handled per drain callback, so a backlog cannot monopolize the UI loop
+    MAX_DRAIN: int = 64
+
+    def __init__(self, name: str, on_events: Callable[[list[tuple], bytes], None],
+                 max_line: int = 0, read_size: int = 65536, max_queue: int = 65536):
+        self.name = name
+        self.on_events = on_events
+        self.read_size = read_size
+        self.max_queue = max_queue
+        self.parser = TelnetParser(max_line)
+        self.line_decoder = LineDecoder()
+
+        # set from the UI loop, raw chunks are only handed over while recording
+        self.record: bool = False
+
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.ui_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.transport: Optional[ThreadSafeTransport] = None
+        self._thread = threading.Thread(target=self._run, name=f"network-{name}", daemon=True)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+        self._queue: SimpleQueue[tuple[float, list[tuple], bytes]] = SimpleQueue()
+        self._drain_scheduled: bool = False
+        self.reset_handoff_stats()
+
+    def reset_handoff_stats(self):
+        self.handoffs: int = 0
+        self.drains: int = 0
+        self.peak_queue_depth: int = 0
+        self.handoff_latency: float = 0
+        self.peak_handoff_latency: float = 0
+        self.last_handoff_latency: float = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        self.ui_loop = asyncio.get_running_loop()
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            # cancelling the read wakes the UI loop coroutine waiting on it
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def stop(self):
+        """Close the socket and end the thread, safe to call more than once"""
+        if self.loop.is_closed():
+            return
+
+        def _stop():
+            if self._writer is not None:
+                self._writer.close()
+            self.loop.stop()
+
+        try:
+            self.loop.call_soon_threadsafe(_stop)
+        except RuntimeError:
+            # loop closed in the meantime
+            pass
+
+    async def connect(self, host: str, port: int):
+        """Open the connection on the network loop, raising the same errors as open_connection"""
+        future = asyncio.run_coroutine_threadsafe(self._connect(host, port), self.loop)
+        await asyncio.wrap_future(future)
+
+    async def _connect(self, host: str, port: int):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self.transport = ThreadSafeTransport(OutboundTransport(self._writer, max_queue=self.max_queue), self.loop)
+
+    async def read(self, poll_timeout: Optional[float] = None) -> str:
+        """Read until the connection ends, returning the reason, poll_timeout flushes partial lines"""
+        future = asyncio.run_coroutine_threadsafe(self._read(poll_timeout), self.loop)
+        return await asyncio.wrap_future(future)
+
+    async def _read(self, poll_timeout: Optional[float]) -> str:
+        parser = self.parser
+        while True:
+            try:
+                if poll_timeout is None or not parser.pending:
+                    data = await self._reader.read(self.read_size)
+                else:
+                    data = await asyncio.wait_for(self._reader.read(self.read_size), timeout=poll_timeout)
+            except BrokenPipeError:
+                return "Lost connection to server."
+            except ConnectionResetError:
+                return "Connection reset by peer."
+            except asyncio.TimeoutError:
+                # must come before OSError, TimeoutError is a subclass of it
+                self._handoff([(LINES, [self.line_decoder.decode_line(parser.flush_line())])], b'')
+                continue
+            except OSError:
+                return "No route to host? OS Error."
+
+            if data == b'':
+                return "Lost connection to server."
+
+            self._handoff(self.line_decoder.decode_events(parser.feed(data)), data if self.record else b'')
+
+    def _handoff(self, events: list[tuple], data: bytes):
+        """Network loop: queue a chunk's events and wake the UI loop if it is not already draining"""
+        self._queue.put((monotonic(), events, data))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.ui_loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        """UI loop: process queued chunks in order"""
+        # cleared before reading the queue, so a chunk put after the last get() schedules another drain
+        self._drain_scheduled = False
+        depth = self._queue.qsize()
+        self.peak_queue_depth = max(self.peak_queue_depth, depth)
+        self.drains += 1
+
+        for _ in range(self.MAX_DRAIN):
+            try:
+                queued_at, events, data = self._queue.get_nowait()
+            except Empty:
+                return
+
+            latency = monotonic() - queued_at
+            self.handoffs += 1
+            self.handoff_latency += latency
+            self.peak_handoff_latency = max(self.peak_handoff_latency, latency)
+            self.last_handoff_latency = latency
+            self.on_events(events, data)
+
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.ui_loop.call_soon(self._drain)
@@ -0,0 +1,31 @@
+"""MCCP2 (COMPRESS2) SUPPORT"""
+from textual import log
+
+from abacura.mud.options import IAC, DO, DONT, TelnetOption
+
+COMPRESS2 = b'\x56'
+
+
+class MCCP2Option(TelnetOption):
+    """Negotiate MCCP2, the TelnetParser does the decompression"""
+    code: int = 86
+    name: str = "MCCP2"
+
+    def __init__(self, writer, enabled: bool = True):
+        self.writer = writer
+        self.enabled = enabled
+        self.negotiations = 0
+
+    def will(self) -> None:
+        """IAC WILL handler, the server may offer compression again after a stream ends"""
+        if self.enabled:
+            self.writer.write(IAC + DO + COMPRESS2)
+            self.negotiations += 1
+            log.debug("IAC DO COMPRESS2")
+        else:
+            self.writer.write(IAC + DONT + COMPRESS2)
+
+    def refuse(self) -> None:
+        """Stop compression after a corrupt stream"""
+        self.enabled = False
+        self.writer.write(IAC + DONT + COMPRESS2)
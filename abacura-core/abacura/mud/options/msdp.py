@@ -23,7 +23,7 @@ ansi_escape = re.compile(r'\x1b(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 class MSDPMessage(AbacuraMessage):
     """
     MSDP event message
-    :param event_type: defaults to core.msdp
+    :param event_type: core.msdp.<VARIABLE>
     :param subtype: specific MSDP variable changed
     :param value: the new value of the MSDP variable
     :param oldvalue: the original value of the MSDP variable
@@ -170,11 +170,8 @@ class MSDP(TelnetOption):
             # Write into the output log for debugging timing issues
             self.session.outputlog(OutputMessage(f"!MSDP_{var}={value.decode()}"))
 
-            # Two dispatchs here, first is for all-value listeners
-            msg = MSDPMessage(subtype=var, value=self.values[var], oldvalue=oldvalue)
-            self.session.dispatch(msg)
-            # Second dispatch for variable-specific listeners
-            msg.event_type = f"core.msdp.{var}"
+            # reaches core.msdp.<VAR> listeners and the core.msdp.* listeners for every variable
+            msg = MSDPMessage(event_type=f"core.msdp.{var}", subtype=var, value=self.values[var], oldvalue=oldvalue)
             self.session.dispatch(msg)
 
         else:
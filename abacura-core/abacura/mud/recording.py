@@ -0,0 +1,77 @@
+"""
+Recordings of the raw inbound socket stream
+
+A recording is a gzip compressed file starting with a magic header, followed by one record per
+socket read: the seconds since the recording started (float64), the chunk length (uint32) and
+the bytes exactly as they came off the socket, before telnet parsing or MCCP2 decompression.
+"""
+from __future__ import annotations
+
+import gzip
+import struct
+from pathlib import Path
+from time import monotonic
+from typing import Iterator, BinaryIO
+
+MAGIC = b"ABACREC1"
+_RECORD = struct.Struct("<dI")
+
+
+class RecordingError(Exception):
+    pass
+
+
+class SessionRecorder:
+    """Write timestamped socket reads to a recording file"""
+
+    def __init__(self, filename: str | Path):
+        self.filename = Path(filename).expanduser()
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        self._file: BinaryIO = gzip.open(self.filename, "wb", compresslevel=6)
+        self._file.write(MAGIC)
+        self.start_time = monotonic()
+        self.chunks: int = 0
+        self.bytes_recorded: int = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def record(self, data: bytes):
+        self._file.write(_RECORD.pack(monotonic() - self.start_time, len(data)))
+        self._file.write(data)
+        self.chunks += 1
+        self.bytes_recorded += len(data)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_recording(filename: str | Path) -> Iterator[tuple[float, bytes]]:
+    """Yield (seconds since start, chunk) for each socket read in a recording"""
+    with gzip.open(Path(filename).expanduser(), "rb") as f:
+        try:
+            magic = f.read(len(MAGIC))
+        except (OSError, EOFError):
+            magic = b''
+
+        if magic != MAGIC:
+            raise RecordingError(f"{filename} is not an abacura recording")
+
+        while True:
+            try:
+                header = f.read(_RECORD.size)
+                if not header:
+                    return
+
+                offset, length = _RECORD.unpack(header)
+                data = f.read(length)
+            except (EOFError, struct.error):
+                # a session that exited without closing the recording, replay what we have
+                return
+
+            if len(data) < length:
+                return
+
+            yield offset, data
@@ -0,0 +1,167 @@
+"""
+Replay a recording through a session to measure the inbound pipeline
+
+The recorded socket reads are fed through the TelnetPlugin parser and event handlers exactly as
+if they came off the socket, at recorded speed, N times recorded speed, or as fast as possible.
+Each stage of the pipeline is timed by temporarily wrapping it on the live objects.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable
+
+from abacura.mud.recording import read_recording
+from abacura.mud.telnet import LINE, PROMPT
+
+if TYPE_CHECKING:
+    from abacura.mud.session import Session
+    from abacura.plugins.telnet import TelnetPlugin
+
+
+@dataclass(slots=True)
+class StageStats:
+    stage: str
+    calls: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class ReplayReport:
+    filename: str
+    speed: float
+    chunks: int = 0
+    bytes: int = 0
+    lines: int = 0
+    elapsed: float = 0.0
+    stages: dict[str, StageStats] = field(default_factory=dict)
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.elapsed if self.elapsed else 0.0
+
+    def stage_rows(self) -> list[tuple]:
+        """Rows of stage, calls, total seconds, microseconds per call, percent of elapsed"""
+        rows = []
+        for st in self.stages.values():
+            per_call = st.elapsed / st.calls * 1e6 if st.calls else 0.0
+            pct = st.elapsed / self.elapsed * 100 if self.elapsed else 0.0
+            rows.append((st.stage, st.calls, st.elapsed, per_call, pct))
+        return rows
+
+    def summary(self) -> str:
+        return (f"{self.lines:,} lines, {self.bytes:,} bytes in {self.elapsed:.3f}s "
+                f"({self.lines_per_second:,.0f} lines/sec)")
+
+
+class StageTimer:
+    """Wrap callables on live objects to accumulate their call counts and elapsed time"""
+
+    def __init__(self):
+        self.stats: dict[str, StageStats] = {}
+        self._patched: list[tuple[object, str, Callable | None]] = []
+
+    def wrap(self, obj: object, attr: str, stage: str):
+        original = getattr(obj, attr)
+        stats = self.stats.setdefault(stage, StageStats(stage))
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.elapsed += perf_counter() - start
+
+        # remember if this was an instance attribute so restore() puts it back, otherwise delete it
+        self._patched.append((obj, attr, obj.__dict__.get(attr, None)))
+        setattr(obj, attr, timed)
+
+    def restore(self):
+        for obj, attr, original in reversed(self._patched):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._patched = []
+
+
+class ReplayTransport:
+    """Stand in for the OutboundTransport, replies to the recorded server go nowhere"""
+
+    def __init__(self):
+        self.writes: int = 0
+        self.bytes_written: int = 0
+
+    def write(self, data: bytes):
+        self.writes += 1
+        self.bytes_written += len(data)
+
+
+class ReplayDriver:
+    """Feed a recording into a session"""
+
+    def __init__(self, session: Session, telnet: TelnetPlugin, filename: str | Path, speed: float = 0):
+        self.session = session
+        self.telnet = telnet
+        self.filename = Path(filename).expanduser()
+        self.speed = speed
+        self.stage_timer = StageTimer()
+
+    def _instrument(self):
+        session = self.session
+        wrap = self.stage_timer.wrap
+        wrap(self.telnet, "handle_events", "TelnetPlugin.handle_events")
+        wrap(self.telnet, "output", "Session.output")
+        wrap(session.director.action_manager, "process_output", "ActionManager.process_output")
+        wrap(session.core_msdp, "sb", "MSDP.sb")
+        wrap(session, "dispatch", "Session.dispatch")
+        wrap(self.telnet, "dispatch", "TelnetPlugin.dispatch")
+        wrap(session, "outputlog", "Session.outputlog")
+        if session.batch_output:
+            wrap(session.tl, "flush", "SessionRichLog.flush")
+
+    async def run(self) -> ReplayReport:
+        report = ReplayReport(filename=str(self.filename), speed=self.speed)
+        parse_stats = StageStats("TelnetParser.feed")
+
+        saved_transport = self.session.transport
+        self.session.transport = ReplayTransport()
+        self.telnet.reset_parser()
+        self.telnet.register_options([self.session.core_msdp])
+        self._instrument()
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            for offset, data in read_recording(self.filename):
+                if self.speed > 0:
+                    delay = start + offset / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                t0 = perf_counter()
+                events = self.telnet.parser.feed(data)
+                parse_stats.calls += 1
+                parse_stats.elapsed += perf_counter() - t0
+
+                report.chunks += 1
+                report.bytes += len(data)
+                report.lines += sum(1 for e in events if e[0] == LINE or e[0] == PROMPT)
+
+                self.telnet.handle_events(self.telnet.line_decoder.decode_events(events))
+
+                # let the screen refresh between chunks
+                await asyncio.sleep(0)
+
+            if self.session.batch_output:
+                self.session.tl.flush()
+        finally:
+            report.elapsed = loop.time() - start
+            self.stage_timer.restore()
+            self.session.transport = saved_transport
+
+        report.stages = {parse_stats.stage: parse_stats, **self.stage_timer.stats}
+        return report
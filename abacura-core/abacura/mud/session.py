@@ -20,11 +20,12 @@ from abacura.config import Config
 from abacura.mud import BaseSession, OutputMessage
 from abacura.mud.logger import AbacuraLogger
 from abacura.mud.options.msdp import MSDP
+from abacura.mud.transport import OutboundTransport, OutboundQueueFull
 from abacura.plugins import command, ContextProvider, CommandError, CommandArgumentError
 from abacura.plugins.director import Director
 from abacura.plugins.loader import PluginLoader
 from abacura.plugins.task_queue import TaskManager
-from abacura.screens import SessionScreen
+from abacura.screens import SessionScreen, SessionRichLog
 from abacura.utils.fifo_buffer import FIFOBuffer
 from abacura.utils.ring_buffer import RingBufferLogSql
 from abacura.utils.renderables import AbacuraPanel, tabulate
@@ -62,8 +63,10 @@ class Session(BaseSession):
         self.name = name
         self.host: Optional[str] = None
         self.port: Optional[int] = None
+        self.replay: Optional[tuple[str, float]] = None
         self.writer: Optional[asyncio.StreamWriter] = None
-        self.tl: Optional[RichLog] = None
+        self.transport: Optional[OutboundTransport] = None
+        self.tl: Optional[SessionRichLog] = None
         self.debugtl: Optional[RichLog] = None
         self.output_history: FIFOBuffer = FIFOBuffer(1000)
 
@@ -75,8 +78,19 @@ class Session(BaseSession):
 
         self.writer = None
         self.connected = False
+        self.batch_output: bool = self.config.get_specific_option(self.name, "output_batching", False)
         self.command_char = self.config.get_specific_option(self.name, "command_char", "#")
 
+        # consecutive lines that are the same, after removing fold_pattern, are shown as one line
+        self.fold_repeats: bool = self.config.get_specific_option(self.name, "fold_repeats", False)
+        fold_pattern = self.config.get_specific_option(self.name, "fold_pattern", "")
+        self.fold_re: Optional[re.Pattern] = re.compile(fold_pattern) if fold_pattern else None
+        self._fold_key: Optional[str] = None
+        self._fold_count: int = 0
+        # the ring log row of the line a run of repeats folds into, None if it was not logged
+        self._fold_row: Optional[int] = None
+        self.folded_lines: int = 0
+
         self.speedwalk_re = re.compile(speedwalk_pattern)
         self.speedwalk_step_re = re.compile(speedwalk_step_pattern)
 
@@ -114,7 +128,6 @@ class Session(BaseSession):
         self.screen = screen_class(name, self)
         self.abacura.install_screen(self.screen, name=name)
         self.abacura.push_screen(name)
-        self.screen.set_interval(interval=0.01, callback=self.director.ticker_manager.process_tick, name="tickers")
 
     # TODO: This doesn't launch a screen anymore, it loads plugins
     def launch_screen(self):
@@ -146,6 +159,8 @@ class Session(BaseSession):
                 telnet_client(self.host, self.port, handlers=[self.core_msdp]),
                 name=f"socket-{self.name}", group=self.name,
                 description=f"Mud connection for {self.name} ({self.host}:{self.port})")
+        elif self.replay:
+            self.plugin_loader.plugins["Replay"].start_replay(*self.replay)
         else:
             log(f"Session: {self.name} created in disconnected state due to no host or port")
 
@@ -210,26 +225,32 @@ class Session(BaseSession):
 
     # TODO raw can come out now that we isinstance
     def send(self, msg: Union[str, bytes], raw: bool = False, echo_color: str = "orange1") -> None:
-        """Send to writer (socket)"""
-        if self.writer is not None:
+        """Send to transport (socket)"""
+        if self.transport is not None:
             try:
                 if isinstance(msg, str):
-                    self.writer.write(bytes(msg + "\n", "UTF-8"))
+                    self.transport.write(bytes(msg + "\n", "UTF-8"))
                 elif isinstance(msg, bytes):
-                    self.writer.write(msg)
+                    self.transport.write(msg)
 
                 self.last_socket_write = time.monotonic()
 
                 if echo_color:
                     self.echo_command(msg.rstrip("\n"), echo_color)
 
-            except BrokenPipeError:
+            except OutboundQueueFull as exc:
+                self.show_error(f"{exc}, command not sent", title="Send Error")
+            except (BrokenPipeError, ConnectionError):
                 self.connected = False
                 self.show_error("Lost connection to server.")
         else:
             self.output(f"[bold red]# NO-SESSION SEND: {msg}", markup=True, highlight=True)
 
     def echo_command(self, cmd, color="white"):
+        self.end_fold()
+        if self.tl and self.tl.pending:
+            self.tl.flush()
+
         if not self.tl or len(self.tl.lines) < 2:
             return
 
@@ -274,10 +295,10 @@ class Session(BaseSession):
                 self.debugtl.write(f"{date_time} \[{facility}]")
                 self.debugtl.write(msg)
 
-    def outputlog(self, message: OutputMessage):
-        """Write to long-term logger and short-term ring buffer"""
+    def outputlog(self, message: OutputMessage) -> Optional[int]:
+        """Write to long-term logger and short-term ring buffer, return the ring number logged to"""
         self.logger.info(message.message)
-        self.ring_buffer.log(message)
+        return self.ring_buffer.log(message)
 
     def output(self, msg,
                markup: bool = False, highlight: bool = False, ansi: bool = False, actionable: bool = True,
@@ -291,25 +312,40 @@ class Session(BaseSession):
         message = OutputMessage(msg, gag)
         self.output_history.append(message)
 
-        if actionable:
+        if actionable and self.director:
+            # gags and substitutions first, so actions see the line as it will be shown
+            self.director.substitute_manager.process_output(message)
 
-            if self.director and self.director.action_manager:
+            if self.director.action_manager:
                 self.director.action_manager.process_output(message)
 
         if not message.gag:
 
+            if self.fold_repeats and self.fold(message, actionable and loggable, markup, highlight, ansi):
+                return
+
+            if self.batch_output:
+                self.tl.queue(self.renderable(message, markup, highlight, ansi))
+                if loggable:
+                    self._fold_row = self.outputlog(message)
+                return
+
+            if self.tl.pending:
+                # a folded line is waiting to be rewritten
+                self.tl.flush()
+
             self.tl.markup = markup
             self.tl.highlight = highlight
 
             scroll_end = self.tl.viewing_end()
 
             if ansi:
-                self.tl.write(Text.from_ansi(message.message))
+                self.tl.write(message.text)
             else:
                 self.tl.write(message.message)
 
             if loggable:
-                self.outputlog(message)
+                self._fold_row = self.outputlog(message)
 
             self.tl.markup = False
             self.tl.highlight = False
@@ -317,6 +353,53 @@ class Session(BaseSession):
             if scroll_end:
                 self.tl.scroll_end(animate=False)
 
+    def end_fold(self):
+        """Stop folding into the last line, noting the repeats in the long-term log"""
+        if self._fold_count > 1:
+            self.logger.info(f"last message repeated {self._fold_count - 1} times")
+        self._fold_key = None
+        self._fold_count = 0
+        self._fold_row = None
+
+    def fold(self, message: OutputMessage, foldable: bool, markup: bool, highlight: bool, ansi: bool) -> bool:
+        """
+        Fold a line into the line before it when they are the same, return True if it was folded
+
+        The last line is rewritten with a repeat count at the next frame and its ring log row is
+        updated, so a flood of repeats costs one render and no new rows.  Actions have already run.
+        """
+        if not foldable or not isinstance(message.message, str):
+            self.end_fold()
+            return False
+
+        key = message.stripped if self.fold_re is None else self.fold_re.sub("", message.stripped)
+        if key != self._fold_key:
+            self.end_fold()
+            self._fold_key = key
+            self._fold_count = 1
+            return False
+
+        self._fold_count += 1
+        self.folded_lines += 1
+        text = self.renderable(message, markup, highlight, ansi).copy()
+        text.append(f" (x{self._fold_count})", style="dim")
+        self.tl.replace_last(text)
+        if self._fold_row is not None:
+            # by row, other lines such as MSDP may have been logged since
+            self.ring_buffer.log_repeat(message, self._fold_count, self._fold_row)
+        return True
+
+    def renderable(self, message: OutputMessage, markup: bool, highlight: bool, ansi: bool):
+        """Apply markup and highlighting now, so a queued line renders the same when it is flushed"""
+        if ansi:
+            return message.text
+
+        if not isinstance(message.message, str):
+            return message.message
+
+        text = Text.from_markup(message.message) if markup else Text(message.message)
+        return self.tl.highlighter(text) if highlight else text
+
     @command
     def connect(self, name: str, host: str = '', port: int = 0) -> None:
         """
@@ -0,0 +1,304 @@
+"""
+Incremental telnet protocol parser
+
+The parser is fed whatever chunk of bytes the socket returns and keeps its state between
+calls, so IAC, SB and GA sequences may be split across chunk boundaries.  Each call to
+feed() returns the events completed by that chunk, in stream order:
+
+    (LINE, bytes)                   a complete line, without the trailing newline
+    (PROMPT, bytes)                 text preceding IAC GA
+    (COMMAND, verb, option)         IAC WILL/WONT/DO/DONT <option>
+    (SUBNEGOTIATION, bytes)         IAC SB <option> ... IAC SE, starting with the option byte
+    (COMPRESSION, bool)             MCCP2 compression started (True) or ended (False)
+
+MCCP2 is handled inside the parser: everything after IAC SB COMPRESS2 IAC SE is run through a
+streaming zlib decompressor until the compressed stream ends, after which parsing continues
+on the plain bytes that follow it.
+
+Lines longer than max_line bytes are cut into several LINE events, on a UTF-8 character
+boundary, so a server that never sends a newline cannot grow the line buffer without bound.
+LineDecoder.decode_events() turns the LINE and PROMPT payloads into text:
+
+    (LINES, list[str])              a run of consecutive lines, decoded together
+    (PROMPT, str)                   the decoded prompt
+"""
+from __future__ import annotations
+
+import codecs
+import zlib
+
+LINE = 0
+PROMPT = 1
+COMMAND = 2
+SUBNEGOTIATION = 3
+COMPRESSION = 4
+LINES = 5
+
+COMPRESS2 = 86
+_COMPRESS2_SB = bytes([COMPRESS2])
+
+_IAC = 255
+_DONT = 254
+_DO = 253
+_WONT = 252
+_WILL = 251
+_SB = 250
+_GA = 249
+_SE = 240
+
+_NEGOTIATION_VERBS = frozenset((_WILL, _WONT, _DO, _DONT))
+
+# CR and TAB are ASCII and never part of a multibyte character, so they are replaced before decoding,
+# bytes.translate is a table lookup where str.translate falls back to a slow path for non-ASCII text
+_CR_TO_SPACE = bytes.maketrans(b"\r", b" ")
+
+# parser states
+_DATA = 0
+_IAC_SEEN = 1
+_NEGOTIATE = 2
+_SB_DATA = 3
+_SB_IAC = 4
+
+
+class TelnetParser:
+    """Resumable telnet state machine that emits lines, prompts and option traffic in bulk"""
+
+    def __init__(self, max_line: int = 0):
+        self.max_line: int = max_line
+        self.lines_split: int = 0
+        self._state: int = _DATA
+        self._verb: int = 0
+        self._line = bytearray()
+        self._sb = bytearray()
+        self._decompressor = None
+        self.compression_error: str = ''
+        self.bytes_received: int = 0
+        self.compressed_bytes: int = 0
+        self.decompressed_bytes: int = 0
+
+    @property
+    def compressing(self) -> bool:
+        """True while the server is sending an MCCP2 compressed stream"""
+        return self._decompressor is not None
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.decompressed_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.decompressed_bytes - self.compressed_bytes
+
+    @property
+    def pending(self) -> bool:
+        """True if a partial line is waiting for more data"""
+        return len(self._line) > 0
+
+    def flush_line(self) -> bytes:
+        """Return and clear the partial line, used for MUDs that send prompts without GA"""
+        line = bytes(self._line)
+        self._line.clear()
+        return line
+
+    def feed(self, data: bytes) -> list[tuple]:
+        """Parse a chunk of the stream and return the events it completed"""
+        self.bytes_received += len(data)
+        events = []
+
+        while data:
+            if self._decompressor is None:
+                data = self._parse(data, events)
+                continue
+
+            try:
+                plain = self._decompressor.decompress(data)
+            except zlib.error as exc:
+                # the rest of the stream is unreadable, the caller should refuse compression
+                self.compression_error = str(exc)
+                self._decompressor = None
+                events.append((COMPRESSION, False))
+                break
+
+            self.compressed_bytes += len(data)
+            data = b''
+            if self._decompressor.eof:
+                # end of the compressed stream, whatever follows it is plain telnet again
+                data = self._decompressor.unused_data
+                self.compressed_bytes -= len(data)
+                self._decompressor = None
+
+            self.decompressed_bytes += len(plain)
+            self._parse(plain, events)
+            if self._decompressor is None:
+                events.append((COMPRESSION, False))
+
+        return events
+
+    def _split_line(self, events: list[tuple]):
+        """Emit max_line sized pieces of the line buffer until no more than max_line bytes remain"""
+        line = self._line
+        shortest = max(1, self.max_line - 3)
+        while len(line) > self.max_line:
+            cut = self.max_line
+            # back up to the lead byte of a multibyte character, at most 3 continuation bytes
+            while cut > shortest and line[cut] & 0xC0 == 0x80:
+                cut -= 1
+            events.append((LINE, bytes(line[:cut])))
+            del line[:cut]
+            self.lines_split += 1
+
+    def _parse(self, data: bytes, events: list[tuple]) -> bytes:
+        """
+        Parse plain telnet data, appending to events
+
+        Returns any bytes that follow the start of an MCCP2 compressed stream
+        """
+        line = self._line
+        state = self._state
+        i = 0
+        n = len(data)
+
+        while i < n:
+            if state == _DATA:
+                iac = data.find(_IAC, i)
+                end = n if iac < 0 else iac
+
+                nl = data.find(b'\n', i, end)
+                while nl >= 0:
+                    line += data[i:nl]
+                    if self.max_line and len(line) > self.max_line:
+                        self._split_line(events)
+                    events.append((LINE, bytes(line)))
+                    line.clear()
+                    i = nl + 1
+                    nl = data.find(b'\n', i, end)
+
+                line += data[i:end]
+                i = end
+                if self.max_line and len(line) > self.max_line:
+                    self._split_line(events)
+                if iac >= 0:
+                    state = _IAC_SEEN
+                    i += 1
+
+            elif state == _IAC_SEEN:
+                c = data[i]
+                i += 1
+                if c == _IAC:
+                    # escaped 0xff in the data stream
+                    line.append(_IAC)
+                    state = _DATA
+                elif c in _NEGOTIATION_VERBS:
+                    self._verb = c
+                    state = _NEGOTIATE
+                elif c == _SB:
+                    self._sb.clear()
+                    state = _SB_DATA
+                elif c == _GA:
+                    events.append((PROMPT, bytes(line)))
+                    line.clear()
+                    state = _DATA
+                else:
+                    # NOP, and other commands we have no use for
+                    state = _DATA
+
+            elif state == _NEGOTIATE:
+                events.append((COMMAND, self._verb, data[i]))
+                i += 1
+                state = _DATA
+
+            elif state == _SB_DATA:
+                iac = data.find(_IAC, i)
+                if iac < 0:
+                    self._sb += data[i:]
+                    i = n
+                else:
+                    self._sb += data[i:iac]
+                    i = iac + 1
+                    state = _SB_IAC
+
+            else:  # _SB_IAC
+                c = data[i]
+                i += 1
+                if c == _SE:
+                    state = _DATA
+                    if self._sb == _COMPRESS2_SB and self._decompressor is None:
+                        self._sb.clear()
+                        self._decompressor = zlib.decompressobj()
+                        events.append((COMPRESSION, True))
+                        break
+
+                    events.append((SUBNEGOTIATION, bytes(self._sb)))
+                    self._sb.clear()
+                elif c == _IAC:
+                    self._sb.append(_IAC)
+                    state = _SB_DATA
+                else:
+                    # malformed, keep the bytes and carry on looking for IAC SE
+                    self._sb.append(_IAC)
+                    self._sb.append(c)
+                    state = _SB_DATA
+
+        self._state = state
+        return data[i:]
+
+
+def _translate(data: bytes) -> bytes:
+    """Replace CR with a space and expand TAB to 8 spaces (not to the next tab stop)"""
+    data = data.translate(_CR_TO_SPACE)
+    if b"\t" in data:
+        data = data.replace(b"\t", b"        ")
+    return data
+
+
+class LineDecoder:
+    """
+    Incremental UTF-8 decoding of LINE and PROMPT payloads
+
+    A character split across a flushed partial line or a prompt is completed by the next
+    payload instead of being dropped.  A run of lines is translated and decoded in one call.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("UTF-8")(errors="ignore")
+
+    def decode(self, data: bytes) -> str:
+        """Decode a prompt, carrying an incomplete trailing character over"""
+        return self._decoder.decode(data)
+
+    def decode_line(self, data: bytes) -> str:
+        """Decode a partial line flushed without a newline"""
+        return self._decoder.decode(_translate(data))
+
+    def decode_lines(self, lines: list[bytes]) -> list[str]:
+        """Decode complete lines, returning one str per line"""
+        if not lines:
+            return []
+
+        # lines end on a newline, so nothing can be left pending in the decoder afterwards
+        text = self._decoder.decode(_translate(b"\n".join(lines) + b"\n"))
+        return text.split("\n")[:-1]
+
+    def decode_events(self, events: list[tuple]) -> list[tuple]:
+        """Replace LINE events with (LINES, list[str]) for each run of lines and decode PROMPT events"""
+        decoded = []
+        lines: list[bytes] = []
+        for evt in events:
+            kind = evt[0]
+            if kind == LINE:
+                lines.append(evt[1])
+                continue
+
+            if lines:
+                decoded.append((LINES, self.decode_lines(lines)))
+                lines = []
+
+            if kind == PROMPT:
+                decoded.append((PROMPT, self.decode(evt[1])))
+            else:
+                decoded.append(evt)
+
+        if lines:
+            decoded.append((LINES, self.decode_lines(lines)))
+
+        return decoded
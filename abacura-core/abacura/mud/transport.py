@@ -0,0 +1,146 @@
+"""
+Outbound transport between Session.send and the socket StreamWriter
+
+Everything written during one event loop tick is coalesced into a single write, the amount of
+unsent data is bounded, and the StreamWriter is drained in a background task so a stalled
+socket applies backpressure instead of buffering without limit.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Optional, TYPE_CHECKING
+
+from textual import log
+
+if TYPE_CHECKING:
+    from asyncio import StreamWriter
+
+
+class OutboundQueueFull(Exception):
+    pass
+
+
+class OutboundTransport:
+    """Write-coalescing, backpressure-aware wrapper around a StreamWriter"""
+
+    RATE_WINDOW: float = 5.0
+
+    def __init__(self, writer: StreamWriter, max_queue: int = 65536):
+        self.writer = writer
+        self.max_queue = max_queue
+        self.error: Optional[Exception] = None
+
+        self._pending = bytearray()
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._drain_task: Optional[asyncio.Task] = None
+        self._recent: deque[tuple[float, int]] = deque()
+
+        self.writes: int = 0
+        self.flushes: int = 0
+        self.drains: int = 0
+        self.bytes_written: int = 0
+        self.peak_queue_depth: int = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Bytes accepted but not yet handed to the socket"""
+        transport = self.writer.transport
+        buffered = transport.get_write_buffer_size() if transport is not None else 0
+        return len(self._pending) + buffered
+
+    @property
+    def bytes_per_second(self) -> float:
+        cutoff = monotonic() - self.RATE_WINDOW
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return sum(n for _, n in self._recent) / self.RATE_WINDOW
+
+    @property
+    def draining(self) -> bool:
+        return self._drain_task is not None
+
+    def write(self, data: bytes):
+        """Queue data to go out at the end of this event loop tick"""
+        if self.error is not None:
+            raise ConnectionError(f"Outbound transport failed: {self.error!r}")
+
+        depth = self.queue_depth + len(data)
+        if depth > self.max_queue:
+            raise OutboundQueueFull(f"Outbound queue full ({self.queue_depth} bytes waiting)")
+
+        self._pending += data
+        self.writes += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, depth)
+
+        if self._flush_handle is None and self._drain_task is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._pending or self._drain_task is not None:
+            return
+
+        data = bytes(self._pending)
+        self._pending.clear()
+        self.writer.write(data)
+
+        self.flushes += 1
+        self.bytes_written += len(data)
+        self._recent.append((monotonic(), len(data)))
+
+        # Only wait on the socket when it did not take everything right away
+        if self.writer.transport is not None and self.writer.transport.get_write_buffer_size():
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            self.drains += 1
+            await self.writer.drain()
+        except (ConnectionError, OSError) as exc:
+            log.warning(f"Outbound transport drain failed: {exc!r}")
+            self.error = exc
+            self._pending.clear()
+            return
+        finally:
+            self._drain_task = None
+
+        # anything queued while we waited goes out now
+        self._flush()
+
+
+class ThreadSafeTransport:
+    """
+    Writes to an OutboundTransport owned by the network thread's event loop
+
+    The queue limit is checked here so Session.send can still report a full queue, the write
+    itself is scheduled on the network loop.  Statistics are read from the wrapped transport.
+    """
+
+    def __init__(self, transport: OutboundTransport, loop: asyncio.AbstractEventLoop):
+        self.transport = transport
+        self.loop = loop
+
+    def __getattr__(self, name: str):
+        return getattr(self.transport, name)
+
+    def write(self, data: bytes):
+        transport = self.transport
+        if transport.error is not None:
+            raise ConnectionError(f"Outbound transport failed: {transport.error!r}")
+
+        if transport.queue_depth + len(data) > transport.max_queue:
+            raise OutboundQueueFull(f"Outbound queue full ({transport.queue_depth} bytes waiting)")
+
+        try:
+            self.loop.call_soon_threadsafe(self._write, data)
+        except RuntimeError as exc:
+            # the network loop has been closed
+            raise ConnectionError("Network thread has stopped") from exc
+
+    def _write(self, data: bytes):
+        try:
+            self.transport.write(data)
+        except (OutboundQueueFull, ConnectionError) as exc:
+            log.warning(f"Outbound write dropped on network thread: {exc!r}")
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable, Dict
+from typing import TYPE_CHECKING, Callable, Dict, Optional
 
 from abacura.plugins.actions import Action
 from abacura.plugins.director import Director
 from abacura.plugins.tickers import Ticker
+from abacura.plugins.substitutes import Substitute
 from abacura.plugins.commands import CommandError, CommandArgumentError
 from abacura.plugins.task_queue import TaskManager
 from abacura.utils.fifo_buffer import FIFOBuffer
@@ -54,8 +55,10 @@ class Plugin:
         doc = getattr(self, '__doc__', None)
         return doc
 
-    def add_action(self, pattern: str, callback_fn: Callable, flags: int = 0, name: str = '', color: bool = False):
-        act = Action(source=self, pattern=pattern, callback=callback_fn, flags=flags, name=name, color=color)
+    def add_action(self, pattern: str, callback_fn: Callable, flags: int = 0, name: str = '', color: bool = False,
+                   priority: int = 0):
+        act = Action(source=self, pattern=pattern, callback=callback_fn, flags=flags, name=name, color=color,
+                     priority=priority)
         self.director.action_manager.add(act)
 
     def remove_action(self, name: str):
@@ -68,11 +71,22 @@ class Plugin:
     def remove_ticker(self, name: str):
         self.director.ticker_manager.remove(name)
 
-    def add_substitute(self, pattern: str, repl: str, name: str = ''):
-        pass
+    def add_substitute(self, pattern: str, repl: Optional[str], name: str = '', flags: int = 0, color: bool = False,
+                       priority: int = 0):
+        """Rewrite matching output lines with re.sub before actions see them, a repl of None gags the line"""
+        sub = Substitute(source=self, pattern=pattern, repl=repl, name=name, flags=flags, color=color,
+                         priority=priority)
+        self.director.substitute_manager.add(sub)
+
+    def add_gag(self, pattern: str, name: str = '', flags: int = 0, color: bool = False):
+        self.add_substitute(pattern, None, name=name, flags=flags, color=color)
 
     def remove_substitute(self, name: str):
-        pass
+        self.director.substitute_manager.remove(name)
+
+    def defer_event(self, event_type: str, merge: Optional[Callable] = None, hz: float = 0):
+        """Coalesce dispatches of an event type and deliver them once per frame, or at most hz times a second"""
+        self.director.event_manager.defer(event_type, merge=merge, hz=hz, source=self)
 
     def send(self, message: str, raw: bool = False, echo_color: str = 'orange1'):
         self.session.send(message, raw=raw, echo_color=echo_color)
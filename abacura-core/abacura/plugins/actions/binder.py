@@ -0,0 +1,87 @@
+"""
+Argument binders for action callbacks
+
+When an action is created its callback's parameters are turned into a small generated function
+that builds the argument tuple straight from match.groups(), so a match does not walk the
+parameter types again.  For example a callback
+
+    def hit(self, attacker: str, damage: int, msg: OutputMessage)
+
+gets the binder
+
+    def bind(match, message):
+        g = match.groups()
+        return (str(g[0]), to_int(g[1]), message)
+"""
+from __future__ import annotations
+
+import inspect
+from typing import TYPE_CHECKING, Callable, Match
+
+from abacura.mud import OutputMessage
+
+if TYPE_CHECKING:
+    from abacura.plugins.actions import Action
+
+Binder = Callable[[Match, OutputMessage], tuple]
+
+MATCH_TYPES = (Match, 'Match')
+MESSAGE_TYPES = (OutputMessage, 'OutputMessage')
+
+
+def _converter(action: Action, convert: type) -> Callable:
+    """Convert a group with int or float, counting failures on the action and returning 0"""
+    default = convert(0)
+
+    def to_number(value):
+        try:
+            return convert(value)
+        except (ValueError, TypeError):
+            action.conversion_failures += 1
+            return default
+
+    return to_number
+
+
+def make_binder(action: Action) -> Binder:
+    """Generate the function that maps a match to the callback's positional arguments"""
+    expected = action.expected_match_groups
+    if action.compiled_re.groups < expected:
+        def bind_error(match: Match, _message: OutputMessage) -> tuple:
+            from abacura.plugins.actions import ActionError
+            g = list(match.groups())
+            raise ActionError(f"Incorrect # of match groups.  Expected {expected}, got {g}")
+
+        return bind_error
+
+    namespace = {}
+    args = []
+    group = 0
+    for arg_type in action.parameter_types:
+        if arg_type in MATCH_TYPES:
+            args.append("match")
+            continue
+
+        if arg_type in MESSAGE_TYPES:
+            args.append("message")
+            continue
+
+        value = f"g[{group}]"
+        group += 1
+        if arg_type is int or arg_type is float:
+            name = f"to_{arg_type.__name__}"
+            namespace.setdefault(name, _converter(action, arg_type))
+            value = f"{name}({value})"
+        elif callable(arg_type) and arg_type is not inspect.Parameter.empty:
+            name = f"convert_{group}"
+            namespace[name] = arg_type
+            value = f"{name}({value})"
+        args.append(value)
+
+    lines = ["def bind(match, message):"]
+    if group:
+        lines.append("    g = match.groups()")
+    lines.append(f"    return ({', '.join(args)}{',' if len(args) == 1 else ''})")
+
+    exec("\n".join(lines), namespace)
+    return namespace["bind"]
@@ -0,0 +1,143 @@
+"""
+Trigger engine that finds the few actions a line can possibly match
+
+Every action is filed once, under the cheapest test that must pass before its regex can match:
+
+    anchor      the literal text after ^, looked up by the first 1-3 characters of the line,
+                unless the pattern has a longer literal elsewhere
+    gram        a required literal of 3+ characters, looked up by the 3 character substrings
+                of the line, so the cost of a line does not grow with the number of actions
+    short       a required literal of 1-2 characters, tested with `in`
+    always      nothing is known, the regex always runs
+
+Actions are kept in separate views for color and stripped text, and for IGNORECASE patterns,
+which are indexed and looked up in lower case.  Adding or removing an action only touches its
+own bucket.  Ordering the candidates is left to the ActionRegistry.
+"""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from abacura.plugins.actions import Action
+
+GRAM = 3
+
+
+class _View:
+    """The actions that search one kind of text: color or stripped, case sensitive or not"""
+
+    def __init__(self):
+        self.anchors: dict[str, list[Action]] = {}
+        self.grams: dict[str, list[Action]] = {}
+        self.short: list[Action] = []
+        self.always: list[Action] = []
+        self.gram_count: int = 0
+
+    def __bool__(self):
+        return bool(self.anchors or self.grams or self.short or self.always)
+
+    def choose_gram(self, literal: str) -> str:
+        """Use the 3 characters of the literal shared with the fewest actions already indexed"""
+        grams = [literal[i:i + GRAM] for i in range(len(literal) - GRAM + 1)]
+        return min(grams, key=lambda g: len(self.grams.get(g, ())))
+
+    def candidates(self, text: str, found: list[Action]):
+        anchors = self.anchors
+        if anchors:
+            for n in range(1, min(GRAM, len(text)) + 1):
+                for act in anchors.get(text[:n], ()):
+                    if text.startswith(act.trigger_key):
+                        found.append(act)
+
+        if self.gram_count:
+            grams = self.grams
+            if self.gram_count * 2 < len(text):
+                # few literals, testing each one is cheaper than slicing the line
+                for bucket in grams.values():
+                    for act in bucket:
+                        if act.trigger_key in text:
+                            found.append(act)
+            else:
+                for g in grams.keys() & {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}:
+                    for act in grams[g]:
+                        if act.trigger_key in text:
+                            found.append(act)
+
+        for act in self.short:
+            if act.trigger_key in text:
+                found.append(act)
+
+        found.extend(self.always)
+
+
+class TriggerEngine:
+    """Index of actions, or substitutions, by anchored prefix and required literal"""
+
+    def __init__(self):
+        # (color, ignorecase) -> view
+        self.views: dict[tuple[bool, bool], _View] = {}
+        self._placement: dict[Action, tuple[_View, str, Optional[str]]] = {}
+
+    def __len__(self):
+        return len(self._placement)
+
+    def add(self, action: Action):
+        if action in self._placement:
+            self.remove(action)
+
+        # compiled flags include inline flags like (?i)
+        ignorecase = bool(action.compiled_re.flags & re.IGNORECASE)
+        view = self.views.setdefault((action.color, ignorecase), _View())
+
+        prefix, literal = action.prefix, action.literal
+        if ignorecase:
+            prefix, literal = prefix.lower(), literal.lower()
+
+        # a longer literal elsewhere in the pattern is more selective than a short prefix
+        if prefix and (len(prefix) >= len(literal) or len(literal) < GRAM):
+            action.trigger_key = prefix
+            key = prefix[:GRAM]
+            view.anchors.setdefault(key, []).append(action)
+            self._placement[action] = (view, "anchors", key)
+        elif len(literal) >= GRAM:
+            action.trigger_key = literal
+            key = view.choose_gram(literal)
+            view.grams.setdefault(key, []).append(action)
+            view.gram_count += 1
+            self._placement[action] = (view, "grams", key)
+        elif literal:
+            action.trigger_key = literal
+            view.short.append(action)
+            self._placement[action] = (view, "short", None)
+        else:
+            action.trigger_key = ''
+            view.always.append(action)
+            self._placement[action] = (view, "always", None)
+
+    def remove(self, action: Action):
+        placement = self._placement.pop(action, None)
+        if placement is None:
+            return
+
+        view, bucket, key = placement
+        if key is None:
+            getattr(view, bucket).remove(action)
+            return
+
+        index: dict[str, list[Action]] = getattr(view, bucket)
+        index[key].remove(action)
+        if not index[key]:
+            del index[key]
+        if bucket == "grams":
+            view.gram_count -= 1
+
+    def candidates(self, color_text: str, stripped_text: str) -> list[Action]:
+        """Actions whose regex may match the line, in no particular order"""
+        found: list[Action] = []
+        for (color, ignorecase), view in self.views.items():
+            if view:
+                text = color_text if color else stripped_text
+                view.candidates(text.lower() if ignorecase else text, found)
+        return found
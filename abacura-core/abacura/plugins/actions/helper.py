@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from time import perf_counter
 from typing import TYPE_CHECKING, Callable
 from rich.table import Table
 from rich.markup import escape
@@ -16,22 +17,48 @@ class ActionCommand(Plugin):
     """Provides action-related commands and debugging tools"""
     def show_actions(self):
         rows = []
-        for action in self.director.action_manager.actions.queue:
+        for action in self.director.action_manager.actions:
             callback_name = getattr(action.callback, "__qualname__", str(action.callback))
             source = action.source.__class__.__name__ if action.source else ""
 
-            rows.append((repr(action.pattern), callback_name, action.priority, action.flags))
+            rows.append((repr(action.pattern), callback_name, action.priority, action.flags, repr(action.trigger_key)))
 
-        tbl = tabulate(rows, headers=["Pattern", "Callback", "Priority", "Flags"],
+        tbl = tabulate(rows, headers=["Pattern", "Callback", "Priority", "Flags", "Prefilter"],
                        caption=f" {len(rows)} actions registered")
         self.output(AbacuraPanel(tbl, title="Registered Actions"))
 
+    def analyze_actions(self):
+        """Report the actions the trigger engine cannot prefilter, with their cost on recent output"""
+        messages = [m for m in self.output_history[-500:] if isinstance(m.message, str)]
+        rows = []
+        for (color, _ignorecase), view in self.director.action_manager.actions.engine.views.items():
+            for act in view.always:
+                texts = [m.message if color else m.stripped for m in messages]
+                start = perf_counter()
+                for text in texts:
+                    act.compiled_re.search(text)
+                cost = (perf_counter() - start) / len(texts) * 1e6 if texts else 0
+                callback_name = getattr(act.callback, "__qualname__", str(act.callback))
+                rows.append((repr(act.pattern), callback_name, "color" if color else "stripped", cost))
+
+        rows.sort(key=lambda row: row[3], reverse=True)
+        total = sum(row[3] for row in rows)
+        tbl = tabulate(rows, headers=["Pattern", "Callback", "Text", "μs/line"], float_format="9.2f",
+                       caption=f" {len(rows)} actions without a required literal or anchor,"
+                               f" {total:.2f}μs per line over the last {len(messages)} lines")
+        self.output(AbacuraPanel(tbl, title="Actions Without a Prefilter"))
+
     @command
-    def action(self):
+    def action(self, analyze: bool = False):
         """
         View actions
 
+        :param analyze: Show actions that run on every line and what they cost
         """
+        if analyze:
+            self.analyze_actions()
+            return
+
         self.show_actions()
 
     @command()
@@ -45,10 +72,8 @@ class ActionCommand(Plugin):
         # Get key metrics
         lines_processed = Timer.timers.get("lines_processed", 0)
         action_total = Timer.timers.get("action_processing_total", 0)
-        prep_time = Timer.timers.get("action_preparation", 0)
         # No longer measuring regex/callback time individually to reduce overhead
         total_checks = Timer.timers.get("total_action_checks", 0)
-        total_quick_checks = Timer.timers.get("total_quick_checks", 0)
         total_regex_checks = Timer.timers.get("total_regex_checks", 0)
         total_matches = Timer.timers.get("total_matches", 0)
         
@@ -65,7 +90,6 @@ class ActionCommand(Plugin):
             stats.append(f"\n--- PERFORMANCE METRICS ---")
             stats.append(f"Lines processed: {lines_processed}")
             stats.append(f"Total action checks: {total_checks}")
-            stats.append(f"Quick checks performed: {total_quick_checks}")
             stats.append(f"Regex checks performed: {total_regex_checks}")
             stats.append(f"Total matches: {total_matches}")
             stats.append(f"Actions per line: {total_checks/lines_processed:.1f}")
@@ -77,34 +101,28 @@ class ActionCommand(Plugin):
             
             stats.append(f"\n--- TIME PER LINE ---")
             stats.append(f"Action processing per line: {(action_total/lines_processed*1000):.3f}ms")
-            stats.append(f"Action preparation per line: {(prep_time/lines_processed*1000):.3f}ms")
-            
-            # Calculate the actual processing work time (preparation + estimated regex/callback)
-            work_time = prep_time
-            overhead_time = action_total - work_time
-            stats.append(f"Hot loop time per line: {(overhead_time/lines_processed*1000):.3f}ms")
-            stats.append(f"Hot loop percentage: {(overhead_time/action_total*100):.1f}%")
-            
+
             # Efficiency metrics
             if total_regex_checks > 0:
                 stats.append(f"\n--- EFFICIENCY METRICS ---")
-                stats.append(f"Time per regex operation: {(overhead_time/total_regex_checks*1000000):.1f}μs")
-                stats.append(f"Operations per millisecond: {(total_regex_checks/(overhead_time*1000)):.0f}")
-        
-        # Show some quick check examples for debugging
-        stats.append(f"\n--- QUICK CHECK EXAMPLES ---")
-        try:
-            action_list = list(self.director.action_manager.actions.queue)[:10]
-            for i, action in enumerate(action_list):
-                pattern_short = action.pattern[:50] if len(action.pattern) > 50 else action.pattern
-                stats.append(f"{pattern_short:<50} → '{action.quick_check}'")
-            
-            # Show stats about quick check effectiveness
-            with_checks = sum(1 for a in self.director.action_manager.actions.queue if a.quick_check)
-            total_actions = len(list(self.director.action_manager.actions.queue))
-            stats.append(f"\nActions with quick checks: {with_checks}/{total_actions} ({with_checks/total_actions*100:.1f}%)")
-        except Exception as e:
-            stats.append(f"DEBUG ERROR: {e}")
+                stats.append(f"Time per regex operation: {(action_total/total_regex_checks*1000000):.1f}μs")
+                stats.append(f"Operations per millisecond: {(total_regex_checks/(action_total*1000)):.0f}")
+
+        failed = [a for a in self.director.action_manager.actions if a.conversion_failures]
+        if failed:
+            stats.append(f"\n--- CONVERSION FAILURES ---")
+            for act in failed:
+                callback_name = getattr(act.callback, "__qualname__", str(act.callback))
+                stats.append(f"{callback_name}: {act.conversion_failures} groups passed as 0 ({act.pattern!r})")
+
+        # Show how the trigger engine filed the actions
+        stats.append(f"\n--- TRIGGER ENGINE ---")
+        engine = self.director.action_manager.actions.engine
+        for (color, ignorecase), view in engine.views.items():
+            text = ("color" if color else "stripped") + (", ignorecase" if ignorecase else "")
+            stats.append(f"{text:<22} anchored: {sum(len(b) for b in view.anchors.values())}"
+                         f"  literal: {view.gram_count}  short literal: {len(view.short)}"
+                         f"  always: {len(view.always)}")
         
         self.output("\n".join(stats))
 
@@ -113,4 +131,6 @@ class ActionCommand(Plugin):
         """Reset action processing timing statistics"""
         from abacura.utils.timer import Timer
         Timer.timers.clear()
+        for act in self.director.action_manager.actions:
+            act.conversion_failures = 0
         self.output("Action timing statistics reset.")
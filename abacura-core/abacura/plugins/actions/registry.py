@@ -0,0 +1,104 @@
+"""
+Registry of the actions for a session
+
+Actions are ranked by priority, lowest first, then by the order they were added.  They are
+indexed by name and by source so removing one does not scan the others, and the TriggerEngine
+is kept up to date alongside.
+
+Lines are matched against an immutable snapshot.  Adding or removing an action only drops the
+cached snapshot, so a callback can change the actions while a line is being processed and the
+rest of that line still sees the actions it started with.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from abacura.plugins.actions.engine import TriggerEngine
+
+if TYPE_CHECKING:
+    from abacura.plugins.actions import Action
+
+
+class ActionRegistry:
+    """Priority ordered actions, indexed by name and source"""
+
+    def __init__(self):
+        self.engine: TriggerEngine = TriggerEngine()
+        self._rank: dict[Action, tuple[int, int]] = {}
+        # dicts rather than sets, to keep registration order
+        self._by_name: dict[str, dict[Action, None]] = {}
+        # by id, sources need not be hashable, and each action holds its source so the id is not reused
+        self._by_source: dict[int, dict[Action, None]] = {}
+        self._sequence: int = 0
+        self._snapshot: Optional[tuple[Action, ...]] = None
+        self._position: dict[Action, int] = {}
+
+    def __len__(self):
+        return len(self._rank)
+
+    def __iter__(self) -> Iterator[Action]:
+        return iter(self.snapshot)
+
+    def __contains__(self, action: Action):
+        return action in self._rank
+
+    @property
+    def snapshot(self) -> tuple[Action, ...]:
+        """All actions in the order they are tried, rebuilt only after a change"""
+        if self._snapshot is None:
+            self._rebuild()
+        return self._snapshot
+
+    def _rebuild(self):
+        self._snapshot = tuple(sorted(self._rank, key=self._rank.__getitem__))
+        self._position = {act: n for n, act in enumerate(self._snapshot)}
+
+    def add(self, action: Action):
+        if action in self._rank:
+            self.remove(action)
+
+        self._sequence += 1
+        self._rank[action] = (action.priority, self._sequence)
+        if action.name:
+            self._by_name.setdefault(action.name, {})[action] = None
+        self._by_source.setdefault(id(action.source), {})[action] = None
+        self.engine.add(action)
+        self._snapshot = None
+
+    def remove(self, action: Action):
+        if self._rank.pop(action, None) is None:
+            return
+
+        for index, key in ((self._by_name, action.name), (self._by_source, id(action.source))):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(action, None)
+                if not bucket:
+                    del index[key]
+
+        self.engine.remove(action)
+        self._snapshot = None
+
+    def named(self, name: str) -> list[Action]:
+        return list(self._by_name.get(name, ()))
+
+    def from_source(self, source: object) -> list[Action]:
+        return list(self._by_source.get(id(source), ()))
+
+    def remove_name(self, name: str):
+        for act in self.named(name):
+            self.remove(act)
+
+    def remove_source(self, source: object):
+        for act in self.from_source(source):
+            self.remove(act)
+
+    def candidates(self, color_text: str, stripped_text: str) -> list[Action]:
+        """Actions whose regex may match the line, in the order they are tried"""
+        if self._snapshot is None:
+            self._rebuild()
+
+        found = self.engine.candidates(color_text, stripped_text)
+        if len(found) > 1:
+            found.sort(key=self._position.__getitem__)
+        return found
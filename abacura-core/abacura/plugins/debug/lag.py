@@ -0,0 +1,88 @@
+import traceback
+
+from rich.text import Text
+from textual.css.query import NoMatches
+
+from abacura.plugins import Plugin, command, CommandError
+from abacura.utils.lag import LAG_BUCKETS
+from abacura.utils.renderables import tabulate, AbacuraPanel, AbacuraPropertyGroup, Group
+from abacura.widgets.footer import AbacuraFooter
+
+
+class LagCommand(Plugin):
+    """Event loop lag and stalls"""
+
+    def toggle_footer(self):
+        footers = []
+        for session in self.session.abacura.sessions.values():
+            try:
+                footers.append(session.screen.query_one(AbacuraFooter))
+            except NoMatches:
+                continue
+
+        enabled = not any(f.lag_enabled for f in footers)
+        for footer in footers:
+            footer.show_lag(enabled)
+        self.output(f"[bold cyan]# LAG: footer {'on' if enabled else 'off'}", markup=True)
+
+    def show_stall(self, n: int):
+        stalls = list(self.session.abacura.lag_monitor.stalls)
+        if not 0 < n <= len(stalls):
+            raise CommandError(f"There are {len(stalls)} stalls")
+
+        stall = stalls[-n]
+        lines = "".join(traceback.format_list(stall.stack))
+        self.output(AbacuraPanel(Text(lines.rstrip()), title=f"Stall {n}: {stall.duration * 1000:.0f}ms"))
+
+    @command
+    def lag(self, footer: bool = False, reset: bool = False, _stall: int = 0):
+        """
+        Show event loop lag percentiles, the lag histogram and what stalled the loop
+
+        :param footer: Toggle the current lag in the footer
+        :param reset: Clear the lag history
+        :param _stall: Show the main thread stack taken during this stall, 1 is the most recent
+        """
+        monitor = self.session.abacura.lag_monitor
+        if footer:
+            if not monitor.running:
+                raise CommandError("The lag monitor is off, set lag_monitor = true in the global config")
+            self.toggle_footer()
+            return
+
+        if reset:
+            monitor.reset()
+            self.output("[bold cyan]# LAG: history cleared", markup=True)
+            return
+
+        if _stall:
+            self.show_stall(_stall)
+            return
+
+        if not monitor.running:
+            raise CommandError("The lag monitor is off, set lag_monitor = true in the global config")
+
+        p50, p90, p99, p999 = monitor.percentiles(50, 90, 99, 99.9)
+        properties = {"Samples": len(monitor.samples),
+                      "Current": f"{monitor.current * 1000:.1f}ms",
+                      "p50 / p90": f"{p50 * 1000:.1f}ms / {p90 * 1000:.1f}ms",
+                      "p99 / p99.9": f"{p99 * 1000:.1f}ms / {p999 * 1000:.1f}ms",
+                      "Max": f"{monitor.max_lag * 1000:.1f}ms",
+                      "Stall Threshold": f"{monitor.threshold * 1000:.0f}ms",
+                      "Stalls": len(monitor.stalls)}
+
+        total = sum(monitor.histogram) or 1
+        rows = []
+        lower = 0
+        for upper, count in zip(LAG_BUCKETS, monitor.histogram):
+            if count:
+                label = f"{lower}-{upper}ms" if upper != float("inf") else f"{lower}ms+"
+                rows.append((label, count, "#" * max(1, round(40 * count / total))))
+            lower = upper
+        histogram = tabulate(rows, headers=["Lag", "Samples", ""], title="Histogram")
+
+        offenders = [(name, stalls, total * 1000, worst * 1000) for name, stalls, total, worst in monitor.offenders()]
+        worst = tabulate(offenders[:10], headers=["Where", "Stalls", "Total ms", "Worst ms"], float_format="8.0f",
+                         title="Worst Offenders", caption=" #lag --stall=1 shows the stack of the last stall")
+
+        self.output(AbacuraPanel(Group(AbacuraPropertyGroup(properties, "Event Loop"), histogram, worst), title="#lag"))
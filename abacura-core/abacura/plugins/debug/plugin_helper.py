@@ -71,7 +71,7 @@ class PluginHelper(Plugin):
 
         rows = []
         for r in registrations:
-            rows.append((r.registration_type, r.name, r.callback.__qualname__, r.details))
+            rows.append((r.registration_type, r.name, getattr(r.callback, "__qualname__", ""), r.details))
 
         tbl = tabulate(rows, headers=["Type", "Name", "Callback", "Details"], title=f"Registered Callbacks")
 
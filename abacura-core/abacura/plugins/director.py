@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, List, Callable
+from typing import TYPE_CHECKING, List, Callable, Optional
 
 from abacura.plugins.actions import ActionManager
 from abacura.plugins.aliases.manager import AliasManager
 from abacura.plugins.commands import CommandManager
 from abacura.plugins.events import EventManager
+from abacura.plugins.substitutes import SubstituteManager
 from abacura.plugins.tickers import TickerManager
 
 if TYPE_CHECKING:
@@ -17,7 +18,7 @@ if TYPE_CHECKING:
 class Registration:
     registration_type: str
     name: str
-    callback: Callable
+    callback: Optional[Callable]
     details: str
 
 
@@ -29,6 +30,7 @@ class Director:
         self.ticker_manager: TickerManager = TickerManager()
         self.alias_manager: AliasManager = AliasManager(session)
         self.event_manager: EventManager = EventManager()
+        self.substitute_manager: SubstituteManager = SubstituteManager()
 
     def register_object(self, obj: object):
         if getattr(obj, "register_actions", True):
@@ -43,13 +45,18 @@ class Director:
         self.ticker_manager.unregister_object(obj)
         self.command_manager.unregister_object(obj)
         self.event_manager.unregister_object(obj)
+        self.substitute_manager.unregister_object(obj)
 
     def get_registrations_for_object(self, obj: object) -> List:
         registrations: List[Registration] = []
 
-        for act in self.action_manager.actions.queue:
-            if act.source == obj:
-                registrations.append(Registration("action", act.name, act.callback, act.pattern))
+        for act in self.action_manager.actions.from_source(obj):
+            registrations.append(Registration("action", act.name, act.callback, act.pattern))
+
+        for sub in self.substitute_manager.substitutes:
+            if sub.source == obj:
+                detail = f"{sub.pattern!r} gagged" if sub.gag else f"{sub.pattern!r} -> {sub.repl!r}"
+                registrations.append(Registration("substitute", sub.name, None, detail))
 
         for tkr in self.ticker_manager.tickers:
             if tkr.source == obj:
@@ -61,8 +68,8 @@ class Director:
                 registrations.append(Registration("command", cmd.name, cmd.callback, cmd.get_description()))
 
         # Create lookup of members
-        for trigger, pq in self.event_manager.events.items():
-            for et in pq.queue:
+        for trigger, tasks in self.event_manager.events.items():
+            for et in tasks:
                 if et.source == obj:
                     registrations.append(Registration("event", et.trigger, et.handler, f"priority={et.priority}"))
 
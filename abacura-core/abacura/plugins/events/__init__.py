@@ -1,8 +1,8 @@
 """Common stuff for mud.events module"""
+import asyncio
 import inspect
 from dataclasses import dataclass, field
-from queue import PriorityQueue
-from typing import Dict, Callable
+from typing import Dict, Callable, Optional
 from collections import Counter
 
 from textual import log
@@ -16,7 +16,7 @@ class AbacuraMessage:
 
 @dataclass(order=True)
 class EventTask:
-    """Task for the event PriorityQueue"""
+    """A listener registered with the EventManager"""
     priority: int
     source: object = field(compare=False)
     handler: Callable = field(compare=False)
@@ -24,7 +24,12 @@ class EventTask:
 
 
 def event(trigger: str = '', priority: int = 5):
-    """Decorator for event functions"""
+    """
+    Decorator for event functions
+
+    A trigger ending in .* listens to every event below it, "core.msdp.*" receives the
+    "core.msdp.<VARIABLE>" event for each MSDP variable.  A trigger of * listens to everything.
+    """
     def add_event(fn):
         fn.event_trigger = trigger
         fn.event_priority = priority
@@ -34,13 +39,58 @@ def event(trigger: str = '', priority: int = 5):
     return add_event
 
 
+@dataclass
+class DeferPolicy:
+    """How dispatches of a deferred event type are coalesced, see EventManager.defer"""
+    merge: Optional[Callable[[AbacuraMessage, AbacuraMessage], AbacuraMessage]] = None
+    hz: float = 0
+    # the plugin that asked for it, the policy goes when it is unregistered
+    source: object = None
+    dispatched: int = 0
+    delivered: int = 0
+    last_delivery: float = 0
+
+    @property
+    def saved(self) -> int:
+        return self.dispatched - self.delivered
+
+    @property
+    def description(self) -> str:
+        coalesce = "merge" if self.merge else "latest wins"
+        return f"{coalesce}, {self.hz:g} Hz" if self.hz else f"{coalesce}, per frame"
+
+
+# topics that are no longer dispatched, and the wildcard their listeners now get instead
+DEPRECATED_TOPICS = {"core.msdp": "core.msdp.*"}
+
+
+def topic_triggers(event_type: str) -> list[str]:
+    """The triggers that receive an event type: itself, then each wildcard above it"""
+    triggers = [event_type]
+    parts = event_type.split(".")
+    for n in range(len(parts) - 1, 0, -1):
+        triggers.append(".".join(parts[:n]) + ".*")
+    triggers.append("*")
+    return triggers
+
+
 class EventManager:
     """Load and Manage Events"""
+    frame_budget: float = 1 / 60
 
     def __init__(self):
         log("Booting EventManager")
-        self.events: Dict[str, PriorityQueue] = {}
+        # trigger -> listeners, in priority then registration order
+        self.events: Dict[str, list[EventTask]] = {}
         self.event_counts = Counter()
+        # event type -> every listener that receives it, exact and wildcard, in priority order
+        self._handlers: Dict[str, tuple[EventTask, ...]] = {}
+
+        self.policies: Dict[str, DeferPolicy] = {}
+        # event type -> (coalesced message, loop time it is due)
+        self._deferred: Dict[str, tuple[AbacuraMessage, float]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_due: float = 0
 
     def register_object(self, obj: object):
         """Find and register all events in an object"""
@@ -54,24 +104,128 @@ class EventManager:
 
     def unregister_object(self, obj: object):
         """Remove an object's events from the manager"""
-        for trigger, pq in self.events.items():
-            pq.queue[:] = [e for e in pq.queue if e.source != obj]
+        for trigger, tasks in list(self.events.items()):
+            tasks[:] = [e for e in tasks if e.source != obj]
+            if not tasks:
+                del self.events[trigger]
+        self._handlers.clear()
+
+        # a message already deferred is still delivered by the next flush
+        for event_type, policy in list(self.policies.items()):
+            if policy.source is obj:
+                del self.policies[event_type]
 
     def add_listener(self, listener: Callable, source: object = None):
         """Add an event listener"""
         trigger: str = getattr(listener, "event_trigger")
+        if trigger in DEPRECATED_TOPICS:
+            name = getattr(listener, "__qualname__", repr(listener))
+            log.warning(f"{name} listens to '{trigger}', which is deprecated, use '{DEPRECATED_TOPICS[trigger]}'")
+            trigger = DEPRECATED_TOPICS[trigger]
+
         task = EventTask(handler=listener, source=source, trigger=trigger,
                          priority=getattr(listener, "event_priority"))
 
-        self.events.setdefault(trigger, PriorityQueue()).put(task)
+        tasks = self.events.setdefault(trigger, [])
+        tasks.append(task)
+        # stable, so equal priorities keep registration order
+        tasks.sort(key=lambda t: t.priority)
+        self._handlers.clear()
+
+    def handlers(self, event_type: str) -> tuple[EventTask, ...]:
+        """Listeners for an event type, resolved on first use after listeners change"""
+        handlers = self._handlers.get(event_type)
+        if handlers is None:
+            tasks = [t for trigger in topic_triggers(event_type) for t in self.events.get(trigger, ())]
+            tasks.sort(key=lambda t: t.priority)
+            handlers = self._handlers[event_type] = tuple(tasks)
+        return handlers
+
+    def defer(self, event_type: str, merge: Optional[Callable] = None, hz: float = 0, source: object = None):
+        """
+        Deliver an event type on the next frame instead of when it is dispatched
+
+        Dispatches of the event type before delivery are coalesced into one message, the latest
+        unless merge(pending, message) returns their combination.  With hz, the event type is
+        delivered no more than hz times a second.  Listeners must not need the event right away.
+        The policy is removed with unregister_object(source).
+        """
+        self.policies[event_type] = DeferPolicy(merge=merge, hz=hz, source=source)
 
     def dispatch(self, message: AbacuraMessage):
-        """Dispatch events"""
-        if message.event_type not in self.events:
+        """Dispatch events, returning the result when there is a single listener"""
+        policy = self.policies.get(message.event_type)
+        if policy is not None:
+            self._defer(policy, message)
+            return
+
+        return self._deliver(message)
+
+    def _defer(self, policy: DeferPolicy, message: AbacuraMessage):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # nothing to wait for outside the event loop
+            self._deliver(message)
+            return
+
+        policy.dispatched += 1
+        event_type = message.event_type
+        pending = self._deferred.get(event_type)
+        if pending is not None:
+            if policy.merge is not None:
+                message = policy.merge(pending[0], message)
+            self._deferred[event_type] = (message, pending[1])
+            return
+
+        due = loop.time() + self.frame_budget
+        if policy.hz:
+            due = max(due, policy.last_delivery + 1 / policy.hz)
+        self._deferred[event_type] = (message, due)
+
+        if self._flush_handle is None or due < self._flush_due:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_due = due
+            self._flush_handle = loop.call_at(due, self.flush_deferred)
+
+    def flush_deferred(self, everything: bool = False):
+        """Deliver the deferred events that are due, or all of them"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        for event_type, (message, due) in list(self._deferred.items()):
+            if due > now and not everything:
+                continue
+
+            del self._deferred[event_type]
+            policy = self.policies.get(event_type)
+            if policy is not None:
+                policy.delivered += 1
+                policy.last_delivery = now
+            self._deliver(message)
+
+        # a listener may have deferred another event, which scheduled its own flush
+        if self._deferred and self._flush_handle is None:
+            self._flush_due = min(due for _, due in self._deferred.values())
+            self._flush_handle = loop.call_at(self._flush_due, self.flush_deferred)
+
+    def _deliver(self, message: AbacuraMessage):
+        handlers = self._handlers.get(message.event_type)
+        if handlers is None:
+            handlers = self.handlers(message.event_type)
+
+        if not handlers:
             return
 
         self.event_counts[message.event_type] += 1
 
-        results = [task.handler(message) for task in self.events[message.event_type].queue]
-        if len(results) == 1:
-            return results[0]
+        if len(handlers) == 1:
+            return handlers[0].handler(message)
+
+        for task in handlers:
+            task.handler(message)
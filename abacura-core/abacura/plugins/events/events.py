@@ -1,6 +1,6 @@
 """The Event plugin"""
 from abacura.plugins import Plugin, command, CommandError
-from abacura.plugins.events import AbacuraMessage
+from abacura.plugins.events import AbacuraMessage, topic_triggers
 from abacura.utils.renderables import tabulate, AbacuraPanel
 
 class EventPlugin(Plugin):
@@ -30,25 +30,37 @@ class EventPlugin(Plugin):
                 if key != show_event:
                     continue
 
-                for f in value.queue:
+                for f in value:
                     rows.append({"Priority": f.priority, "Module": f.handler.__module__, "Method": f.handler.__name__})
 
             self.output(AbacuraPanel(tabulate(rows), title=show_event))
             return
 
+        # wildcard listeners have processed every event below them
+        processed = event_manager.event_counts.copy()
+        for event_type, count in event_manager.event_counts.items():
+            for trigger in topic_triggers(event_type)[1:]:
+                processed[trigger] += count
+
         rows = []
         for key, value in event_manager.events.items():
             row = {"Event Name": key,
-                   "# Handlers": value.qsize(),
-                   "# Events Processed": event_manager.event_counts[key]}
+                   "# Handlers": len(value),
+                   "# Events Processed": processed[key]}
 
             # if detail:
-            #     row['Handlers'] = [f"{str(f.handler.__module__)}.{str(f.handler.__name__)}" for f in value.queue]
+            #     row['Handlers'] = [f"{str(f.handler.__module__)}.{str(f.handler.__name__)}" for f in value]
 
             rows.append(row)
 
         self.output(AbacuraPanel(tabulate(rows), title="Events"))
 
+        if event_manager.policies:
+            rows = [(key, policy.description, policy.dispatched, policy.delivered, policy.saved)
+                    for key, policy in event_manager.policies.items()]
+            headers = ["Event Name", "Policy", "Dispatched", "Delivered", "Saved"]
+            self.output(AbacuraPanel(tabulate(rows, headers=headers), title="Deferred Events"))
+
     @command(name="dispatch")
     def dispatch_event(self, trigger: str, value: str = ""):
         """
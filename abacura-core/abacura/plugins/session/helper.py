@@ -4,16 +4,11 @@ from rich.panel import Panel
 from rich.pretty import Pretty
 
 from abacura.plugins import Plugin, command, CommandError
-from abacura.utils.renderables import tabulate, AbacuraPanel
+from abacura.utils.renderables import tabulate, AbacuraPanel, AbacuraPropertyGroup, Group
 
 
 class SessionHelper(Plugin):
     """Provides commands related to the session"""
-    def __init__(self):
-        super().__init__()
-        if self.session.ring_buffer:
-            self.add_ticker(1, self.session.ring_buffer.commit, name="ring-autocommit")
-
     """Session specific commands"""
     @command(name="echo")
     def echo(self, text: str):
@@ -70,3 +65,47 @@ class SessionHelper(Plugin):
 
         tbl = tabulate(rows, headers=["Group", "Name", "Description"])
         self.output(AbacuraPanel(tbl, title=title), actionable=False, highlight=True)
+
+    @command(name="output")
+    def output_command(self, on: bool = False, off: bool = False, reset: bool = False):
+        """
+        Show output batching statistics, or turn batching on or off
+
+        Batched output is written to the screen once per frame instead of once per line
+
+        :param on: Queue output and write it once per frame
+        :param off: Write each line as it arrives
+        :param reset: Reset the statistics
+        """
+        tl = self.session.tl
+        if on or off:
+            tl.flush()
+            self.session.batch_output = on
+
+        if reset:
+            tl.reset_flush_stats()
+
+        per_flush = tl.lines_flushed / tl.flushes if tl.flushes else 0
+        avg_latency = tl.flush_latency / tl.flushes if tl.flushes else 0
+        properties = {"Batching": "on" if self.session.batch_output else "off",
+                      "Frame Budget": f"{tl.frame_budget * 1000:.1f}ms",
+                      "Flushes": tl.flushes, "Lines Flushed": tl.lines_flushed,
+                      "Lines/Flush": f"{per_flush:.1f} avg, {tl.peak_lines_per_flush} peak",
+                      "Flush Latency": f"{avg_latency * 1000:.1f}ms avg, {tl.peak_flush_latency * 1000:.1f}ms peak, "
+                                       f"{tl.last_flush_latency * 1000:.1f}ms last",
+                      "Repeat Folding": f"{'on' if self.session.fold_repeats else 'off'}, "
+                                        f"{self.session.folded_lines} lines folded"}
+        groups = [AbacuraPropertyGroup(properties, title="Output")]
+
+        rb = self.session.ring_buffer
+        if rb:
+            per_batch = rb.rows_written / rb.batches if rb.batches else 0
+            ring = {"Rows Logged": rb.rows_logged,
+                    "Rows Written": f"{rb.rows_written} in {rb.batches} batches, {per_batch:.1f} avg",
+                    "Write Time": f"{rb.write_time * 1000:.0f}ms",
+                    "Pending": f"{rb.pending}, {rb.peak_pending} peak, {rb.max_pending} max",
+                    "Dropped": rb.dropped, "Failed": rb.rows_failed, "Repeats Coalesced": rb.coalesced,
+                    "Checkpoints": rb.checkpoints}
+            groups.append(AbacuraPropertyGroup(ring, title="Ring Log"))
+
+        self.output(AbacuraPanel(Group(*groups), title="#output"), actionable=False)
@@ -1,4 +1,8 @@
+import re
+import sqlite3
 import time
+from functools import partial
+from typing import Optional
 
 from rich.text import Text
 from textual import on
@@ -6,6 +10,7 @@ from textual.app import ComposeResult
 from textual.containers import Grid, Horizontal
 from textual.timer import Timer
 from textual.widgets import Button, Input, Label, RichLog, Select, Checkbox
+from textual.worker import get_current_worker
 
 from abacura.screens import AbacuraWindow
 from abacura.plugins import Plugin, command, CommandError
@@ -16,21 +21,57 @@ from abacura.utils.renderables import tabulate, AbacuraPropertyGroup, AbacuraPan
 class LogSearcher:
     def __init__(self, ring_buffer: RingBufferLogSql):
         self.ring_buffer = ring_buffer
-
-    def search_logs(self, like: str = "", limit: int = 100, minutes_ago: int = 0, show_msdp: bool = False) -> list:
-        like = like[1:] if len(like) and like[0] == "^" else "%" + like
-        like = like[:-1] if len(like) and like[-1] == "$" else like + "%"
-
+        self.last_query: dict = {}
+        self.elapsed: float = 0
+        # a read-only connection of its own once connect() is called, for searching from worker threads
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = self.ring_buffer.reader()
+
+    def interrupt(self):
+        """Stop the search running on the connection, it raises sqlite3.OperationalError"""
+        if self.conn is not None:
+            self.conn.interrupt()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.interrupt()
+            self.conn.close()
+            self.conn = None
+
+    def search_logs(self, like: str = "", limit: int = 100, minutes_ago: int = 0, show_msdp: bool = False,
+                    regex: bool = False, context: str = "") -> list:
         ns_ago = int(minutes_ago) * 60 * 1000 * 1000 * 1000
         epoch_start = 0 if not minutes_ago else (time.time_ns() - ns_ago)
 
-        clauses = [] if show_msdp else [r"stripped not like '!MSDP%'"]
+        clauses = [] if show_msdp else [r"ring_log.stripped not like '!MSDP%'"]
         clauses = [""] + clauses if len(clauses) else []
         exclude_clause = " and ".join(clauses)
 
-        logs = self.ring_buffer.query(like, clause=exclude_clause, limit=limit, epoch_start=epoch_start)
+        query = {"clause": exclude_clause, "limit": limit, "epoch_start": epoch_start, "context": context}
+        if regex:
+            try:
+                re.compile(like)
+            except re.error as e:
+                raise CommandError(f"Invalid regex: {e}")
+            query["regex"] = like
+        else:
+            like = like[1:] if len(like) and like[0] == "^" else "%" + like
+            like = like[:-1] if len(like) and like[-1] == "$" else like + "%"
+            query["like"] = like
+
+        self.last_query = query
+        start = time.perf_counter()
+        logs = self.ring_buffer.query(**query, conn=self.conn)
+        self.elapsed = time.perf_counter() - start
         return logs
 
+    def query_plan(self) -> list[str]:
+        """The query plan of the last search"""
+        return self.ring_buffer.query_plan(**self.last_query)
+
 
 class LogSearchWindow(AbacuraWindow):
     """Log Screen with a search box"""
@@ -43,7 +84,7 @@ class LogSearchWindow(AbacuraWindow):
     ]
 
     # CSS_PATH = "css/kallisti.css"
-    def __init__(self, searcher: LogSearcher, find: str = "%", show_msdp: bool = False):
+    def __init__(self, searcher: LogSearcher, find: str = "%", show_msdp: bool = False, regex: bool = False):
         super().__init__(title="Log Search")
         self.searcher = searcher
         self.richlog = RichLog(id="logsearch-log")
@@ -53,43 +94,89 @@ class LogSearchWindow(AbacuraWindow):
         row_options = [(" 100 rows", 100), ("1000 rows", 1000)]
         self.row_limit = Select[int](row_options, id="logsearch-rows", value=100)
         self.msdp_checkbox = Checkbox("MSDP", value=show_msdp)
+        self.regex_checkbox = Checkbox("Regex", value=regex)
         self.footer: Label = Label("", id="logsearch-footer")
+        self.search_number: int = 0
+        self.page_size: int = 25
 
+        self.searcher.connect()
         self.call_after_refresh(self.run_search, find)
         self.populate_timer: Timer | None = None
 
         self.richlog.can_focus = False
         self.msdp_checkbox.can_focus = False
+        self.regex_checkbox.can_focus = False
         self.row_limit.can_focus = False
 
     async def run_search(self, find: str = '%'):
         if self.populate_timer:
             self.populate_timer.stop()
-        start = time.monotonic()
-        results = self.searcher.search_logs(find, limit=self.row_limit.value, show_msdp=self.msdp_checkbox.value)
-        elapsed = time.monotonic() - start
-        self.call_later(self.display_results, results, elapsed)
-
-    async def display_results(self, results: list, elapsed: float = 0):
-        self.footer.refresh()
-        # with self.app.batch_update():
+
+        # the worker for the last search is cancelled, and its query interrupted
+        self.search_number += 1
+        self.searcher.interrupt()
+        search = partial(self.search, self.search_number, find, self.row_limit.value, self.msdp_checkbox.value,
+                         self.regex_checkbox.value)
+        self.run_worker(search, name="logsearch", group="logsearch", exclusive=True, thread=True,
+                        exit_on_error=False, description=f"Log search for {find}")
+
+    def search(self, number: int, find: str, limit: int, show_msdp: bool, regex: bool):
+        """Worker thread, runs the query then renders results a page at a time, the newest first"""
+        worker = get_current_worker()
+        # timed here, the searcher is shared with searches still winding down on other workers
+        start = time.perf_counter()
+        try:
+            results = self.searcher.search_logs(find, limit=limit, show_msdp=show_msdp, regex=regex)
+        except CommandError as e:
+            self.app.call_from_thread(self.show_footer, number, Text(str(e), style="red"))
+            return
+        except sqlite3.Error:
+            # interrupted by a newer search, or the window closed
+            return
+
+        query_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        self.app.call_from_thread(self.write_page, number, [], True)
+        if not results:
+            self.app.call_from_thread(self.write_page, number, [Text("No results found", style="red")])
+
+        results.reverse()
+        for offset in range(0, len(results), self.page_size):
+            if worker.is_cancelled:
+                return
+            page = [self.format_line(*row) for row in results[offset:offset + self.page_size]]
+            self.app.call_from_thread(self.write_page, number, page)
+
+        render_elapsed = time.perf_counter() - start
+        footer = Text(f"{len(results)} lines, query {query_elapsed * 1000:.1f}ms, render {render_elapsed * 1000:.1f}ms")
+        self.app.call_from_thread(self.show_footer, number, footer)
+
+    @staticmethod
+    def format_line(lt: str, lc: str, ll: str) -> Text:
+        try:
+            return Text.from_ansi(f"{lt:15} {lc:>6} {ll[:300]}")
+        except Exception:
+            # If ANSI conversion fails, write as plain text
+            from rich.markup import escape
+            return Text(escape(f"{lt:15} {lc:>6} {ll[:300]}"))
+
+    def write_page(self, number: int, lines: list[Text], clear: bool = False):
+        if number != self.search_number:
+            return
+
         with self.screen.app.batch_update():
-            self.richlog.clear()
-            self.richlog.auto_scroll = True
-            if len(results):
-                for lt, lc, ll in results:
-                    try:
-                        self.richlog.write(Text.from_ansi(f"{lt:15} {lc:>6} {ll[:300]}"))
-                    except Exception:
-                        # If ANSI conversion fails, write as plain text
-                        from rich.markup import escape
-                        safe_text = escape(f"{lt:15} {lc:>6} {ll[:300]}")
-                        self.richlog.write(Text(safe_text))
-            else:
-                self.richlog.write(Text("No results found", style="red"))
-
-            self.footer.renderable = Text(f"{len(results)} lines returned in {elapsed:5.3f}s")
-            self.footer.refresh()
+            if clear:
+                self.richlog.clear()
+                self.richlog.auto_scroll = False
+            for line in lines:
+                self.richlog.write(line)
+
+    def show_footer(self, number: int, text: Text):
+        if number == self.search_number:
+            self.footer.update(text)
+
+    def on_unmount(self):
+        self.searcher.close()
 
     def compose(self) -> ComposeResult:
         with Grid(id="logsearch-grid") as g:
@@ -100,6 +187,7 @@ class LogSearchWindow(AbacuraWindow):
             with Horizontal():
                 yield self.row_limit
                 yield self.msdp_checkbox
+                yield self.regex_checkbox
 
             yield Label("Search Results", id="logsearch-results-label")
             yield self.richlog
@@ -147,7 +235,8 @@ class LogSearchWindow(AbacuraWindow):
 class LogSearch(Plugin):
 
     @command
-    def log(self, find: str = "%", limit: int = 40, dump: bool = False, msdp: bool = False):
+    def log(self, find: str = "%", limit: int = 40, dump: bool = False, msdp: bool = False, regex: bool = False,
+            plan: bool = False, _minutes: int = 0, _context: str = ""):
         """
         Search output log and show results in a window
 
@@ -155,6 +244,10 @@ class LogSearch(Plugin):
         :param limit: limit the number of log entries returned
         :param msdp: Show msdp values
         :param dump: dump output to mud instead of bringing up new window
+        :param regex: Search with a regular expression instead
+        :param plan: Show how the search was run, with --dump
+        :param _minutes: Only search the last so many minutes
+        :param _context: Only search lines logged with this context
         """
 
         if self.session.ring_buffer is None:
@@ -163,11 +256,11 @@ class LogSearch(Plugin):
         ls = LogSearcher(self.session.ring_buffer)
 
         if not dump:
-            window = LogSearchWindow(ls, find, msdp)
+            window = LogSearchWindow(ls, find, msdp, regex)
             self.session.screen.mount(window)
             return
 
-        logs = ls.search_logs(find, limit, show_msdp=msdp)
+        logs = ls.search_logs(find, limit, minutes_ago=_minutes, show_msdp=msdp, regex=regex, context=_context)
         # Convert logs with safe markup handling to avoid MarkupError
         safe_logs = []
         for t, c, l in logs:
@@ -181,7 +274,13 @@ class LogSearch(Plugin):
                 safe_logs.append((t, c, escape(l)))
         logs = safe_logs
 
-        pview = AbacuraPropertyGroup({"Find": find, "Limit": limit, "MSDP": msdp}, title="Properties")
+        properties = {"Find": find, "Limit": limit, "MSDP": msdp, "Regex": regex}
+        if _minutes:
+            properties["Minutes"] = _minutes
+        if _context:
+            properties["Context"] = _context
+        properties["Elapsed"] = f"{ls.elapsed * 1000:.1f}ms"
+        pview = AbacuraPropertyGroup(properties, title="Properties")
 
         if len(logs) == 0:
             results = Text.assemble(("Results\n\n", OutputColors.section), ("No logs found", ""))
@@ -198,4 +297,9 @@ class LogSearch(Plugin):
 
             results = tabulate(logs, headers=headers, title="Results", caption=caption, expand=True)
 
-        self.output(AbacuraPanel(Group(pview, Text(), results), "Log Search", expand=True))
+        renderables = [pview, Text(), results]
+        if plan:
+            steps = Text("\n".join(ls.query_plan()))
+            renderables += [Text(), Text("Query Plan\n", style=OutputColors.section), steps]
+
+        self.output(AbacuraPanel(Group(*renderables), "Log Search", expand=True))
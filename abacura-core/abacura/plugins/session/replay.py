@@ -0,0 +1,97 @@
+from pathlib import Path
+
+from abacura.mud.recording import RecordingError
+from abacura.mud.replay import ReplayDriver, ReplayReport
+from abacura.plugins import Plugin, command, CommandError
+from abacura.utils import human_format
+from abacura.utils.renderables import tabulate, AbacuraPanel, AbacuraPropertyGroup, Group, Text
+
+
+def replay_table(report: ReplayReport):
+    caption = f" {report.summary()}, stage times are inclusive"
+    return tabulate(report.stage_rows(), headers=("Stage", "Calls", "Seconds", "_μs/call", "_% Elapsed"),
+                    caption=caption, float_format="9.3f")
+
+
+class Replay(Plugin):
+    """Record the inbound socket stream and replay recordings for throughput testing"""
+
+    @property
+    def telnet(self):
+        return self.session.plugin_loader.plugins["TelnetPlugin"]
+
+    @command
+    def record(self, filename: str = '', start: bool = False, stop: bool = False):
+        """
+        Record the raw stream from the server, or show recording status
+
+        :param filename: File to record into, defaults to the session data directory
+        :param start: Start recording
+        :param stop: Stop recording
+        """
+        if start:
+            if not self.session.connected:
+                raise CommandError("Session is not connected")
+            recorder = self.telnet.start_recording(filename)
+            self.output(AbacuraPanel(f"Recording to {recorder.filename}", title="#record"))
+            return
+
+        if stop:
+            recorder = self.telnet.stop_recording()
+            if recorder is None:
+                raise CommandError("Not recording")
+            self.output(AbacuraPanel(f"Stopped recording to {recorder.filename}", title="#record"))
+            return
+
+        recorder = self.telnet.recorder
+        if recorder is None:
+            self.output(AbacuraPanel("Not recording", title="#record"))
+            return
+
+        status = {"File": str(recorder.filename), "Chunks": recorder.chunks,
+                  "Bytes": human_format(recorder.bytes_recorded)}
+        self.output(AbacuraPanel(AbacuraPropertyGroup(status, title="Recording"), title="#record"))
+
+    @command
+    def replay(self, filename: str, _speed: float = 0):
+        """
+        Replay a recording through this session and report pipeline timings
+
+        :param filename: The recording to replay
+        :param _speed: 1 for recorded speed, N for N times faster, 0 for as fast as possible
+        """
+        if self.session.connected:
+            raise CommandError("Cannot replay into a connected session")
+
+        if not Path(filename).expanduser().is_file():
+            raise CommandError(f"No such recording {filename}")
+
+        self.start_replay(filename, _speed)
+
+    def start_replay(self, filename: str, speed: float = 0):
+        self.session.abacura.run_worker(self.run_replay(filename, speed),
+                                        name=f"replay-{self.session.name}", group=self.session.name,
+                                        description=f"Replay {filename} into {self.session.name}")
+
+    async def run_replay(self, filename: str, speed: float):
+        driver = ReplayDriver(self.session, self.telnet, filename, speed)
+        try:
+            report = await driver.run()
+        except RecordingError as exc:
+            self.session.show_error(str(exc), title="Replay Error")
+            app = self.session.abacura
+            if app.REPLAY and app.is_headless:
+                app.exit(return_code=1, message=f"Replay error: {exc}")
+            return
+
+        properties = {"File": report.filename, "Speed": report.speed or "max",
+                      "Chunks": report.chunks, "Bytes": human_format(report.bytes),
+                      "Lines": report.lines, "Elapsed": f"{report.elapsed:.3f}s",
+                      "Lines/sec": f"{report.lines_per_second:,.0f}"}
+
+        self.output(AbacuraPanel(Group(AbacuraPropertyGroup(properties, title="Replay"), Text(),
+                                       replay_table(report)), title="#replay"), actionable=False)
+
+        app = self.session.abacura
+        if app.REPLAY and app.is_headless:
+            app.exit(result=report)
@@ -0,0 +1,129 @@
+"""
+Substitutions and gags applied to output lines before actions run and lines are rendered
+
+Substitutions are filed in a TriggerEngine by their anchored prefix or required literal, the same
+index actions use, so one pass over a line finds the few whose regex can match it.  Most lines
+match none and cost that one pass.
+
+Gags are checked first, against the line as received.  A gagged line is not substituted,
+rendered or logged; actions still see it.  Substitutions are then applied in priority order,
+lowest first, each to the result of the one before.
+"""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Optional
+
+from abacura.utils.regex import required_literals, most_selective, anchored_prefix
+from abacura.plugins.actions.engine import TriggerEngine
+
+if TYPE_CHECKING:
+    from abacura.mud import OutputMessage
+
+
+class Substitute:
+    def __init__(self, source: object, pattern: str, repl: Optional[str], name: str = '',
+                 flags: int = 0, color: bool = False, priority: int = 0):
+        self.source: object = source
+        self.pattern: str = pattern
+        self.repl: Optional[str] = repl
+        self.name: str = name
+        self.flags: int = flags
+        self.color: bool = color
+        self.priority: int = priority
+        self.compiled_re = re.compile(pattern, flags)
+        if isinstance(repl, str):
+            self.check_repl(self.compiled_re, repl)
+        self.hits: int = 0
+
+        # Pre-filtering hints for the TriggerEngine, as for actions
+        self.literal: str = most_selective(required_literals(pattern, flags))
+        self.prefix: str = anchored_prefix(pattern, flags)
+        self.trigger_key: str = ''
+
+    @property
+    def gag(self) -> bool:
+        return self.repl is None
+
+    @staticmethod
+    def check_repl(compiled: re.Pattern, repl: str):
+        """Raise re.error now for a replacement that refers to groups the pattern does not have"""
+        names = {index: name for name, index in compiled.groupindex.items()}
+        groups = "".join(f"(?P<{names[n]}>)" if n in names else "()" for n in range(1, compiled.groups + 1))
+        try:
+            re.match(groups, "").expand(repl)
+        except (re.error, IndexError) as exc:
+            raise re.error(f"bad replacement '{repl}': {exc}")
+
+
+class SubstituteManager:
+    def __init__(self):
+        self.substitutes: list[Substitute] = []
+        self.engine: TriggerEngine = TriggerEngine()
+        # gags first, then priority and the order added, rebuilt after a change
+        self._position: dict[Substitute, int] = {}
+        self._dirty: bool = False
+
+    def add(self, substitute: Substitute):
+        if substitute.name:
+            self.remove(substitute.name)
+        self.substitutes.append(substitute)
+        self.engine.add(substitute)
+        self._dirty = True
+
+    def _remove_where(self, predicate):
+        keep = []
+        for sub in self.substitutes:
+            if predicate(sub):
+                self.engine.remove(sub)
+            else:
+                keep.append(sub)
+        self.substitutes = keep
+        self._dirty = True
+
+    def remove(self, name: str):
+        self._remove_where(lambda s: s.name == name)
+
+    def unregister_object(self, obj: object):
+        self._remove_where(lambda s: s.source == obj)
+
+    def _order(self):
+        ordered = sorted(self.substitutes, key=lambda s: (not s.gag, s.priority))
+        self._position = {sub: n for n, sub in enumerate(ordered)}
+        self._dirty = False
+
+    def _candidates(self, message: OutputMessage, after: int = -1) -> list[Substitute]:
+        position = self._position
+        found = [s for s in self.engine.candidates(message.message, message.stripped) if position[s] > after]
+        found.sort(key=position.__getitem__)
+        return found
+
+    def process_output(self, message: OutputMessage):
+        if type(message.message) is not str or not self.substitutes:
+            return
+
+        if self._dirty:
+            self._order()
+
+        found = self._candidates(message)
+        n = 0
+        while n < len(found):
+            sub = found[n]
+            n += 1
+            text = message.message if sub.color else message.stripped
+
+            if sub.gag:
+                if sub.compiled_re.search(text):
+                    sub.hits += 1
+                    message.gag = True
+                    return
+                continue
+
+            # substitutions on stripped text replace the line with the stripped result
+            text, count = sub.compiled_re.subn(sub.repl, text)
+            if count:
+                sub.hits += 1
+                message.message = text
+                # the new text may contain literals of later substitutions that were not candidates
+                found = self._candidates(message, after=self._position[sub])
+                n = 0
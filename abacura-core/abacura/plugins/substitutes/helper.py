@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from abacura.plugins import Plugin, command, CommandError
+from abacura.utils.renderables import tabulate, AbacuraPanel
+
+
+class SubstituteCommand(Plugin):
+    """Provides #substitute and #gag commands"""
+    def show_substitutes(self, gags: bool):
+        rows = []
+        manager = self.director.substitute_manager
+        for sub in sorted(manager.substitutes, key=lambda s: s.priority):
+            if sub.gag != gags:
+                continue
+
+            source = sub.source.__class__.__name__ if sub.source else ""
+            replacement = () if gags else (repr(sub.repl),)
+            rows.append((repr(sub.pattern), *replacement, sub.name, source, sub.priority, sub.color, sub.hits))
+
+        headers = ["Pattern", "Name", "Source", "Priority", "Color", "Hits"]
+        if not gags:
+            headers.insert(1, "Replacement")
+        tbl = tabulate(rows, headers=headers, caption=f" {len(rows)} {'gags' if gags else 'substitutions'}")
+        self.output(AbacuraPanel(tbl, title="Gags" if gags else "Substitutions"))
+
+    def add_or_delete(self, pattern: str, repl, _name: str, _priority: int, color: bool, delete: bool):
+        name = _name or pattern
+        if delete:
+            if not any(s.name == name for s in self.director.substitute_manager.substitutes):
+                raise CommandError(f"Unknown substitution '{name}'")
+            self.remove_substitute(name)
+            self.output(f"Removed '{name}'")
+            return
+
+        try:
+            self.add_substitute(pattern, repl, name=name, color=color, priority=_priority)
+        except Exception as exc:
+            raise CommandError(f"Invalid substitution '{pattern}': {exc}")
+
+    @command
+    def substitute(self, pattern: str = '', repl: str = '', _name: str = '', _priority: int = 0,
+                   color: bool = False, delete: bool = False):
+        """
+        View/Create/delete substitutions applied to output lines before actions
+
+        :param pattern: Regular expression to replace
+        :param repl: Replacement text, which may refer to groups of the pattern
+        :param _name: Name of the substitution, defaults to the pattern
+        :param _priority: Lower priorities are applied first
+        :param color: Match the line with its color codes, otherwise the line loses its color when replaced
+        :param delete: Delete a substitution by name or pattern
+        """
+        if not pattern and not _name:
+            self.show_substitutes(gags=False)
+            return
+
+        self.add_or_delete(pattern, repl, _name, _priority, color, delete)
+
+    @command
+    def gag(self, pattern: str = '', _name: str = '', color: bool = False, delete: bool = False):
+        """
+        View/Create/delete gags, output lines that are not shown or logged
+
+        :param pattern: Regular expression for the lines to gag
+        :param _name: Name of the gag, defaults to the pattern
+        :param color: Match the line with its color codes
+        :param delete: Delete a gag by name or pattern
+        """
+        if not pattern and not _name:
+            self.show_substitutes(gags=True)
+            return
+
+        self.add_or_delete(pattern, None, _name, 0, color, delete)
@@ -3,17 +3,23 @@ Command Queue running routines
 
 Tracks last command, calculates delay, and issues commands in priority order,
 depending on the combat situation.
+
+The TaskManager does not poll.  Each queue keeps its tasks in a heap, and the manager asks the
+event loop to wake it when the next command may be sent, a delay ends or a task times out.
+Insert checks read MSDP, so they are evaluated again when the MSDP fields they depend on change.
 """
 
+import asyncio
+import heapq
 from dataclasses import dataclass, field
-import bisect
 from time import monotonic
-from typing import Optional, Callable, Dict
+from typing import Optional, Callable, Dict, Iterable
 import itertools
 
 from textual import log
 
 from abacura.plugins.events import AbacuraMessage
+from abacura.plugins.task_queue.pacing import Pacer
 
 
 class InvalidQueueName(Exception):
@@ -24,10 +30,16 @@ _DEFAULT_PRIORITY = 50
 _DEFAULT_DURATION: float = 1.0
 
 
+def _always() -> bool:
+    return True
+
+
 @dataclass
 class TaskQueue:
     priority: int = _DEFAULT_PRIORITY
-    insert_check: Callable = lambda: True
+    insert_check: Callable = _always
+    # MSDP fields insert_check reads, None when it may read any of them
+    depends: Optional[tuple[str, ...]] = None
 
     @property
     def insertable(self):
@@ -48,7 +60,8 @@ class Task:
     timeout: float = 0
     exclusive: bool = False
     queued_time: float = field(default_factory=monotonic)
-    insert_check: Callable = lambda: True
+    insert_check: Callable = _always
+    depends: Optional[tuple[str, ...]] = None
     _wait_prior: Optional["Task"] = None
     _inserted: bool = field(default=False, init=True)
     _queue: TaskQueue = field(default_factory=TaskQueue, init=True)
@@ -113,13 +126,37 @@ class TaskManager:
     """Manage tasks by priority"""
 
     def __init__(self, queues: Dict[str, TaskQueue] | None = None):
-        self.tasks: list[Task] = []
         self._NEXT_COMMAND_TIME: float = 0.0
         self._command_inserter: Optional[Callable] = None
+        self._change_notifier: Optional[Callable] = None
+        self.pacer: Pacer = Pacer()
         self._queues: dict[str, TaskQueue] = {}
+        self._default_queue: TaskQueue = TaskQueue()
+
+        # queue name -> heap of its tasks, and the queues in priority order
+        self._heaps: dict[str, list[Task]] = {}
+        self._order: list[str] = []
+        # lower case command -> tasks, for exclusive tasks
+        self._by_cmd: dict[str, set[Task]] = {}
+        # (time, seq, task) for when a delay ends or a task times out
+        self._timers: list[tuple[float, int, Task]] = []
+        self._seq = itertools.count()
+        # queue name -> insert_check result, until a field it depends on changes
+        self._queue_ok: dict[str, bool] = {}
+
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._handle_due: float = 0
+        self._running: bool = False
+        self._rerun: bool = False
+        self.wakeups: int = 0
 
         if queues:
-            self._queues = queues
+            self.set_queues(queues)
+
+    @property
+    def tasks(self) -> list[Task]:
+        """Every queued task, in the order they would be sent"""
+        return sorted(task for heap in self._heaps.values() for task in heap)
 
     @property
     def next_command_delay(self) -> float:
@@ -128,26 +165,81 @@ class TaskManager:
     def set_command_inserter(self, f: Callable):
         self._command_inserter = f
 
+    def set_change_notifier(self, f: Callable):
+        """Called after tasks are added, sent or removed"""
+        self._change_notifier = f
+
+    def _queue(self, name: str) -> TaskQueue:
+        return self._queues.get(name.lower()) or self._default_queue
+
     def set_queues(self, queues: Dict[str, TaskQueue]):
-        self._queues = queues
+        self._queues = {name.lower(): queue for name, queue in queues.items()}
 
         # update queues for each task and re-sort in case priorities changed
-        for task in self.tasks:
-            task._queue = queues.get(task.q, TaskQueue())
-
-        self.tasks.sort()
+        tasks = self.tasks
+        self._heaps = {}
+        self._order = []
+        for task in tasks:
+            self._push(task)
+
+        self._queue_ok.clear()
+
+    def _push(self, task: Task):
+        name = task.q.lower()
+        task.set_queue(self._queue(name))
+        heap = self._heaps.get(name)
+        if heap is None:
+            heap = self._heaps[name] = []
+            self._order.append(name)
+            self._order.sort(key=lambda n: self._queue(n).priority)
+        heapq.heappush(heap, task)
+
+        self._by_cmd.setdefault(task.cmd.lower(), set()).add(task)
+        if task.delay > 0:
+            heapq.heappush(self._timers, (task.queued_time + task.delay, next(self._seq), task))
+        if task.timeout > 0:
+            heapq.heappush(self._timers, (task.queued_time + task.timeout, next(self._seq), task))
+
+    def _pending(self, task: Task) -> bool:
+        return task in self._by_cmd.get(task.cmd.lower(), ())
+
+    def _queue_insertable(self, name: str, queue: TaskQueue) -> bool:
+        ok = self._queue_ok.get(name)
+        if ok is None:
+            ok = self._queue_ok[name] = queue.insertable
+        return ok
+
+    def _ready(self, task: Task, now: float) -> bool:
+        return (task.delay + task.queued_time <= now and
+                (task.wait_prior is None or task.wait_prior.inserted) and
+                task.insert_check())
 
     def _get_next_insertable_task(self) -> Task | None:
-        # Process these in queue priority order
-        for i, task in enumerate(self.tasks):
-            if not task.insertable:
+        # Process these in queue priority order, queues of the same priority compete on task priority
+        now = monotonic()
+        best: Optional[Task] = None
+        for name in self._order:
+            heap = self._heaps[name]
+            if not heap:
                 continue
 
-            # Note, popping mutates the list we are iterating, but we are returning so no problem...
-            self.tasks.pop(i)
-            return task
+            queue = self._queue(name)
+            if best is not None and queue.priority > best._queue.priority:
+                break
 
-        return None
+            if not self._queue_insertable(name, queue):
+                continue
+
+            task = heap[0]
+            if not self._ready(task, now):
+                task = next((t for t in sorted(heap)[1:] if self._ready(t, now)), None)
+
+            if task is not None and (best is None or task < best):
+                best = task
+
+        if best is not None:
+            self._discard([best])
+        return best
 
     def run_tasks(self):
         """This is the actual queue runner routine"""
@@ -156,51 +248,150 @@ class TaskManager:
             log.error(f"No command inserter")
             return
 
-        self._remove_timeouts()
+        # sending a command may add tasks, run again when it is done instead of inside it
+        if self._running:
+            self._rerun = True
+            return
 
-        # process as many tasks as we can
-        while self._NEXT_COMMAND_TIME < monotonic():
-            task = self._get_next_insertable_task()
-            if task is None:
-                break
+        self._running = True
+        changed = self._remove_timeouts()
+        try:
+            self._rerun = True
+            while self._rerun:
+                self._rerun = False
+
+                # process as many tasks as we can
+                while self._NEXT_COMMAND_TIME < monotonic() and self.pacer.can_send():
+                    task = self._get_next_insertable_task()
+                    if task is None:
+                        break
+
+                    self._command_inserter(task.cmd)
+                    task.inserted = True
+                    changed = True
+                    log(f"Sent {task.cmd} inserted at {monotonic()}")
+                    self.pacer.command_sent(monotonic())
+                    self._NEXT_COMMAND_TIME = monotonic() + self.pacer.duration(task.dur)
+        finally:
+            self._running = False
+            self._arm()
+
+        if changed:
+            self._notify()
+
+    def _notify(self):
+        if self._change_notifier is not None:
+            self._change_notifier()
+
+    def _arm(self):
+        """Wake when the next command may be sent, a delay ends or a task times out"""
+        timers = self._timers
+        while timers and not self._pending(timers[0][2]):
+            heapq.heappop(timers)
+
+        now = monotonic()
+        due = timers[0][0] if timers else None
+        if self._NEXT_COMMAND_TIME > now and any(self._heaps.values()):
+            due = min(due or self._NEXT_COMMAND_TIME, self._NEXT_COMMAND_TIME)
+
+        # waiting for a prompt, stop waiting when the oldest command is given up on
+        if not self.pacer.can_send() and any(self._heaps.values()):
+            expiry = self.pacer.next_expiry()
+            if expiry is not None:
+                due = min(due or expiry, expiry)
+
+        # count down a task waiting on its delay or the last command
+        if due is not None and due - now > 1 and self._waiting(now):
+            due = now + 1
+
+        if due is None:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            return
 
-            self._command_inserter(task.cmd)
-            task.inserted = True
-            log(f"Sent {task.cmd} inserted at {monotonic()}")
-            self._NEXT_COMMAND_TIME = monotonic() + task.dur
+        if self._handle is not None:
+            if self._handle_due == due:
+                return
+            self._handle.cancel()
 
-    def flush(self, q: str = ''):
-        if q == '':
-            self.tasks = []
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._handle = None
             return
 
-        removals = set(task for task in self.tasks if task.q.lower() == q.lower())
-        self._remove_tasks(removals)
+        self._handle_due = due
+        self._handle = loop.call_later(max(0.0, due - monotonic()), self._wake)
 
-    def add_task(self, task: Task):
-        task.set_queue(self._queues.get(task.q, TaskQueue()))
+    def _waiting(self, now: float) -> bool:
+        if not any(self._heaps.values()):
+            return False
+        return self._NEXT_COMMAND_TIME > now or any(t.delay + t.queued_time > now for t in self.tasks)
 
-        if task.exclusive:
-            check = set(t for t in self.tasks if t.cmd.lower() == task.cmd.lower())
-            if check:
-                return
+    def _wake(self):
+        self._handle = None
+        self.wakeups += 1
+        self.run_tasks()
+        self._notify()
+
+    def prompt_received(self):
+        """The server answered the oldest command sent, another may be sent"""
+        self.pacer.prompt_received(monotonic())
+        if any(self._heaps.values()):
+            self.run_tasks()
+
+    def server_queue(self, depth: int):
+        """The number of commands the server has queued, from MSDP"""
+        self.pacer.server_queue = depth
+        if any(self._heaps.values()):
+            self.run_tasks()
+
+    def msdp_changed(self, name: str):
+        """Evaluate the insert checks that depend on an MSDP field again"""
+        if not any(self._heaps.values()):
+            return
+
+        stale = [q for q in self._queue_ok if self._queue(q).depends is None or name in self._queue(q).depends]
+        blocked = any(task.depends is None or name in task.depends
+                      for heap in self._heaps.values() for task in heap if task.insert_check is not _always)
+        if not stale and not blocked:
+            return
+
+        for q in stale:
+            del self._queue_ok[q]
+        self.run_tasks()
+
+    def flush(self, q: str = ''):
+        if q == '':
+            self._discard(self.tasks)
+        else:
+            self._discard(self._heaps.get(q.lower(), []))
+        self._arm()
+        self._notify()
+
+    def add_task(self, task: Task):
+        if task.exclusive and self._by_cmd.get(task.cmd.lower()):
+            return
 
         task.inserted = False
         task.queued_time = monotonic()
-        bisect.insort(self.tasks, task)
-        # self._pq.put(task)
+        self._push(task)
+        self._queue_ok.clear()
+        self._notify()
         self.run_tasks()
 
     def add_chain(self, *tasks):
         prior = None
         for task in tasks:
             task._wait_prior = prior
-            task.set_queue(self._queues.get(task.q, TaskQueue()))
             task.queued_time = monotonic()
             task.inserted = False
-            bisect.insort(self.tasks, task)
+            self._push(task)
             prior = task
 
+        self._queue_ok.clear()
+        self._notify()
         self.run_tasks()
 
     def add(self, cmd: str, q: str = "any",
@@ -208,22 +399,43 @@ class TaskManager:
         self.add_task(Task(cmd=cmd, priority=priority, dur=dur, delay=delay, q=q, timeout=timeout))
 
     def remove(self, cmd: str):
-        removals = set(task for task in self.tasks if task.q.lower() == cmd.lower())
-        self._remove_tasks(removals)
+        self._discard(list(self._by_cmd.get(cmd.lower(), ())))
+        self._arm()
+        self._notify()
+
+    def _discard(self, removals: Iterable[Task]):
+        """Remove tasks and clear tasks with related priors"""
+        removals = set(removals)
+        if not removals:
+            return
+
+        for task in removals:
+            tasks = self._by_cmd.get(task.cmd.lower())
+            if tasks is not None:
+                tasks.discard(task)
+                if not tasks:
+                    del self._by_cmd[task.cmd.lower()]
+
+        for name in {task.q.lower() for task in removals}:
+            heap = self._heaps[name]
+            heap[:] = [task for task in heap if task not in removals]
+            heapq.heapify(heap)
 
-    def _remove_tasks(self, removals: set[Task]):
-        """Remove a set of tasks and clear tasks with related priors"""
-        self.tasks = [task for task in self.tasks if task not in removals]
         # clear out any priors that got removed
-        for task in self.tasks:
-            if task.wait_prior in removals:
-                task.wait_prior = None
+        for heap in self._heaps.values():
+            for task in heap:
+                if task.wait_prior in removals:
+                    task.wait_prior = None
 
-    def _remove_timeouts(self):
+    def _remove_timeouts(self) -> bool:
         timeouts = set()
-        for task in self.tasks:
-            if task.timed_out:
+        timers = self._timers
+        now = monotonic()
+        while timers and timers[0][0] <= now:
+            _, _, task = heapq.heappop(timers)
+            if self._pending(task) and task.timed_out:
                 timeouts.add(task)
                 log(f"Task timed out: {task.cmd}@{task.timeout}s")
 
-        self._remove_tasks(timeouts)
+        self._discard(timeouts)
+        return bool(timeouts)
@@ -0,0 +1,77 @@
+"""
+Command pacing from the server's measured round trip
+
+Each command the TaskManager sends is matched with the next prompt, and the time between is the
+server's latency for it.  With adaptive pacing the wait after a command follows that latency,
+between the configured minimum and the task's own duration, and the commands that have not been
+answered are tokens taken from a bucket: when it is empty, nothing more is sent until a prompt
+returns one.  The server's own QUEUE count from MSDP, when it has one, takes tokens too.
+"""
+import bisect
+from collections import deque
+from typing import Optional
+
+# upper bounds of the latency histogram buckets, in ms
+LATENCY_BUCKETS = (25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, float("inf"))
+
+
+class Pacer:
+    def __init__(self, adaptive: bool = False, min_dur: float = 0.25, max_queue: int = 2):
+        self.adaptive: bool = adaptive
+        self.min_dur: float = min_dur
+        self.max_queue: int = max_queue
+
+        # send times of the commands waiting for a prompt, oldest first
+        self.sent: deque[float] = deque()
+        self.server_queue: int = 0
+
+        self.latency: float = 0
+        self.samples: deque[float] = deque(maxlen=500)
+        self.histogram: list[int] = [0] * len(LATENCY_BUCKETS)
+        self.lost: int = 0
+
+    @property
+    def outstanding(self) -> int:
+        return max(len(self.sent), self.server_queue)
+
+    @property
+    def stale_after(self) -> float:
+        """A command still unanswered after this long is not waited for"""
+        return max(2.0, 4 * self.latency)
+
+    def command_sent(self, now: float):
+        self.expire(now)
+        self.sent.append(now)
+
+    def prompt_received(self, now: float):
+        self.expire(now)
+        if not self.sent:
+            return
+
+        latency = now - self.sent.popleft()
+        self.latency = latency if not self.samples else 0.8 * self.latency + 0.2 * latency
+        self.samples.append(latency)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency * 1000)] += 1
+
+    def expire(self, now: float):
+        while self.sent and now - self.sent[0] > self.stale_after:
+            self.sent.popleft()
+            self.lost += 1
+
+    def next_expiry(self) -> Optional[float]:
+        return self.sent[0] + self.stale_after if self.sent else None
+
+    def can_send(self) -> bool:
+        return not self.adaptive or self.outstanding < self.max_queue
+
+    def duration(self, dur: float) -> float:
+        """How long to wait after sending a task with this duration"""
+        if not self.adaptive or not self.samples:
+            return dur
+        return min(dur, max(self.min_dur, self.latency))
+
+    def percentiles(self, *pcts: float) -> list[float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0 for _ in pcts]
+        return [ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in pcts]
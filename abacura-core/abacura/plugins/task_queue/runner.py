@@ -4,13 +4,14 @@ Command Queue running routines
 Tracks last command, calculates delay, and issues commands in priority order,
 depending on the combat situation.
 """
-from abacura.plugins import command, Plugin, ticker
+from abacura.mud.options.msdp import MSDPMessage
+from abacura.plugins import command, Plugin
+from abacura.plugins.events import event, AbacuraMessage
 from abacura.plugins.task_queue import CQMessage
+from abacura.plugins.task_queue.pacing import Pacer, LATENCY_BUCKETS
 
 from abacura.plugins.task_queue import _DEFAULT_PRIORITY, _DEFAULT_DURATION
-from abacura.utils.renderables import tabulate, AbacuraPanel
-
-_RUNNER_INTERVAL: float = 0.1
+from abacura.utils.renderables import tabulate, AbacuraPanel, AbacuraPropertyGroup, Group
 
 
 class QueueRunner(Plugin):
@@ -19,7 +20,14 @@ class QueueRunner(Plugin):
     def __init__(self):
         super().__init__()
         self.cq.set_command_inserter(self.insert_command)
-        #self.add_ticker(_RUNNER_INTERVAL, callback_fn=self.cq.run_tasks, repeats=-1, name="Queue Runner")
+        self.cq.set_change_notifier(self.queue_changed)
+        # the task queue widget redraws once a frame however many tasks are sent or added
+        self.defer_event(CQMessage.event_type)
+
+        option = self.config.get_specific_option
+        self.cq.pacer = Pacer(adaptive=option(self.session.name, "adaptive_pacing", False),
+                              min_dur=option(self.session.name, "pacing_min_duration", 0.25),
+                              max_queue=option(self.session.name, "pacing_max_queue", 2))
 
     def insert_command(self, cmd: str):
         self.session.player_input(cmd, echo_color="orange1")
@@ -36,14 +44,46 @@ class QueueRunner(Plugin):
         tbl = tabulate(rows, headers=("ID", "Queue", "Command", "Prior", "Priority", "Duration", "Delay", "Insertable"),
                        title=f"Queued Commands",
                        float_format="4.1f")
-        self.output(AbacuraPanel(tbl, title=f"{q or 'All Queues'}"))
+        if q:
+            self.output(AbacuraPanel(tbl, title=q))
+            return
+
+        self.output(AbacuraPanel(Group(tbl, *self.pacing()), title="All Queues"))
+
+    def pacing(self) -> list:
+        pacer = self.cq.pacer
+        p50, p90, p99 = pacer.percentiles(50, 90, 99)
+        properties = {"Mode": f"adaptive, {pacer.min_dur:.2f}s - task duration" if pacer.adaptive else "task duration",
+                      "Latency": f"{pacer.latency * 1000:.0f}ms",
+                      "p50 / p90 / p99": f"{p50 * 1000:.0f}ms / {p90 * 1000:.0f}ms / {p99 * 1000:.0f}ms",
+                      "Unanswered": f"{len(pacer.sent)}, server queue {pacer.server_queue}, limit {pacer.max_queue}",
+                      "Not Answered": pacer.lost}
 
-    @ticker(seconds=_RUNNER_INTERVAL, name="Queue Runner", repeats=-1)
-    def queue_runner(self):
-        self.cq.run_tasks()
+        total = sum(pacer.histogram) or 1
+        rows = []
+        lower = 0
+        for upper, count in zip(LATENCY_BUCKETS, pacer.histogram):
+            if count:
+                label = f"{lower}-{upper}ms" if upper != float("inf") else f"{lower}ms+"
+                rows.append((label, count, "#" * max(1, round(40 * count / total))))
+            lower = upper
+
+        return [AbacuraPropertyGroup(properties, "Pacing"), tabulate(rows, headers=["Latency", "Commands", ""])]
+
+    def queue_changed(self):
         cqm = CQMessage(tasks=self.cq.tasks, next_command_delay=self.cq.next_command_delay)
         self.dispatch(cqm)
 
+    @event("core.msdp.*")
+    def msdp_changed(self, message: MSDPMessage):
+        if message.subtype == "QUEUE":
+            self.cq.server_queue(int(message.value) if str(message.value).isdigit() else 0)
+        self.cq.msdp_changed(message.subtype)
+
+    @event("core.prompt", priority=1)
+    def prompt_received(self, _message: AbacuraMessage):
+        self.cq.prompt_received()
+
     @command(name="queue")
     def queue_info(self, queue_name: str = '', cmd: str = '', _flush: bool = False,
                    _priority: int = _DEFAULT_PRIORITY, _duration: float = _DEFAULT_DURATION, _delay: int = 0):
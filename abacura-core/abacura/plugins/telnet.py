@@ -1,21 +1,41 @@
 import asyncio
+from datetime import datetime
 from textual import log
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from abacura.mud.options import GA, TelnetOption
+from abacura.mud.options import IAC, DO, DONT, WILL, WONT, TelnetOption
+from abacura.mud.options.mccp import MCCP2Option
 from abacura.mud.options.ttype import TerminalTypeOption
-from abacura.plugins import Plugin
+from abacura.mud.network import NetworkThread
+from abacura.mud.recording import SessionRecorder
+from abacura.mud.telnet import TelnetParser, LineDecoder, LINES, PROMPT, COMMAND, SUBNEGOTIATION, COMPRESSION
+from abacura.mud.transport import OutboundTransport
+from abacura.plugins import Plugin, command
 from abacura.plugins.events import AbacuraMessage
+from abacura.utils import human_format
+from abacura.utils.renderables import AbacuraPropertyGroup, AbacuraPanel, Group, Text
+
+READ_SIZE = 65536
+ECHO = 1
+NAWS = 31
+
 
 class TelnetPlugin(Plugin):
     """Handles telnet connectivity"""
     def __init__(self):
         super().__init__()
         self.options: dict[int, TelnetOption] = {}
-        self.poll_timeout = 0.001
+        self.poll_timeout = 0.01
         self.go_ahead = self.config.get_specific_option(self.session.name, "ga")
+        self.mccp = self.config.get_specific_option(self.session.name, "mccp", True)
+        self.outbound_queue_size = self.config.get_specific_option(self.session.name, "outbound_queue_size", 65536)
+        self.max_line_length = self.config.get_specific_option(self.session.name, "max_line_length", 16384)
+        self.network_thread = self.config.get_specific_option(self.session.name, "network_thread", False)
+        self.network: Optional[NetworkThread] = None
         self.connected = False
-        self.outb = b''
+        self.parser: TelnetParser = TelnetParser(self.max_line_length)
+        self.line_decoder: LineDecoder = LineDecoder()
+        self.recorder: Optional[SessionRecorder] = None
 
     # TODO: Need a better way of handling this, possibly an autoloader
     def register_options(self, handlers: list[TelnetOption]):
@@ -24,17 +44,24 @@ class TelnetPlugin(Plugin):
         for handler in handlers:
             self.options[handler.code] = handler
 
-        ttype = TerminalTypeOption(self.session.writer)
+        ttype = TerminalTypeOption(self.session.transport)
         self.options[ttype.code] = ttype
 
-    # TODO move this into a separate thing, it's getting too long
+        mccp = MCCP2Option(self.session.transport, enabled=self.mccp)
+        self.options[mccp.code] = mccp
+
     async def telnet_client(self, host: str, port: int, handlers: list[TelnetOption]) -> None:
         """async worker to handle input/output on socket"""
 
         log.info(f"Session {self.session.name} connecting to {host} {port} with {handlers}")
+        if self.network_thread:
+            await self.threaded_telnet_client(host, port, handlers)
+            return
+
         try:
             reader, writer = await asyncio.open_connection(host, port)
             self.session.writer = writer
+            self.session.transport = OutboundTransport(writer, max_queue=self.outbound_queue_size)
             self.session.connected = True
             self.connected = True
         except TimeoutError:
@@ -48,133 +75,252 @@ class TelnetPlugin(Plugin):
 
         self.register_options(handlers)
 
+        if self.config.get_specific_option(self.session.name, "record", False):
+            self.start_recording()
+
+        parser = self.reset_parser()
+
+        # a recording left open when the connection drops would lose its tail and gzip trailer
+        try:
+            while self.connected is True:
+
+                # Read whatever is available and let the parser find the IAC sequences.
+                # If a partial line is waiting we use wait_for() so we can work with muds that don't use GA
+                try:
+                    if self.go_ahead or not parser.pending:
+                        data = await reader.read(READ_SIZE)
+                    else:
+                        data = await asyncio.wait_for(reader.read(READ_SIZE), timeout=self.poll_timeout)
+                except BrokenPipeError:
+                    self.output("[bold red]# Lost connection to server.", markup=True)
+                    self.connected = False
+                    return
+                except ConnectionResetError:
+                    self.output("[bold red]# Connection reset by peer.", markup=True)
+                    self.connected = False
+                    return
+                except asyncio.TimeoutError:
+                    # must come before OSError, TimeoutError is a subclass of it
+                    self.output(self.line_decoder.decode_line(parser.flush_line()), ansi=True)
+                    continue
+                except OSError:
+                    self.output("[bold red]# No route to host? OS Error.", markup=True)
+                    self.connected = False
+                    return
+
+                # Empty string means we lost our connection
+                if data == b'':
+                    self.session.show_error("Lost connection to server.")
+                    self.connected = False
+                    return
+
+                if self.recorder is not None:
+                    self.recorder.record(data)
 
-        while self.connected is True:
+                self.handle_events(self.line_decoder.decode_events(parser.feed(data)))
+        finally:
+            self.stop_recording()
 
-            # We read one character at a time so that we can find IAC sequences
-            # We use wait_for() so we can work with muds that don't use GA
+    async def threaded_telnet_client(self, host: str, port: int, handlers: list[TelnetOption]) -> None:
+        """telnet_client with socket reads, parsing and line decoding on a NetworkThread"""
+        network = NetworkThread(self.session.name, self.handle_network_events, max_line=self.max_line_length,
+                                read_size=READ_SIZE, max_queue=self.outbound_queue_size)
+        network.start()
+        try:
             try:
-                if self.go_ahead:
-                    data = await reader.read(1)
-                else:
-                    data = await asyncio.wait_for(reader.read(1), timeout=self.poll_timeout)
-            except BrokenPipeError:
-                self.output("[bold red]# Lost connection to server.", markup=True)
-                self.connected = False
-                return
-            except ConnectionResetError:
-                self.output("[bold red]# Connection reset by peer.", markup=True)
-                self.connected = False
+                await network.connect(host, port)
+            except TimeoutError:
+                log.warning(f"Connection timeout from {host}:{port}")
+                self.session.show_error("Connection timeout {host}:{port}")
                 return
-            except OSError:
-                self.output("[bold red]# No route to host? OS Error.", markup=True)
-                self.connect = False
+            except ConnectionRefusedError:
+                log.warning(f"Connection refused from {host}:{port}")
+                self.session.show_error("Connection refused {host}:{port}")
                 return
-            except asyncio.TimeoutError:
-                if len(self.outb) > 0:
-                    self.output(self.outb.decode("UTF-8", errors="ignore").replace("\r", " ").replace("\t", "        "), ansi=True)
-                    self.outb = b''
-                    self.poll_timeout = 0.001
-                else:
-                    if self.poll_timeout < 0.05:
-                        self.poll_timeout *= 2
-                        log.debug(f"timeout {self.poll_timeout}")
-                continue
-
-            # Empty string means we lost our connection
-            if data == b'':
-                self.session.show_error("Lost connection to server.")
-                self.connected = False
-
-            # End of a MUD line in buffer, send for processing
-            elif data == b'\n':
-                self.output(self.outb.decode("UTF-8", errors="ignore").replace("\r", " ").replace("\t", "        "), ansi=True)
-                self.outb = b''
-
-            # handle IAC sequences
-            elif data == b'\xff':
-                data = await reader.read(1)
-
-                # IAC DO
-                if data == b'\xfd':
-                    data = await reader.read(1)
-
-                    if ord(data) in self.options:
-                        log.debug(f"IAC DO for {self.options[ord(data)].name}")
-                        self.options[ord(data)].do()
-                    else:
-                        if data == b'\x1f':
-                            # IAC WON'T NAWS
-                            writer.write(b'\xff\xfc\x1f')
-                            #self.output("IAC WON'T NAWS")
-                        else:
-                            pass
-                            #self.output(f"IAC DO {ord(data)}")
-
-                # IAC DONT
-                if data == b'\xfe':
-                    data = await reader.read(1)
-                    if ord(data) in self.options:
-                        log.debug(f"IAC DONT for {self.options[ord(data)].name}")
-                        self.options[ord(data)].dont()
-                # IAC WILL
-                elif data == b'\xfb':
-                    data = await reader.read(1)
-                    if ord(data) in self.options:
-                        log.debug(f"IAC WILL for {self.options[ord(data)].name}")
-                        self.options[ord(data)].will()
-                    elif ord(data) == 1:
-                        self.dispatch(AbacuraMessage(event_type="core.password_mode", value="on"))
-                    else:
-                        writer.write(b'\xff\xfb' + data)
-                        log.debug(f"IAC WILL for Unknown ({ord(data)})")
-
-                # IAC WONT
-                elif data == b'\xfc':
-                    data = await reader.read(1)
-                    #self.output(f"IAC WONT {data}")
-                    if ord(data) in self.options:
-                        log.debug(f"IAC WILL for {self.options[ord(data)].name}")
-                        self.options[ord(data)].wont()
-                    elif ord(data) == 1:
-                        self.dispatch(AbacuraMessage(event_type="core.password_mode", value="off"))
-                # SB
-                elif data == b'\xfa':
-                    c = await reader.read(1)
-                    data = c
-                    buf = b''
-                    while c != b'\xf0':
-                        buf = buf + c
-                        c = await reader.read(1)
-                    if ord(data) in self.options:
-                        log.debug(f"IAC SB for {self.options[ord(data)].name}")
-                        self.options[ord(data)].sb(buf)
-                    else:
-                        log.debug(f"IAC SB for Unknown ({ord(data)})")
 
-                # TTYPE
-                #elif data == b'\x18':
-                #    writer.write(b'{IAC}')
-                #    #self.output(f"IAC TTYPE")
+            self.network = network
+            self.parser = network.parser
+            self.line_decoder = network.line_decoder
+            self.session.transport = network.transport
+            self.session.connected = True
+            self.connected = True
+
+            self.register_options(handlers)
+
+            if self.config.get_specific_option(self.session.name, "record", False):
+                self.start_recording()
+
+            reason = await network.read(poll_timeout=None if self.go_ahead else self.poll_timeout)
+            self.session.show_error(reason)
+            self.connected = False
+        finally:
+            network.stop()
+            self.stop_recording()
 
-                # NAWS
-                elif data == b'\x1f':
-                    #self.output(f"IAC NAWS")
-                    pass
+    def handle_network_events(self, events: list[tuple], data: bytes):
+        """Events from the NetworkThread, with the raw chunk while recording"""
+        if data and self.recorder is not None:
+            self.recorder.record(data)
 
-                # telnet GA sequence, likely end of prompt
-                elif data == GA:
-                    self.output(self.outb.decode("UTF-8", errors="ignore"), ansi=True)
-                    self.dispatch(AbacuraMessage("core.prompt", self.outb.decode("UTF-8", errors="ignore")))
-                    # self.output("")
+        self.handle_events(events)
 
-                    self.outb = b''
+    def start_recording(self, filename: str = '') -> SessionRecorder:
+        """Record the raw inbound stream, by default into the session data directory"""
+        self.stop_recording()
+        if not filename:
+            recordings = self.config.data_directory(self.session.name).joinpath("recordings")
+            filename = recordings.joinpath(datetime.now().strftime(f"{self.session.name}-%Y%m%d-%H%M%S.rec.gz"))
 
-                # IAC UNKNOWN
+        self.recorder = SessionRecorder(filename)
+        if self.network is not None:
+            self.network.record = True
+        return self.recorder
+
+    def stop_recording(self) -> Optional[SessionRecorder]:
+        recorder, self.recorder = self.recorder, None
+        if self.network is not None:
+            self.network.record = False
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    def reset_parser(self) -> TelnetParser:
+        """Start a fresh parser for a new connection or replay"""
+        self.parser = TelnetParser(self.max_line_length)
+        self.line_decoder = LineDecoder()
+        return self.parser
+
+    def handle_events(self, events: list[tuple]):
+        """Process the decoded lines, prompts and option traffic from a chunk of the stream"""
+        for evt in events:
+            kind = evt[0]
+
+            # Ends of MUD lines, send for processing
+            if kind == LINES:
+                for line in evt[1]:
+                    self.output(line, ansi=True)
+
+            # telnet GA sequence, likely end of prompt
+            elif kind == PROMPT:
+                prompt = evt[1]
+                self.output(prompt, ansi=True)
+                self.dispatch(AbacuraMessage("core.prompt", prompt))
+
+            elif kind == COMMAND:
+                self.handle_command(evt[1], evt[2])
+
+            elif kind == COMPRESSION:
+                self.handle_compression(evt[1])
+
+            elif kind == SUBNEGOTIATION:
+                sb = evt[1]
+                if len(sb) == 0:
+                    continue
+
+                # option handlers expect the option byte first and the IAC of IAC SE last
+                if sb[0] in self.options:
+                    log.debug(f"IAC SB for {self.options[sb[0]].name}")
+                    self.options[sb[0]].sb(sb + IAC)
                 else:
-                    log.debug(f"IAC unknown {data}")
-                    #self.output(f"IAC UNKNOWN {ord(data)}")
+                    log.debug(f"IAC SB for Unknown ({sb[0]})")
+
+    def handle_compression(self, started: bool):
+        """MCCP2 stream started or ended"""
+        if started:
+            log.info(f"MCCP2 compression started for {self.session.name}")
+            return
+
+        if self.parser.compression_error:
+            self.session.show_error(f"MCCP2 stream error: {self.parser.compression_error}", title="Telnet Error")
+            self.options[MCCP2Option.code].refuse()
+            self.parser.compression_error = ''
+        else:
+            log.info(f"MCCP2 compression ended for {self.session.name}")
 
-            # Catch everything else in our buffer and hold it
+    def handle_command(self, verb: int, option: int):
+        """Handle IAC WILL/WONT/DO/DONT negotiation"""
+        writer = self.session.transport
+
+        # IAC DO
+        if verb == DO[0]:
+            if option in self.options:
+                log.debug(f"IAC DO for {self.options[option].name}")
+                self.options[option].do()
+            elif option == NAWS:
+                # IAC WON'T NAWS
+                writer.write(IAC + WONT + bytes([NAWS]))
+
+        # IAC DONT
+        elif verb == DONT[0]:
+            if option in self.options:
+                log.debug(f"IAC DONT for {self.options[option].name}")
+                self.options[option].dont()
+
+        # IAC WILL
+        elif verb == WILL[0]:
+            if option in self.options:
+                log.debug(f"IAC WILL for {self.options[option].name}")
+                self.options[option].will()
+            elif option == ECHO:
+                self.dispatch(AbacuraMessage(event_type="core.password_mode", value="on"))
             else:
-                self.outb = self.outb + data
+                writer.write(IAC + WILL + bytes([option]))
+                log.debug(f"IAC WILL for Unknown ({option})")
+
+        # IAC WONT
+        elif verb == WONT[0]:
+            if option in self.options:
+                log.debug(f"IAC WONT for {self.options[option].name}")
+                self.options[option].wont()
+            elif option == ECHO:
+                self.dispatch(AbacuraMessage(event_type="core.password_mode", value="off"))
+
+    @command(name="telnet")
+    def telnet_command(self):
+        """Show telnet connection, MCCP2 compression and outbound queue statistics"""
+        parser = self.parser
+        mccp: MCCP2Option | None = self.options.get(MCCP2Option.code, None)
+
+        if parser.compressing:
+            status = "compressing"
+        elif mccp is not None and mccp.negotiations:
+            status = "negotiated, not compressing"
+        else:
+            status = "enabled" if self.mccp else "disabled"
+
+        stats = {"Connected": self.connected,
+                 "Bytes Received": human_format(parser.bytes_received),
+                 "MCCP2": status,
+                 "Compressed Bytes": human_format(parser.compressed_bytes),
+                 "Decompressed Bytes": human_format(parser.decompressed_bytes),
+                 "Compression Ratio": f"{parser.compression_ratio:.2f}",
+                 "Bytes Saved": human_format(parser.bytes_saved),
+                 "Long Lines Split": f"{parser.lines_split} (over {self.max_line_length} bytes)"}
+
+        groups = [AbacuraPropertyGroup(stats, title="Connection")]
+
+        network = self.network
+        if network is not None:
+            handoffs = network.handoffs or 1
+            thread = {"Queue Depth": network.queue_depth,
+                      "Peak Queue Depth": network.peak_queue_depth,
+                      "Chunks Handed Off": network.handoffs,
+                      "Drains": network.drains,
+                      "Handoff Latency": f"{network.handoff_latency / handoffs * 1000:.2f}ms",
+                      "Peak Handoff Latency": f"{network.peak_handoff_latency * 1000:.2f}ms",
+                      "Last Handoff Latency": f"{network.last_handoff_latency * 1000:.2f}ms"}
+            groups += [Text(), AbacuraPropertyGroup(thread, title="Network Thread")]
+
+        transport = self.session.transport
+        if transport is not None:
+            outbound = {"Queue Depth": f"{transport.queue_depth} / {transport.max_queue}",
+                        "Peak Queue Depth": transport.peak_queue_depth,
+                        "Bytes Sent": human_format(transport.bytes_written),
+                        "Bytes/sec": f"{transport.bytes_per_second:.1f}",
+                        "Writes": transport.writes,
+                        "Socket Writes": transport.flushes,
+                        "Drains Awaited": transport.drains,
+                        "Error": repr(transport.error) if transport.error else ""}
+            groups += [Text(), AbacuraPropertyGroup(outbound, title="Outbound")]
+
+        self.output(AbacuraPanel(Group(*groups), title="Telnet"))
@@ -1,8 +1,17 @@
+"""
+Tickers run a callback every so many seconds
+
+The TickerManager keeps tickers in a heap ordered by when they are due, on the monotonic clock,
+and asks the event loop to wake it when the first one is due.  Nothing runs between ticks.
+"""
 from __future__ import annotations
 
+import asyncio
+import heapq
 import inspect
-from datetime import datetime, timedelta
-from typing import List, TYPE_CHECKING, Callable
+import time
+from itertools import count
+from typing import List, TYPE_CHECKING, Callable, Dict, Optional
 
 if TYPE_CHECKING:
     pass
@@ -17,26 +26,52 @@ class Ticker:
         self.seconds: float = seconds
         self.repeats: int = repeats
         self.name: str = name
-        self.last_tick = datetime.utcnow()
-        self.next_tick = self.last_tick + timedelta(seconds=self.seconds)
+        self.due: float = time.monotonic() + seconds
+        self.active: bool = False
+        # the heap entry that is current, older entries for this ticker are skipped
+        self.entry: int = -1
+
+        # how late each tick ran, in seconds
+        self.ticks: int = 0
+        self.drift: float = 0
+        self.max_drift: float = 0
+        self.total_drift: float = 0
+
+    @property
+    def mean_drift(self) -> float:
+        return self.total_drift / self.ticks if self.ticks else 0
 
-    def tick(self) -> datetime:
-        now = datetime.utcnow()
-        if self.next_tick <= now and self.repeats != 0:
-            # try to keep ticks aligned , so use the last target (next_tick) as the basis for adding the interval
-            self.next_tick = max(now, self.next_tick + timedelta(seconds=self.seconds))
-            self.last_tick = now
-            self.callback()
-            if self.repeats > 0:
-                self.repeats -= 1
+    def advance(self, now: float):
+        """Record how late this tick is and work out the next one"""
+        self.drift = now - self.due
+        self.max_drift = max(self.max_drift, self.drift)
+        self.total_drift += self.drift
+        self.ticks += 1
 
-        return self.next_tick
+        # keep ticks aligned with the first, unless we are more than a tick behind
+        self.due += self.seconds
+        if self.due <= now:
+            self.due = now + self.seconds
+
+        if self.repeats > 0:
+            self.repeats -= 1
 
 
 class TickerManager:
 
     def __init__(self):
-        self.tickers: List[Ticker] = []
+        self._by_name: Dict[str, Ticker] = {}
+        self._heap: list[tuple[float, int, Ticker]] = []
+        self._seq = count()
+        # heap entries of tickers that were removed, dropped when they reach the top
+        self._removed: int = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._handle_due: float = 0
+        self.wakeups: int = 0
+
+    @property
+    def tickers(self) -> List[Ticker]:
+        return sorted(self._by_name.values(), key=lambda t: t.due)
 
     def register_object(self, obj: object):
         # self.unregister_object(obj)  # prevent duplicates
@@ -47,17 +82,101 @@ class TickerManager:
                 self.add(t)
 
     def unregister_object(self, obj: object):
-        self.tickers = [t for t in self.tickers if t.source != obj]
+        for ticker in [t for t in self._by_name.values() if t.source == obj]:
+            self._discard(ticker)
+        self._arm()
 
     def add(self, ticker: Ticker):
-        self.tickers = [t for t in self.tickers if t.name != ticker.name]
-        self.tickers.append(ticker)
+        self._discard(self._by_name.get(ticker.name))
+        if ticker.repeats == 0:
+            return
+
+        ticker.active = True
+        self._by_name[ticker.name] = ticker
+        self._push(ticker)
+        self._arm()
+
+    def _push(self, ticker: Ticker):
+        ticker.entry = next(self._seq)
+        heapq.heappush(self._heap, (ticker.due, ticker.entry, ticker))
+
+    @staticmethod
+    def _live(entry: tuple[float, int, Ticker]) -> bool:
+        return entry[2].active and entry[2].entry == entry[1]
 
     def remove(self, name: str):
-        self.tickers = [t for t in self.tickers if name == '' or t.name != name]
+        if name == '':
+            for ticker in list(self._by_name.values()):
+                self._discard(ticker)
+        else:
+            self._discard(self._by_name.get(name))
+        self._arm()
+
+    def _discard(self, ticker: Optional[Ticker]):
+        if ticker is None or not ticker.active:
+            return
+
+        ticker.active = False
+        del self._by_name[ticker.name]
+        self._removed += 1
+
+        # rebuild rather than let removed entries pile up
+        if self._removed > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if self._live(entry)]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def _arm(self):
+        """Ask the event loop to call process_tick when the first ticker is due"""
+        heap = self._heap
+        while heap and not self._live(heap[0]):
+            heapq.heappop(heap)
+            self._removed -= 1
+
+        if not heap:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            return
+
+        due = heap[0][0]
+        if self._handle is not None:
+            if self._handle_due == due:
+                return
+            self._handle.cancel()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # armed by the next change made from the event loop
+            self._handle = None
+            return
+
+        self._handle_due = due
+        self._handle = loop.call_later(max(0.0, due - time.monotonic()), self.process_tick)
 
     def process_tick(self):
-        for ticker in self.tickers:
-            ticker.tick()
-            if ticker.repeats == 0:
-                self.tickers.remove(ticker)
+        """Run the tickers that are due"""
+        self._handle = None
+        self.wakeups += 1
+        heap = self._heap
+        now = time.monotonic()
+        try:
+            while heap and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                ticker = entry[2]
+                if not self._live(entry):
+                    self._removed -= 1
+                    continue
+
+                ticker.advance(now)
+                if ticker.repeats == 0:
+                    ticker.active = False
+                    del self._by_name[ticker.name]
+                else:
+                    self._push(ticker)
+
+                # the callback may add or remove tickers, including this one
+                ticker.callback()
+        finally:
+            self._arm()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from time import monotonic
 from typing import TYPE_CHECKING, Callable
 from rich.table import Table
 
@@ -20,9 +21,12 @@ class TickerCommand(Plugin):
             if isinstance(ticker.source, TickerCommand):
                 callback_name = f"'{ticker.commands}'"
 
-            rows.append((ticker.name, callback_name, source, ticker.repeats, ticker.seconds, ticker.next_tick))
+            rows.append((ticker.name, callback_name, source, ticker.repeats, ticker.seconds,
+                         ticker.due - monotonic(), ticker.ticks, ticker.mean_drift * 1000, ticker.max_drift * 1000))
 
-        tbl = tabulate(rows, headers=["Name", "Callback", "Source", "Repeats", "Seconds", "Next Tick"])
+        headers = ["Name", "Callback", "Source", "Repeats", "Seconds", "Next In", "Ticks", "Drift ms", "Max ms"]
+        caption = f" {self.director.ticker_manager.wakeups} wakeups"
+        tbl = tabulate(rows, headers=headers, caption=caption, float_format="5.1f")
         self.output(AbacuraPanel(tbl, title="Registered Tickers"))
 
     @command
@@ -2,7 +2,9 @@
 from __future__ import annotations
 
 # TODO: screen and widget definitions should go under the hierarchy, not in __init__
-from typing import TYPE_CHECKING
+import asyncio
+from time import monotonic
+from typing import TYPE_CHECKING, Optional
 
 from textual.app import ComposeResult
 from textual.containers import Container
@@ -13,6 +15,7 @@ from textual import events
 from abacura.widgets import CommsLog, InputBar
 from abacura.widgets.debug import DebugDock
 from abacura.widgets.footer import AbacuraFooter
+from abacura.widgets.scrollback import Scrollback
 from abacura.widgets.sidebar import Sidebar
 
 if TYPE_CHECKING:
@@ -20,6 +23,83 @@ if TYPE_CHECKING:
 
 
 class SessionRichLog(RichLog):
+    """RichLog for session output that can batch writes into one update per frame"""
+
+    def __init__(self, *args, frame_budget: float = 1 / 60, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frame_budget = frame_budget
+        self._pending: list = []
+        self._pending_since: float = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # the first pending renderable takes the place of the last one written
+        self._replace_written: bool = False
+        # strips added by the last write, so it can be replaced
+        self._last_write_lines: int = 0
+        self.reset_flush_stats()
+
+    def reset_flush_stats(self):
+        self.flushes: int = 0
+        self.lines_flushed: int = 0
+        self.peak_lines_per_flush: int = 0
+        self.flush_latency: float = 0
+        self.peak_flush_latency: float = 0
+        self.last_flush_latency: float = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def queue(self, renderable):
+        """Write a renderable at the next flush, no more than frame_budget seconds from now"""
+        if not self._pending:
+            self._pending_since = monotonic()
+            self._flush_handle = asyncio.get_running_loop().call_later(self.frame_budget, self.flush)
+        self._pending.append(renderable)
+
+    def replace_last(self, renderable):
+        """Replace the last renderable written or queued, at the next flush"""
+        if self._pending:
+            self._pending[-1] = renderable
+            return
+
+        self.queue(renderable)
+        self._replace_written = True
+
+    def write(self, content, *args, **kwargs):
+        written = self._start_line + len(self.lines)
+        super().write(content, *args, **kwargs)
+        self._last_write_lines = self._start_line + len(self.lines) - written
+        return self
+
+    def flush(self):
+        """Write everything queued in a single screen update, scrolling at most once"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        scroll_end = self.viewing_end()
+        if self._replace_written:
+            self._replace_written = False
+            if 0 < self._last_write_lines <= len(self.lines):
+                del self.lines[-self._last_write_lines:]
+                self._line_cache.clear()
+        with self.app.batch_update():
+            for renderable in pending:
+                self.write(renderable, scroll_end=False)
+            if scroll_end:
+                self.scroll_end(animate=False)
+
+        latency = monotonic() - self._pending_since
+        self.flushes += 1
+        self.lines_flushed += len(pending)
+        self.peak_lines_per_flush = max(self.peak_lines_per_flush, len(pending))
+        self.flush_latency += latency
+        self.peak_flush_latency = max(self.peak_flush_latency, latency)
+        self.last_flush_latency = latency
 
     def on_resize(self, _e: events.Resize):
         # animate this to reduce "flicker" when toggling commslog, debuglog
@@ -32,7 +112,8 @@ class SessionRichLog(RichLog):
 class SessionScreen(Screen):
     """Default Screen for sessions"""
 
-    MAX_LINES: int = 10000
+    # older lines are paged in from the ring log by the scrollback pane
+    MAX_LINES: int = 2000
 
     BINDINGS = [
         ("pageup", "pageup", "PageUp"),
@@ -52,10 +133,13 @@ class SessionScreen(Screen):
         self.id = f"screen-{name}"
         self.tlid = f"output-{name}"
         # TODO: wrap should be a config file field option
+        frame_budget = session.config.get_specific_option(name, "output_batch_ms", 16) / 1000
         self.tl: SessionRichLog = SessionRichLog(highlight=False, markup=False, wrap=True, auto_scroll=False,
                                                  name=self.tlid, classes="mudoutput", id=self.tlid,
-                                                 max_lines=self.MAX_LINES)
+                                                 max_lines=self.MAX_LINES, frame_budget=frame_budget)
         self.tl.can_focus = False
+        self.scrollback: Scrollback = Scrollback(session.ring_buffer, id=f"scrollback-{name}")
+        self.scrollback.display = False
         self.footer = None
 
     def compose(self) -> ComposeResult:
@@ -68,6 +152,7 @@ class SessionScreen(Screen):
         with Container(id="app-grid"):
             yield Sidebar(id="sidebar", name="sidebar")
             with Container(id="mudoutputs"):
+                yield self.scrollback
                 yield self.tl
             yield InputBar(id="playerinput")
         yield AbacuraFooter(id="footer")
@@ -103,30 +188,39 @@ class SessionScreen(Screen):
         commslog.display = not commslog.display
         self.refresh()
 
-    def action_pageup(self) -> None:
-        # self.tl.auto_scroll = False
-        # self.tl.max_lines = self.MAX_LINES * 2
+    def open_scrollback(self) -> None:
+        """Split the output, with scrollback from the ring log above the live output"""
+        self.scrollback.display = True
+        self.scrollback.open()
 
-        self.tl.scroll_page_up(duration=0.3)
+    def close_scrollback(self) -> None:
+        self.scrollback.display = False
+        self.tl.scroll_end(animate=False)
 
-    def action_pagedown(self) -> None:
-        # if self.tl.scroll_offset.y >= self.tl.virtual_size.height - self.tl.content_size.height:
-            # self.tl.auto_scroll = True
-            # self.tl.max_lines = self.MAX_LINES
+    def action_pageup(self) -> None:
+        if not self.scrollback.display:
+            self.open_scrollback()
+            # the pane is sized and scrolled to its end at the next refresh
+            self.scrollback.call_after_refresh(self.scrollback.scroll_page_up, animate=False)
+        else:
+            self.scrollback.scroll_page_up(animate=False)
 
-        self.tl.scroll_page_down(duration=0.3)
+    def action_pagedown(self) -> None:
+        if not self.scrollback.display:
+            self.tl.scroll_page_down(duration=0.3)
+        elif self.scrollback.at_end():
+            self.close_scrollback()
+        else:
+            self.scrollback.scroll_page_down(animate=False)
 
     def action_scroll_home(self) -> None:
-        # self.tl.auto_scroll = False
-        # self.tl.max_lines = self.MAX_LINES * 2
-
         self.tl.scroll_home(duration=0.3)
 
     def action_scroll_end(self) -> None:
-        # self.tl.auto_scroll = True
-        # self.tl.max_lines = self.MAX_LINES
-
-        self.tl.scroll_end(duration=0.3)
+        if self.scrollback.display:
+            self.close_scrollback()
+        else:
+            self.tl.scroll_end(duration=0.3)
 
 
 class AbacuraWindow(Container):
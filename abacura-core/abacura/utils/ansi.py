@@ -0,0 +1,99 @@
+"""
+Single-pass ANSI tokenizer
+
+One scan of a line produces the plain text and the rich style spans, which is everything needed
+for actions (stripped text), logging and rendering (a rich Text built from the spans without
+parsing the line again).  SGR handling matches rich's AnsiDecoder, but the style that results
+from applying an SGR sequence to the current style is cached, since a MUD uses a small palette.
+"""
+from __future__ import annotations
+
+import re
+from contextlib import suppress
+
+from rich.ansi import SGR_STYLE_MAP
+from rich.color import Color
+from rich.style import Style
+from rich.text import Span, Text
+
+# matches the same escape sequences as abacura.utils.ansi_escape, capturing CSI parameters and final byte
+_ESCAPE = re.compile(r'\x1b(?:\[([0-?]*)[ -/]*([@-~])|[@-Z\\-_])')
+
+_NULL_STYLE = Style.null()
+_SGR_CACHE: dict[tuple[Style, str], Style] = {}
+_SGR_CACHE_SIZE = 4096
+
+
+def _decode_sgr(style: Style, params: str) -> Style:
+    """Apply the codes of one SGR sequence to a style, leniently like rich.ansi.AnsiDecoder"""
+    codes = [min(255, int(code) if code else 0) for code in params.split(";") if code.isdigit() or code == ""]
+    iter_codes = iter(codes)
+    for code in iter_codes:
+        if code == 0:
+            style = _NULL_STYLE
+        elif code in SGR_STYLE_MAP:
+            style += Style.parse(SGR_STYLE_MAP[code])
+        elif code == 38 or code == 48:
+            with suppress(StopIteration):
+                color_type = next(iter_codes)
+                if color_type == 5:
+                    color = Color.from_ansi(next(iter_codes))
+                elif color_type == 2:
+                    color = Color.from_rgb(next(iter_codes), next(iter_codes), next(iter_codes))
+                else:
+                    continue
+                style += Style.from_color(color) if code == 38 else Style.from_color(None, color)
+
+    return style
+
+
+def apply_sgr(style: Style, params: str) -> Style:
+    """Return the style after an SGR sequence with the given parameters"""
+    key = (style, params)
+    try:
+        return _SGR_CACHE[key]
+    except KeyError:
+        pass
+
+    new_style = _decode_sgr(style, params)
+    if len(_SGR_CACHE) < _SGR_CACHE_SIZE:
+        _SGR_CACHE[key] = new_style
+    return new_style
+
+
+def tokenize(line: str) -> tuple[str, list[Span]]:
+    """Split a line into its plain text and the style spans over that text"""
+    if "\x1b" not in line:
+        return line, []
+
+    plain = []
+    spans = []
+    style = _NULL_STYLE
+    position = offset = 0
+    for match in _ESCAPE.finditer(line):
+        start, end = match.span()
+        if start > position:
+            chunk = line[position:start]
+            plain.append(chunk)
+            if style:
+                spans.append(Span(offset, offset + len(chunk), style))
+            offset += len(chunk)
+
+        params, final = match.groups()
+        if final == "m":
+            style = apply_sgr(style, params)
+        position = end
+
+    if position < len(line):
+        chunk = line[position:]
+        plain.append(chunk)
+        if style:
+            spans.append(Span(offset, offset + len(chunk), style))
+
+    return "".join(plain), spans
+
+
+def ansi_to_text(line: str) -> Text:
+    """Like Text.from_ansi for a single line, without the per-code style parsing"""
+    plain, spans = tokenize(line)
+    return Text(plain, spans=spans)
@@ -0,0 +1,162 @@
+"""
+Event loop lag monitor
+
+A probe asks the event loop to call it back every interval and records how late the call came.
+Anything that holds the loop, reading the socket, an action callback, a widget refresh or a
+ticker, delays the probe by as long as it runs.
+
+A watchdog thread notices when the probe has not run for longer than the stall threshold and
+takes the stack of the main thread right then, while the culprit is still running.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_LIBRARIES = tuple(f"{os.sep}{name}{os.sep}" for name in ("textual", "rich", "asyncio"))
+
+
+def _library(filename: str) -> bool:
+    if filename.startswith(_STDLIB) and "site-packages" not in filename:
+        return True
+    return any(lib in filename for lib in _LIBRARIES)
+
+
+# upper bounds of the histogram buckets, in ms
+LAG_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+
+@dataclass
+class Stall:
+    """The loop held for longer than the stall threshold"""
+    started: float
+    stack: list[traceback.FrameSummary] = field(default_factory=list)
+    duration: float = 0
+
+    @property
+    def offender(self) -> str:
+        """The innermost frame outside of python, textual and rich, where the time went"""
+        if not self.stack:
+            return "unknown"
+
+        frame = self.stack[-1]
+        for summary in reversed(self.stack):
+            if not _library(summary.filename):
+                frame = summary
+                break
+
+        module = frame.filename.rsplit(os.sep, 2)
+        return f"{'/'.join(module[-2:])}:{frame.lineno} {frame.name}"
+
+
+class LagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2, history: int = 3000):
+        self.interval: float = interval
+        self.threshold: float = threshold
+
+        self.samples: deque[float] = deque(maxlen=history)
+        self.histogram: list[int] = [0] * len(LAG_BUCKETS)
+        self.max_lag: float = 0
+        self.stalls: deque[Stall] = deque(maxlen=50)
+
+        self._due: float = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._main_thread_id: int = threading.main_thread().ident
+        # written by the watchdog thread, picked up by the probe once the loop is back
+        self._stall: Optional[Stall] = None
+        self._beats: int = 0
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._handle is not None
+
+    def start(self):
+        if self.running:
+            return
+
+        self._stop.clear()
+        self._schedule(asyncio.get_running_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stop.set()
+
+    def reset(self):
+        self.samples.clear()
+        self.histogram = [0] * len(LAG_BUCKETS)
+        self.max_lag = 0
+        self.stalls.clear()
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        self._due = time.monotonic() + self.interval
+        self._handle = loop.call_later(self.interval, self._probe, loop)
+
+    def _probe(self, loop: asyncio.AbstractEventLoop):
+        lag = max(0.0, time.monotonic() - self._due)
+        self._beats += 1
+        self.record(lag)
+
+        stall, self._stall = self._stall, None
+        if stall is not None:
+            stall.duration = lag
+            self.stalls.append(stall)
+
+        self._schedule(loop)
+
+    def record(self, lag: float):
+        self.samples.append(lag)
+        self.histogram[bisect.bisect_left(LAG_BUCKETS, lag * 1000)] += 1
+        self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        """Watchdog thread, takes the main thread's stack once per stall"""
+        captured = -1
+        while not self._stop.wait(self.threshold / 4):
+            beats = self._beats
+            if beats == captured or time.monotonic() - self._due < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+
+            captured = beats
+            self._stall = Stall(started=self._due, stack=traceback.extract_stack(frame))
+
+    @property
+    def current(self) -> float:
+        """The worst lag of the last second"""
+        recent = int(1 / self.interval) or 1
+        return max((self.samples[-n] for n in range(1, min(recent, len(self.samples)) + 1)), default=0)
+
+    def percentiles(self, *pcts: float) -> list[float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0 for _ in pcts]
+        return [ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in pcts]
+
+    def offenders(self) -> list[tuple[str, int, float, float]]:
+        """(offender, stalls, total seconds, worst seconds), the worst first"""
+        found: dict[str, list] = {}
+        for stall in self.stalls:
+            entry = found.setdefault(stall.offender, [stall.offender, 0, 0.0, 0.0])
+            entry[1] += 1
+            entry[2] += stall.duration
+            entry[3] = max(entry[3], stall.duration)
+        return sorted((tuple(e) for e in found.values()), key=lambda e: e[2], reverse=True)
@@ -0,0 +1,211 @@
+"""
+Required literal analysis of regular expressions
+
+Walks the parsed regex (re._parser) to find literal strings that every match must contain, so
+the TriggerEngine can skip the regex for lines that do not contain them, and ring log searches
+can look them up in the full-text index.  The analysis is sound rather than complete: a string
+is only reported if no match can exist without it, and anything not understood contributes nothing.
+
+Each node is summarized as (exact, required).  exact is the small set of strings the node can
+match, when it is known, and required holds strings every match of the node contains.  Runs of
+exact nodes are joined across concatenation, so literals continue through groups and small
+alternations, and an alternation requires the longest substring common to all its branches.
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Optional
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    # python 3.10
+    import sre_constants
+    import sre_parse
+
+# limits on the exact strings carried through concatenation and alternation
+MAX_EXACT = 32
+MAX_EXACT_LENGTH = 256
+
+# the least selective characters in MUD text, for choosing between required literals
+_COMMON = {c: 0.5 for c in "etaoinshrdlu"}
+_COMMON[" "] = 0.25
+
+_ZERO_WIDTH = frozenset([""])
+
+# opcodes added in python 3.11
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+_POSSESSIVE_REPEAT = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+
+_Summary = tuple[Optional[frozenset[str]], set[str]]
+
+
+def _common_substring(a: str, b: str) -> str:
+    """Longest common substring of a and b"""
+    if len(a) > len(b):
+        a, b = b, a
+    best = ""
+    for i in range(len(a)):
+        # only look for substrings longer than the best so far
+        j = i + len(best) + 1
+        while j <= len(a) and a[i:j] in b:
+            best = a[i:j]
+            j += 1
+    return best
+
+
+def _common(strings) -> str:
+    """Longest substring common to every string"""
+    strings = list(strings)
+    common = strings[0]
+    for s in strings[1:]:
+        common = _common_substring(common, s)
+        if not common:
+            break
+    return common
+
+
+def _guaranteed(summary: _Summary) -> set[str]:
+    """Strings every match of a node contains"""
+    exact, required = summary
+    if exact is None:
+        return required
+
+    # the longest common substring, and the common prefix and suffix which may be shorter
+    strings = sorted(exact)
+    common = {_common(strings), os.path.commonprefix(strings),
+              os.path.commonprefix([s[::-1] for s in strings])[::-1]}
+    return required | common - {""}
+
+
+def _sequence(items, flags: int) -> _Summary:
+    required: set[str] = set()
+    # the strings matched by the current run of exact items
+    run: frozenset[str] = _ZERO_WIDTH
+    exact = True
+
+    for op, av in items:
+        item_exact, item_required = _node(op, av, flags)
+        required |= item_required
+
+        if item_exact is not None:
+            joined = frozenset(a + b for a in run for b in item_exact)
+            if len(joined) <= MAX_EXACT and max(map(len, joined)) <= MAX_EXACT_LENGTH:
+                run = joined
+                continue
+
+        # the run of exact items ends here
+        required |= _guaranteed((run, set()))
+        exact = False
+        run = item_exact if item_exact is not None else _ZERO_WIDTH
+
+    if exact:
+        return run, required
+
+    required |= _guaranteed((run, set()))
+    return None, required
+
+
+def _branch(branches, flags: int) -> _Summary:
+    summaries = [_sequence(b, flags) for b in branches]
+
+    if all(exact is not None for exact, _ in summaries):
+        union = frozenset().union(*(exact for exact, _ in summaries))
+        if len(union) <= MAX_EXACT:
+            return union, set()
+
+    # a string is required if every branch guarantees a string containing it
+    common: set[str] = _guaranteed(summaries[0])
+    for summary in summaries[1:]:
+        guaranteed = _guaranteed(summary)
+        common = {_common_substring(c, g) for c in common for g in guaranteed} - {""}
+        if not common:
+            break
+
+    return None, common
+
+
+def _node(op, av, flags: int) -> _Summary:
+    if op is sre_constants.LITERAL:
+        return frozenset([chr(av)]), set()
+
+    if op is sre_constants.AT:
+        # zero width, the items on either side are adjacent
+        return _ZERO_WIDTH, set()
+
+    if op is sre_constants.SUBPATTERN:
+        _group, add_flags, _del_flags, p = av
+        if add_flags & re.IGNORECASE and not flags & re.IGNORECASE:
+            # case insensitive here but the line is searched as is
+            return None, set()
+        return _sequence(p, flags)
+
+    if op is _ATOMIC_GROUP:
+        return _sequence(av, flags)
+
+    if op is sre_constants.BRANCH:
+        return _branch(av[1], flags)
+
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, _POSSESSIVE_REPEAT):
+        low, high, p = av
+        if low == 0:
+            return None, set()
+
+        summary = _sequence(p, flags)
+        exact = summary[0]
+        if exact is not None and low == high and len(exact) == 1:
+            s = next(iter(exact)) * low
+            if len(s) <= MAX_EXACT_LENGTH:
+                return frozenset([s]), set()
+        return None, _guaranteed(summary)
+
+    if op is sre_constants.ASSERT:
+        # a lookaround that must match puts its literals in the line, but consumes nothing
+        direction, p = av
+        return None, _guaranteed(_sequence(p, flags))
+
+    if op is sre_constants.ASSERT_NOT:
+        return _ZERO_WIDTH, set()
+
+    # ANY, IN, NOT_LITERAL, CATEGORY, GROUPREF and anything else
+    return None, set()
+
+
+def required_literals(pattern: str, flags: int = 0) -> set[str]:
+    """Strings that every match of the pattern must contain, empty if none are known"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return set()
+
+    return _guaranteed(_sequence(parsed, parsed.state.flags)) - {""}
+
+
+def selectivity(literal: str) -> float:
+    """Rough score of how rarely a literal occurs, longer literals with uncommon characters score higher"""
+    return sum(_COMMON.get(c, 1.0) for c in literal.lower())
+
+
+def most_selective(literals: set[str]) -> str:
+    return max(literals, key=selectivity, default="")
+
+
+def anchored_prefix(pattern: str, flags: int = 0) -> str:
+    """The literal text a pattern must start with when it begins with ^, otherwise ''"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return ''
+
+    items = list(parsed)
+    if not items or items[0] != (sre_constants.AT, sre_constants.AT_BEGINNING):
+        return ''
+
+    prefix = []
+    for op, av in items[1:]:
+        if op is not sre_constants.LITERAL:
+            break
+        prefix.append(chr(av))
+
+    return "".join(prefix)
@@ -1,32 +1,156 @@
+"""
+Short-term log of output lines in SQLite, overwriting the oldest line once ring_size lines are kept
+
+Lines are written by a thread of their own, so the screen never waits for the disk.  log() hands
+the row to the writer and returns; the writer inserts everything waiting in one transaction with
+executemany.  Reads call flush() first, which waits for the writer to catch up, so a query sees
+every line logged before it.
+
+Searches use a trigram full-text index over the stripped lines, kept in step with the ring by
+triggers, which answers LIKE patterns with three or more characters in a row without reading every
+line.  REGEXP searches are checked only against the lines the index finds for the literal text the
+regex requires.
+
+When the writer falls more than max_pending rows behind, new lines are dropped and counted rather
+than making the screen wait.  A run of repeats of one line is coalesced into its last update.
+"""
+import atexit
+import functools
+import itertools
+import re
 import sqlite3
+import threading
+from collections import deque
 from datetime import datetime
+from pathlib import Path
+
+from textual import log
+
 from abacura.mud import OutputMessage
+from abacura.utils.regex import required_literals
 from typing import Callable, Optional
 import time
 
+# a folded line shows how many times it repeated
+_DISPLAY_MESSAGE = "case when repeats > 1 then message || ' (x' || repeats || ')' else message end"
+
+_INSERT = """insert or replace into ring_log(ring_number, epoch_ns, context, message, stripped, repeats)
+             values(?, ?, ?, ?, ?, 1)"""
+_REPEAT = "update ring_log set epoch_ns = ?, message = ?, stripped = ?, repeats = ? where ring_number = ?"
+
+_REBUILD = "insert into ring_log_fts(ring_log_fts) values('rebuild')"
+
+# the ring rotates by insert or replace, which fires the delete trigger only with recursive_triggers on
+_FTS_TRIGGERS = [
+    """create trigger if not exists ring_log_fts_ai after insert on ring_log begin
+         insert into ring_log_fts(rowid, stripped) values (new.rowid, new.stripped);
+       end""",
+    """create trigger if not exists ring_log_fts_ad after delete on ring_log begin
+         insert into ring_log_fts(ring_log_fts, rowid, stripped) values ('delete', old.rowid, old.stripped);
+       end""",
+    """create trigger if not exists ring_log_fts_au after update of stripped on ring_log begin
+         insert into ring_log_fts(ring_log_fts, rowid, stripped) values ('delete', old.rowid, old.stripped);
+         insert into ring_log_fts(rowid, stripped) values (new.rowid, new.stripped);
+       end"""
+]
+
+_memory_ids = itertools.count()
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and _compile(pattern).search(value) is not None
+
+
+def _indexable(like: str) -> bool:
+    """The trigram index can answer a LIKE pattern with three characters in a row"""
+    return re.search(r"[^%_]{3}", like) is not None
+
+
+def _regex_literals(pattern: str) -> list[str]:
+    """Literals of three or more characters that every match of the regex contains, for the trigram index"""
+    # % and _ are LIKE wildcards, the text between them is still required
+    pieces = (piece for literal in required_literals(pattern) for piece in re.split(r"[%_]", literal))
+    return sorted({piece for piece in pieces if len(piece) >= 3})
+
 
 class RingBufferLogSql:
     def __init__(self, db_filename: str = ':memory:', ring_size: int = 10000,
-                 wal: bool = True, commit_interval: int = 10):
+                 wal: bool = True, max_pending: int = 20000, checkpoint_rows: int = 10000):
 
         self.db_filename = db_filename
         self.ring_size = ring_size
-        self.commit_interval = commit_interval
-        self.conn = sqlite3.connect(db_filename)
+        self.max_pending = max_pending
+        self.checkpoint_rows = checkpoint_rows
         self.rows_logged = 0
         self.log_context_provider: Optional[Callable] = None
 
-        if wal:
-            self.conn.execute("PRAGMA journal_mode=WAL")
+        if db_filename == ':memory:':
+            # the writer's connection must see the same database, and reads must not wait on its locks
+            uri = f"file:ringlog{next(_memory_ids)}?mode=memory&cache=shared"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.conn.execute("PRAGMA read_uncommitted = true")
+            self._connect = lambda: sqlite3.connect(uri, uri=True)
+            self._reader_uri = uri
+        else:
+            self.conn = sqlite3.connect(db_filename, check_same_thread=False)
+            self._connect = lambda: sqlite3.connect(db_filename)
+            self._reader_uri = Path(db_filename).resolve().as_uri() + "?mode=ro"
+            if wal:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("regexp", 2, _regexp, deterministic=True)
 
         # sql = "drop table if exists ring_log"
         # self.conn.execute(sql)
-        sql = "create table if not exists ring_log(ring_number not null primary key, epoch_ns, context, message, stripped)"
+        sql = """create table if not exists ring_log(ring_number not null primary key, epoch_ns, context, message,
+                                                     stripped, repeats not null default 1)"""
         self.conn.execute(sql)
+        columns = [row[1] for row in self.conn.execute("pragma table_info(ring_log)")]
+        if "repeats" not in columns:
+            # ring logs from before repeated lines were folded
+            self.conn.execute("alter table ring_log add column repeats not null default 1")
         self.conn.execute("create index if not exists ring_log_n1 on ring_log(epoch_ns)")
+        self.conn.execute("create index if not exists ring_log_n2 on ring_log(context)")
+
+        indexed = self.conn.execute("select 1 from sqlite_master where name = 'ring_log_fts'").fetchone()
+        self.conn.execute("""create virtual table if not exists ring_log_fts
+                             using fts5(stripped, content='ring_log', content_rowid='rowid', tokenize='trigram')""")
+        for trigger in _FTS_TRIGGERS:
+            self.conn.execute(trigger)
+        self.conn.commit()
 
         self.ring_number = self.get_current_ring_number()
 
+        # (sql, values) waiting for the writer, and how many have been queued and written in all
+        self._pending: deque[tuple[str, tuple]] = deque()
+        self._queued: int = 0
+        self._written: int = 0
+        self._closed: bool = False
+        # set by the writer thread as it exits, for any reason
+        self._stopped: bool = False
+        self._cond = threading.Condition()
+
+        self.batches: int = 0
+        self.rows_written: int = 0
+        self.rows_failed: int = 0
+        self.peak_pending: int = 0
+        self.dropped: int = 0
+        self.coalesced: int = 0
+        self.checkpoints: int = 0
+        self.write_time: float = 0
+
+        self._writer = threading.Thread(target=self._write_rows, name="ringlog-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+        if not indexed and self.ring_number:
+            # index a ring log from before searches were indexed, the first search waits for it
+            self._enqueue(_REBUILD, ())
+
     def get_current_ring_number(self):
         sql = """select ifnull(max(ring_number), 0) 
                    from ring_log 
@@ -39,11 +163,12 @@ class RingBufferLogSql:
         # Pass a function to use to provide additional logging context
         self.log_context_provider = context_provider
 
-    def log(self, message: OutputMessage):
+    def log(self, message: OutputMessage) -> Optional[int]:
+        """Queue a line for the writer, return its ring number or None if it was not logged"""
         log_epoch_ns = time.time_ns()
 
         if type(message.message) not in [str, 'str']:
-            return
+            return None
 
         if self.log_context_provider is not None:
             log_context = self.log_context_provider()
@@ -51,32 +176,192 @@ class RingBufferLogSql:
             log_context = ''
 
         values = (self.ring_number, log_epoch_ns, log_context, message.message, message.stripped)
-        self.conn.execute("insert or replace into ring_log values(?, ?, ?, ?, ?)", values)
+        if not self._enqueue(_INSERT, values):
+            return None
 
+        ring_number = self.ring_number
         self.ring_number = (self.ring_number + 1) % self.ring_size
-
         self.rows_logged += 1
-        if self.rows_logged % self.commit_interval == 0:
-            self.conn.commit()
+        return ring_number
+
+    def log_repeat(self, message: OutputMessage, repeats: int, ring_number: int):
+        """Fold a repeat of a line into its row, the ring number log() returned, keeping the latest text and time"""
+        if type(message.message) not in [str, 'str']:
+            return
+
+        values = (time.time_ns(), message.message, message.stripped, repeats, ring_number)
+        self._enqueue(_REPEAT, values)
+
+    def _enqueue(self, sql: str, values: tuple) -> bool:
+        with self._cond:
+            pending = self._pending
+            if sql is _REPEAT and pending and pending[-1][0] is _REPEAT and pending[-1][1][4] == values[4]:
+                # only the last count of a run of repeats needs writing
+                pending[-1] = (sql, values)
+                self.coalesced += 1
+                return True
+
+            if len(pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+
+            pending.append((sql, values))
+            self._queued += 1
+            self.peak_pending = max(self.peak_pending, len(pending))
+            if len(pending) == 1:
+                self._cond.notify()
+        return True
+
+    def _write_rows(self):
+        """Writer thread, each wakeup writes everything waiting in one transaction"""
+        try:
+            conn = self._connect()
+            conn.execute("PRAGMA recursive_triggers = true")
+            if self.db_filename != ':memory:':
+                # checkpoint from here, not from a commit on the screen's thread
+                conn.execute("PRAGMA synchronous = NORMAL")
+                conn.execute("PRAGMA wal_autocheckpoint = 0")
+        except sqlite3.Error as e:
+            log.error(f"Ring log writer could not open {self.db_filename}: {e}")
+            self._writer_stopped()
+            return
+
+        since_checkpoint = 0
+        try:
+            while True:
+                with self._cond:
+                    while not self._pending and not self._closed:
+                        self._cond.wait()
+                    if not self._pending:
+                        break
+                    batch = list(self._pending)
+                    self._pending.clear()
+
+                failed = 0
+                start = time.monotonic()
+                try:
+                    with conn:
+                        # keep inserts and repeat updates in order, writing each run with executemany
+                        for sql, run in itertools.groupby(batch, key=lambda op: op[0]):
+                            conn.executemany(sql, [values for _, values in run])
+                except sqlite3.Error as e:
+                    log.error(f"Ring log writer failed to write {len(batch)} rows: {e}")
+                    failed = len(batch)
+                self.write_time += time.monotonic() - start
+
+                since_checkpoint += len(batch) - failed
+                if since_checkpoint >= self.checkpoint_rows and self.db_filename != ':memory:':
+                    try:
+                        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                        self.checkpoints += 1
+                    except sqlite3.Error as e:
+                        log.warning(f"Ring log checkpoint failed: {e}")
+                    since_checkpoint = 0
+
+                with self._cond:
+                    # failed rows count as written, so flush() never waits on them
+                    self._written += len(batch)
+                    self.batches += 1
+                    self.rows_written += len(batch) - failed
+                    self.rows_failed += failed
+                    self._cond.notify_all()
+        finally:
+            conn.close()
+            self._writer_stopped()
+
+    def _writer_stopped(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until everything logged so far is written"""
+        if not self._writer.is_alive():
+            return
 
-    def query(self, like: str = '', clause: str = '', limit: int = 100, epoch_start: int = 0, grouped: bool = False):
-        select = "message, ring_number, epoch_ns, context"
+        with self._cond:
+            target = self._queued
+            self._cond.wait_for(lambda: self._written >= target or self._closed or self._stopped, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=5.0)
+
+    def _query_sql(self, like: str = '', clause: str = '', limit: int = 100, epoch_start: int = 0,
+                   grouped: bool = False, regex: str = '', context: str = '') -> tuple[str, tuple]:
+        select = f"{_DISPLAY_MESSAGE}, ring_number, epoch_ns, context"
         group_by = ""
+        source = "ring_log"
+        rowid = "ring_log.rowid"
+
+        # patterns the trigram index answers, and filters checked on each row it finds
+        indexed = [like] if _indexable(like) else []
+        if regex:
+            indexed += [f"%{literal}%" for literal in _regex_literals(regex)]
+
+        filters: list[tuple[str, object]] = []
+        if indexed:
+            source = "ring_log_fts cross join ring_log on ring_log.rowid = ring_log_fts.rowid"
+            rowid = "ring_log_fts.rowid"
+            filters += [("ring_log_fts.stripped like ?", pattern) for pattern in indexed]
+        if like.strip('%') and not _indexable(like):
+            filters.append(("ring_log.stripped like ?", like))
+        if regex:
+            filters.append(("ring_log.stripped regexp ?", regex))
+        if context:
+            filters.append(("context = ?", context))
+        if epoch_start:
+            # rowids follow the order lines were logged in, so a time range is a rowid range
+            filters.append((f"{rowid} >= (select rowid from ring_log where epoch_ns > ? order by epoch_ns limit 1)",
+                            epoch_start))
+
+        order_by = f"{rowid} desc"
         if grouped:
             select = "message, max(ring_number), max(epoch_ns), last_value(context) over (order by epoch_ns desc)"
             group_by = "group by message"
+            order_by = "3 desc"
+
+        where = " and ".join(f for f, _ in filters) or "1"
+        sql = f"""select {select}
+                    from {source}
+                   where {where}
+                         {clause}
+                         {group_by}
+                   order by {order_by}
+                   limit ?"""
+        return sql, tuple(p for _, p in filters) + (limit,)
+
+    def reader(self) -> sqlite3.Connection:
+        """A read-only connection of its own, for searching from another thread"""
+        conn = sqlite3.connect(self._reader_uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = true")
+        conn.execute("PRAGMA read_uncommitted = true")
+        conn.create_function("regexp", 2, _regexp, deterministic=True)
+        return conn
 
-        sql = """select %s
-                   from ring_log
-                  where stripped like ?
-                    and epoch_ns > ? 
-                        %s 
-                        %s
-                  order by 3 desc 
-                  limit ? 
-              """ % (select, clause, group_by)
-        c = self.conn.execute(sql, (like, epoch_start, limit))
-        results = c.fetchall()
+    def query(self, like: str = '', clause: str = '', limit: int = 100, epoch_start: int = 0, grouped: bool = False,
+              regex: str = '', context: str = '', conn: Optional[sqlite3.Connection] = None):
+        """
+        Return up to limit (time, context, message) lines, oldest first
+
+        :param like: Lines matching this LIKE pattern
+        :param clause: More SQL conditions, starting with 'and', columns qualified with ring_log
+        :param limit: Maximum number of lines, the newest are kept
+        :param epoch_start: Only lines logged after this time_ns
+        :param grouped: Return each distinct message once
+        :param regex: Lines matching this regular expression
+        :param context: Only lines logged with this context
+        :param conn: Run the query on this connection from reader() instead
+        """
+        sql, params = self._query_sql(like, clause, limit, epoch_start, grouped, regex, context)
+        self.flush()
+        results = (conn or self.conn).execute(sql, params).fetchall()
 
         logs = []
         for message, rb, ns, ctx in reversed(results):
@@ -86,11 +371,52 @@ class RingBufferLogSql:
 
         return logs
 
+    def query_plan(self, like: str = '', clause: str = '', limit: int = 100, epoch_start: int = 0,
+                   grouped: bool = False, regex: str = '', context: str = '') -> list[str]:
+        """How SQLite runs the query() with these arguments, one step per line indented under its parent"""
+        sql, params = self._query_sql(like, clause, limit, epoch_start, grouped, regex, context)
+        self.flush()
+        depth = {0: -1}
+        plan = []
+        for node, parent, _, detail in self.conn.execute("explain query plan " + sql, params):
+            depth[node] = depth.get(parent, -1) + 1
+            plan.append("  " * depth[node] + detail)
+        return plan
+
+    def page(self, before: int = 0, limit: int = 200, show_msdp: bool = False) -> list[tuple[int, str]]:
+        """
+        Return up to limit (rowid, message) rows logged before rowid, newest first
+
+        insert or replace gives every new row the next rowid, so rowid order is logging order
+        and pages can be walked backwards by keyset on rowid without sorting.  Lines still waiting
+        for the writer are not in it, call flush() first to include them.
+
+        :param before: Page rows older than this rowid, 0 to start at the newest row
+        :param limit: Maximum rows in the page
+        :param show_msdp: Include the !MSDP debugging rows
+        """
+        msdp_clause = "" if show_msdp else "and stripped not like '!MSDP%'"
+        sql = f"""select rowid, {_DISPLAY_MESSAGE}
+                    from ring_log
+                   where rowid < ? {msdp_clause}
+                   order by rowid desc
+                   limit ?"""
+        return self.conn.execute(sql, (before or (1 << 62), limit)).fetchall()
+
+    def page_between(self, newest: int, oldest: int, show_msdp: bool = False) -> list[tuple[int, str]]:
+        """Return the (rowid, message) rows of a previously fetched page, newest first"""
+        msdp_clause = "" if show_msdp else "and stripped not like '!MSDP%'"
+        sql = f"""select rowid, {_DISPLAY_MESSAGE}
+                    from ring_log
+                   where rowid between ? and ? {msdp_clause}
+                   order by rowid desc"""
+        return self.conn.execute(sql, (oldest, newest)).fetchall()
+
     def commit(self):
-        self.conn.commit()
+        self.flush()
 
     def checkpoint(self, method: str = 'truncate'):
-        self.commit()
+        self.flush()
         if method.lower() not in ['truncate', 'passive', 'full', 'restart']:
             raise ValueError('Invalid checkpoint method %s' % method)
         self.conn.execute("pragma wal_checkpoint(%s)" % method)
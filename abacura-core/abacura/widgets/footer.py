@@ -19,12 +19,32 @@ class AbacuraFooter(Footer):
 
     session_name: reactive[str | None] = reactive[str | None]("null")
     level: reactive[str] = reactive[str]("")
+    lag: reactive[str] = reactive[str]("")
 
     def on_mount(self):
+        self._lag_timer = None
         self.screen.session.add_listener(self.update_level)
+        self.show_lag(self.screen.session.config.get_specific_option("global", "lag_footer", False))
 
     def render(self) -> str:
-        return f"#{self.session_name} {self.level}"
+        return f"#{self.session_name} {self.level} {self.lag}".rstrip()
+
+    @property
+    def lag_enabled(self) -> bool:
+        return getattr(self, "_lag_timer", None) is not None
+
+    def show_lag(self, enabled: bool):
+        """Show the event loop lag of the last second, updated twice a second"""
+        if self._lag_timer is not None:
+            self._lag_timer.stop()
+            self._lag_timer = None
+            self.lag = ""
+
+        if enabled:
+            self._lag_timer = self.set_interval(0.5, self.update_lag)
+
+    def update_lag(self):
+        self.lag = f"Lag: {self.app.lag_monitor.current * 1000:.0f}ms"
 
     @event("core.msdp.LEVEL", priority=5)
     def update_level(self, message: MSDPMessage):
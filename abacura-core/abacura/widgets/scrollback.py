@@ -0,0 +1,141 @@
+"""Scrollback over the session ring log, paged in from SQLite as it scrolls"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from abacura.utils.ansi import ansi_to_text
+
+if TYPE_CHECKING:
+    from abacura.utils.ring_buffer import RingBufferLogSql
+
+
+class Scrollback(ScrollView, can_focus=False):
+    """
+    Virtual scrollback of the ring log
+
+    Lines are fetched a page at a time, newest first, by keyset on the ring log rowid.  Only a few
+    rendered pages near the viewport are kept, older pages are fetched again if scrolled back to,
+    so memory use does not grow with scrollback depth.  Lines are not wrapped.
+    """
+
+    DEFAULT_CSS = """
+    Scrollback {
+        height: 2fr;
+        display: none;
+        background: $background-lighten-1;
+        border-bottom: hkey $accent;
+    }
+    """
+
+    PAGE_SIZE: int = 200
+    CACHED_PAGES: int = 8
+    FLUSH_TIMEOUT: float = 0.1
+
+    def __init__(self, ring_buffer: RingBufferLogSql, show_msdp: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.ring_buffer = ring_buffer
+        self.show_msdp = show_msdp
+        # (newest rowid, oldest rowid) of each page, newest page first; pages are full but the last
+        self.pages: list[tuple[int, int]] = []
+        self.exhausted: bool = False
+        self.line_count: int = 0
+        self.page_fetches: int = 0
+        self._strips: OrderedDict[int, list[Strip]] = OrderedDict()
+        self._widest: int = 0
+
+    def open(self):
+        """Start over, ending at the most recent line in the ring log"""
+        self.pages = []
+        self.exhausted = False
+        self.line_count = 0
+        self._strips.clear()
+        self._widest = 0
+        # without watchers, so the old position does not page in lines
+        self.set_reactive(Scrollback.scroll_y, 0)
+        self.set_reactive(Scrollback.scroll_target_y, 0)
+        # paging only reads what the writer has committed, give it a moment to catch up, but no more
+        self.ring_buffer.flush(timeout=self.FLUSH_TIMEOUT)
+        self._load_older()
+        self.scroll_end(animate=False)
+
+    def at_end(self) -> bool:
+        return self.scroll_offset.y >= self.max_scroll_y
+
+    def _render_rows(self, rows: list[tuple[int, str]]) -> list[Strip]:
+        console = self.app.console
+        strips = []
+        for _, message in rows:
+            text = ansi_to_text(message)
+            text.expand_tabs()
+            strip = Strip(list(text.render(console)))
+            self._widest = max(self._widest, strip.cell_length)
+            strips.append(strip)
+        return strips
+
+    def _cache(self, index: int, strips: list[Strip]):
+        self._strips[index] = strips
+        self._strips.move_to_end(index)
+        while len(self._strips) > self.CACHED_PAGES:
+            self._strips.popitem(last=False)
+
+    def _load_older(self) -> int:
+        """Fetch the next page back, return the number of lines added to the top"""
+        if self.exhausted:
+            return 0
+
+        before = self.pages[-1][1] if self.pages else 0
+        rows = self.ring_buffer.page(before=before, limit=self.PAGE_SIZE, show_msdp=self.show_msdp)
+        self.page_fetches += 1
+        if len(rows) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not rows:
+            return 0
+
+        self.pages.append((rows[0][0], rows[-1][0]))
+        self._cache(len(self.pages) - 1, self._render_rows(rows))
+        self.line_count += len(rows)
+        self.virtual_size = Size(self._widest, self.line_count)
+        return len(rows)
+
+    def _page_strips(self, index: int) -> list[Strip]:
+        if index in self._strips:
+            self._strips.move_to_end(index)
+            return self._strips[index]
+
+        newest, oldest = self.pages[index]
+        rows = self.ring_buffer.page_between(newest, oldest, show_msdp=self.show_msdp)
+        self.page_fetches += 1
+        strips = self._render_rows(rows)
+        self._cache(index, strips)
+        return strips
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        # keep a page of lines above the viewport, adding lines above shifts the view down
+        if new_value < self.PAGE_SIZE // 2 and not self.exhausted:
+            added = self._load_older()
+            if added:
+                self.scroll_to(y=new_value + added, animate=False, immediate=True)
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.scrollable_content_region.width
+        line_y = scroll_y + y
+        if line_y >= self.line_count:
+            return Strip.blank(width, self.rich_style)
+
+        # line 0 of the newest page is the bottom line
+        distance = self.line_count - 1 - line_y
+        strips = self._page_strips(distance // self.PAGE_SIZE)
+        offset = distance % self.PAGE_SIZE
+        if offset >= len(strips):
+            # rows overwritten by the ring since the page was first fetched
+            return Strip.blank(width, self.rich_style)
+
+        strip = strips[offset].crop_extend(scroll_x, scroll_x + width, self.rich_style)
+        return strip.apply_style(self.rich_style)
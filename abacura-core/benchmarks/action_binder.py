@@ -0,0 +1,101 @@
+"""
+Per-match CPU benchmark for binding regex groups to action callback arguments
+
+Before: initiate_callback walked the parameter types for every match, popping groups off a list.
+After: each Action has a generated binder that builds the argument tuple from match.groups().
+
+    python benchmarks/action_binder.py [--matches 200000]
+"""
+import argparse
+import time
+from typing import Match
+
+from abacura.mud import OutputMessage
+from abacura.plugins.actions import Action, ActionError
+
+
+def legacy_initiate_callback(action: Action, message: OutputMessage, match: Match):
+    """ActionManager.initiate_callback before argument binders"""
+    g = list(match.groups())
+
+    if len(g) < action.expected_match_groups:
+        msg = f"Incorrect # of match groups.  Expected {action.expected_match_groups}, got {g}"
+        raise ActionError(msg)
+
+    args = []
+
+    for arg_type in action.parameter_types:
+        if arg_type == Match:
+            value = match
+        elif arg_type == OutputMessage or arg_type == 'OutputMessage':
+            value = message
+        elif arg_type == int:
+            try:
+                value = int(g.pop(0))
+            except (ValueError, TypeError):
+                value = 0
+        elif arg_type == float:
+            try:
+                value = float(g.pop(0))
+            except (ValueError, TypeError):
+                value = float(0)
+        elif callable(arg_type) and arg_type.__name__ != '_empty':
+            value = arg_type(g.pop(0))
+        else:
+            value = g.pop(0)
+
+        args.append(value)
+
+    action.callback(*args)
+
+
+def combat(attacker: str, verb: str, victim: str, damage: int, msg: OutputMessage):
+    pass
+
+
+def tell(speaker: str, message: str, msg: OutputMessage):
+    pass
+
+
+def experience(xp: int):
+    pass
+
+
+def plain():
+    pass
+
+
+CASES = [
+    (r"^(\w+) (hits|misses|slashes) (.+?) for (\d+) damage", combat, "Grog slashes the orc for 42 damage"),
+    (r"^(\w+) tells you '(.*)'", tell, "Mira tells you 'heal incoming'"),
+    (r"^You receive (\d+) experience", experience, "You receive 1234 experience"),
+    (r"^You are hungry", plain, "You are hungry."),
+]
+
+
+def run(match_count: int):
+    for pattern, callback, line in CASES:
+        act = Action(source=None, pattern=pattern, callback=callback)
+        message = OutputMessage(line)
+        match = act.compiled_re.search(line)
+
+        results = {}
+        for name, fn in (("parameter walk", lambda: legacy_initiate_callback(act, message, match)),
+                         ("binder", lambda: act.callback(*act.binder(match, message)))):
+            start = time.process_time()
+            for _ in range(match_count):
+                fn()
+            results[name] = time.process_time() - start
+
+        print(f"{callback.__name__}: {pattern!r}")
+        for name, elapsed in results.items():
+            print(f"{name:>16}: {elapsed:8.3f}s CPU {elapsed / match_count * 1e9:8.0f} ns/match")
+        print(f"         speedup: {results['parameter walk'] / results['binder']:.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--matches", type=int, default=200000)
+    args = ap.parse_args()
+    run(args.matches)
@@ -0,0 +1,86 @@
+"""
+Per-line CPU benchmark for ANSI processing of inbound lines
+
+Before: OutputMessage stripped the line with the ansi_escape regex and Session.output parsed it
+again with Text.from_ansi.  After: OutputMessage tokenizes the line once and builds the rich Text
+from the cached spans.  Both paths produce the stripped text used by actions and the ring log
+and the Text written to the RichLog.
+
+    python benchmarks/ansi_tokenizer.py [--lines 200000]
+"""
+import argparse
+import random
+import re
+import time
+
+from rich.text import Text
+
+from abacura.mud import OutputMessage
+
+ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+class LegacyOutputMessage:
+    """OutputMessage before the tokenizer"""
+
+    def __init__(self, message: str, gag: bool = False):
+        self.message: str = message
+        if type(message) is str:
+            self.stripped = ansi_escape.sub('', message)
+        else:
+            self.stripped = message
+        self.gag: bool = gag
+
+
+def synthetic_lines(count: int) -> list[str]:
+    rnd = random.Random(42)
+    words = ["the", "orc", "hits", "you", "hard", "mountain", "path", "forest", "a", "dark", "cave"]
+    colors = ["0;37", "1;37", "1;35", "0;33", "0;31", "1;32", "22;36", "38;5;208"]
+    lines = []
+    for _ in range(count):
+        kind = rnd.random()
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 14)))
+        if kind < 0.2:
+            lines.append(text)
+        elif kind < 0.8:
+            lines.append(f"\x1b[{rnd.choice(colors)}m{text}\x1b[0m")
+        else:
+            parts = [f"\x1b[{rnd.choice(colors)}m{w}" for w in text.split()]
+            lines.append(" ".join(parts) + "\x1b[0m")
+    return lines
+
+
+def legacy(lines: list[str]):
+    for line in lines:
+        message = LegacyOutputMessage(line)
+        _ = message.stripped
+        Text.from_ansi(message.message)
+
+
+def tokenized(lines: list[str]):
+    for line in lines:
+        message = OutputMessage(line)
+        _ = message.stripped
+        _ = message.text
+
+
+def run(count: int):
+    lines = synthetic_lines(count)
+    print(f"lines: {len(lines):,}")
+
+    results = {}
+    for name, fn in (("regex + from_ansi", legacy), ("single-pass tokenizer", tokenized)):
+        start = time.process_time()
+        fn(lines)
+        elapsed = time.process_time() - start
+        results[name] = elapsed
+        print(f"{name:>22}: {elapsed:8.3f}s CPU {elapsed / len(lines) * 1e6:8.2f} μs/line")
+
+    print(f"speedup: {results['regex + from_ansi'] / results['single-pass tokenizer']:.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=200000)
+    args = ap.parse_args()
+    run(args.lines)
@@ -0,0 +1,98 @@
+"""
+Per-variable CPU benchmark for dispatching MSDP updates to listeners
+
+Before: listeners sat in a PriorityQueue per trigger, read through .queue, every dispatch built a
+results list, and each MSDP variable was dispatched twice, as core.msdp and core.msdp.<VAR>.
+After: one core.msdp.<VAR> dispatch reaches the exact and core.msdp.* listeners through a
+handler tuple resolved once per event type.
+
+    python benchmarks/event_dispatch.py [--updates 200000]
+"""
+import argparse
+import time
+from queue import PriorityQueue
+
+from abacura.mud.options.msdp import MSDPMessage
+from abacura.plugins.events import EventManager, EventTask, event
+
+VARIABLES = ["HEALTH", "MANA", "STAMINA", "GROUP", "ROOM_VNUM", "OPPONENT_HEALTH", "AFFECTS", "QUEUE"]
+
+
+class LegacyEventManager:
+    """EventManager before hierarchical topics"""
+
+    def __init__(self):
+        self.events: dict[str, PriorityQueue] = {}
+
+    def add_listener(self, listener, source=None):
+        trigger = getattr(listener, "event_trigger")
+        task = EventTask(handler=listener, source=source, trigger=trigger, priority=getattr(listener, "event_priority"))
+        self.events.setdefault(trigger, PriorityQueue()).put(task)
+
+    def dispatch(self, message):
+        if message.event_type not in self.events:
+            return
+
+        results = [task.handler(message) for task in self.events[message.event_type].queue]
+        if len(results) == 1:
+            return results[0]
+
+
+def listeners(wildcard: str) -> list:
+    """What a kallisti session listens to: 5 all-variable listeners, a few for single variables"""
+    found = []
+    for n in range(5):
+        @event(wildcard, priority=n % 2)
+        def on_any(message):
+            pass
+        found.append(on_any)
+
+    for var in ("ROOM_VNUM", "GOLD", "EXPERIENCE", "LEVEL"):
+        @event(f"core.msdp.{var}")
+        def on_var(message):
+            pass
+        found.append(on_var)
+    return found
+
+
+def legacy(manager: LegacyEventManager, updates: int):
+    for n in range(updates):
+        var = VARIABLES[n % len(VARIABLES)]
+        msg = MSDPMessage(subtype=var, value="1")
+        manager.dispatch(msg)
+        msg.event_type = f"core.msdp.{var}"
+        manager.dispatch(msg)
+
+
+def hierarchical(manager: EventManager, updates: int):
+    for n in range(updates):
+        var = VARIABLES[n % len(VARIABLES)]
+        manager.dispatch(MSDPMessage(event_type=f"core.msdp.{var}", subtype=var, value="1"))
+
+
+def run(updates: int):
+    old = LegacyEventManager()
+    for listener in listeners("core.msdp"):
+        old.add_listener(listener)
+
+    new = EventManager()
+    for listener in listeners("core.msdp.*"):
+        new.add_listener(listener)
+
+    results = {}
+    for name, fn in (("queue, 2 dispatches", lambda: legacy(old, updates)),
+                     ("hierarchical", lambda: hierarchical(new, updates))):
+        start = time.process_time()
+        fn()
+        elapsed = time.process_time() - start
+        results[name] = elapsed
+        print(f"{name:>20}: {elapsed:8.3f}s CPU {elapsed / updates * 1e9:8.0f} ns/update")
+
+    print(f"{'speedup':>20}: {results['queue, 2 dispatches'] / results['hierarchical']:.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--updates", type=int, default=200000)
+    args = ap.parse_args()
+    run(args.updates)
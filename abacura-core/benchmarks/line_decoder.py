@@ -0,0 +1,74 @@
+"""
+Per-line CPU benchmark for decoding the LINE events of the TelnetParser
+
+Before: each line was decoded and had CR and TAB replaced on its own, copying it three times.
+After: LineDecoder replaces CR and TAB in the joined bytes of all the lines from a chunk and
+decodes them with one incremental decoder call.
+
+    python benchmarks/line_decoder.py [--megabytes 8]
+"""
+import argparse
+import random
+import time
+
+from abacura.mud.telnet import TelnetParser, LineDecoder, LINE
+
+
+def synthetic_stream(size: int) -> bytes:
+    rnd = random.Random(42)
+    words = ["the", "orc", "hits", "you", "hard", "mountain", "path", "forest", "a", "dark", "cave", "épée", "│"]
+    chunks = []
+    total = 0
+    while total < size:
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 14)))
+        if rnd.random() < 0.1:
+            text = "\t" + text
+        chunk = b"\x1b[0;37m" + text.encode() + b"\x1b[0m\r\n"
+        chunks.append(chunk)
+        total += len(chunk)
+    return b"".join(chunks)
+
+
+def chunk_events(data: bytes, read_size: int = 4096) -> list[list[bytes]]:
+    parser = TelnetParser()
+    return [[e[1] for e in parser.feed(data[i:i + read_size]) if e[0] == LINE]
+            for i in range(0, len(data), read_size)]
+
+
+def per_line(chunks: list[list[bytes]]) -> int:
+    lines = 0
+    for chunk in chunks:
+        for line in chunk:
+            line.decode("UTF-8", errors="ignore").replace("\r", " ").replace("\t", "        ")
+            lines += 1
+    return lines
+
+
+def batched(chunks: list[list[bytes]]) -> int:
+    decoder = LineDecoder()
+    lines = 0
+    for chunk in chunks:
+        lines += len(decoder.decode_lines(chunk))
+    return lines
+
+
+def run(megabytes: float):
+    chunks = chunk_events(synthetic_stream(int(megabytes * 1024 * 1024)))
+    print(f"lines: {sum(len(c) for c in chunks):,} in {len(chunks):,} chunks")
+
+    results = {}
+    for name, fn in (("decode + replace per line", per_line), ("LineDecoder per chunk", batched)):
+        start = time.process_time()
+        lines = fn(chunks)
+        elapsed = time.process_time() - start
+        results[name] = elapsed
+        print(f"{name:>26}: {elapsed:8.3f}s CPU {elapsed / lines * 1e9:8.1f} ns/line")
+
+    print(f"speedup: {results['decode + replace per line'] / results['LineDecoder per chunk']:.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--megabytes", type=float, default=8)
+    args = ap.parse_args()
+    run(args.megabytes)
@@ -0,0 +1,89 @@
+"""
+#log search time on a large ring log
+
+Before: every search was a LIKE '%...%' over the stripped text of every line, sorted by time.
+After: a trigram full-text index finds the lines with the text, newest first, and regex searches
+only check the lines the index finds for the literal text the regex requires.
+
+    python benchmarks/log_search.py [--lines 1000000] [--file ringlog.db]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from abacura.mud import OutputMessage
+from abacura.utils.ring_buffer import RingBufferLogSql
+
+MOBS = ["the goblin scout", "the cave troll", "the mangy wolf", "the orc warrior", "Grog", "Mira"]
+VERBS = ["hits", "injures", "massacres", "obliterates", "barely scratches", "wounds"]
+
+LEGACY_SQL = """select message, ring_number, epoch_ns, context
+                  from ring_log
+                 where stripped like ?
+                   and epoch_ns > 0
+                       and stripped not like '!MSDP%'
+                 order by 3 desc
+                 limit 100"""
+
+SEARCHES = [("common", "%massacres%", ""),
+            ("rare", "%is dead!  R.I.P%", ""),
+            ("missing", "%dragon%", ""),
+            ("regex", "", r"goblin scout's \w+ obliterates"),
+            ("all", "%", "")]
+
+
+def build(filename: str, lines: int) -> RingBufferLogSql:
+    ring = RingBufferLogSql(filename, lines)
+    if ring.get_current_ring_number():
+        return ring
+
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for n in range(lines):
+        if n % 5000 == 0:
+            text = f"{rng.choice(MOBS).capitalize()} is dead!  R.I.P."
+        else:
+            text = f"{rng.choice(MOBS).capitalize()}'s {rng.choice(['slash', 'bite', 'claw'])} " \
+                   f"{rng.choice(VERBS)} {rng.choice(MOBS)}."
+        ring.log(OutputMessage(text, 0))
+        if n % 10000 == 0:
+            ring.flush(timeout=60)
+    ring.flush(timeout=600)
+    print(f"logged {lines} lines in {time.perf_counter() - start:.1f}s, {ring.dropped} dropped")
+    return ring
+
+
+def timed(fn, repeat: int = 3) -> tuple[float, int]:
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def run(lines: int, filename: str):
+    ring = build(filename, lines)
+    clause = "and ring_log.stripped not like '!MSDP%'"
+
+    for name, like, regex in SEARCHES:
+        if regex:
+            legacy = timed(lambda: ring.conn.execute(LEGACY_SQL.replace("stripped like ?", "stripped regexp ?"),
+                                                     (regex,)).fetchall())
+        else:
+            legacy = timed(lambda: ring.conn.execute(LEGACY_SQL, (like,)).fetchall())
+        indexed = timed(lambda: ring.query(like, clause=clause, regex=regex))
+        print(f"{name:>8}: {legacy[0] * 1000:8.1f}ms scan, {indexed[0] * 1000:8.1f}ms indexed, "
+              f"{indexed[1]} rows, {legacy[0] / indexed[0]:6.1f}x")
+
+    ring.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=1000000)
+    ap.add_argument("--file", default=os.path.join(tempfile.mkdtemp(), "ringlog.db"))
+    args = ap.parse_args()
+    run(args.lines, args.file)
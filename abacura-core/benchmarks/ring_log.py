@@ -0,0 +1,85 @@
+"""
+Screen-thread cost of logging output lines to the ring log
+
+Before: log() ran the insert on the screen's thread and committed every 10 rows, and a ticker
+committed once a second.
+After: log() queues the row, a writer thread inserts whatever is waiting with executemany in one
+transaction and checkpoints the WAL itself.
+
+    python benchmarks/ring_log.py [--lines 50000] [--file ringlog.db]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from abacura.mud import OutputMessage
+from abacura.utils.ring_buffer import RingBufferLogSql
+
+
+class LegacyRingLog:
+    """RingBufferLogSql.log before the writer thread"""
+
+    def __init__(self, db_filename: str, ring_size: int):
+        self.conn = sqlite3.connect(db_filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""create table if not exists ring_log(ring_number not null primary key, epoch_ns,
+                             context, message, stripped, repeats not null default 1)""")
+        self.conn.execute("create index if not exists ring_log_n1 on ring_log(epoch_ns)")
+        self.ring_size = ring_size
+        self.ring_number = 0
+        self.rows_logged = 0
+
+    def log(self, message: OutputMessage):
+        values = (self.ring_number, time.time_ns(), '', message.message, message.stripped)
+        self.conn.execute("""insert or replace into ring_log(ring_number, epoch_ns, context, message, stripped, repeats)
+                             values(?, ?, ?, ?, ?, 1)""", values)
+        self.ring_number = (self.ring_number + 1) % self.ring_size
+        self.rows_logged += 1
+        if self.rows_logged % 10 == 0:
+            self.conn.commit()
+
+    def flush(self):
+        self.conn.commit()
+
+
+def run(lines: int, filename: str):
+    messages = [OutputMessage(f"A goblin hits you with a rusty dagger {n}", 0) for n in range(lines)]
+
+    results = {}
+    for name, factory in (("inline", LegacyRingLog), ("writer thread", RingBufferLogSql)):
+        if os.path.exists(filename):
+            os.remove(filename)
+        ring = factory(filename, 10000)
+
+        costs = []
+        start = time.perf_counter()
+        for message in messages:
+            t = time.perf_counter()
+            ring.log(message)
+            costs.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        ring.flush()
+        total = time.perf_counter() - start
+        results[name] = elapsed
+        costs.sort()
+        p99, worst = costs[int(len(costs) * 0.99)], costs[-1]
+
+        print(f"{name:>14}: {elapsed / lines * 1e6:6.1f} us/line on the screen thread, {p99 * 1e6:6.1f} us p99, "
+              f"{worst * 1000:6.2f}ms worst, "
+              f"{total:6.2f}s until written")
+        if isinstance(ring, RingBufferLogSql):
+            print(f"{'':>14}  {ring.rows_written} rows in {ring.batches} batches, {ring.dropped} dropped, "
+                  f"{ring.peak_pending} peak pending")
+            ring.close()
+
+    print(f"{'speedup':>14}: {results['inline'] / results['writer thread']:.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=50000)
+    ap.add_argument("--file", default=os.path.join(tempfile.mkdtemp(), "ringlog.db"))
+    args = ap.parse_args()
+    run(args.lines, args.file)
@@ -0,0 +1,98 @@
+"""
+Per-line CPU benchmark for checking output lines against gags and substitutions
+
+Before: each substitution's regex searched the line in turn.
+After: the SubstituteManager looks the line up in a TriggerEngine and only runs the substitutions
+whose anchor or required literal it contains.  Both must leave every line the same.
+
+    python benchmarks/substitutes.py [--lines 20000] [--substitutes 10 50 200]
+"""
+import argparse
+import random
+import time
+
+from abacura.mud import OutputMessage
+from abacura.plugins.substitutes import Substitute, SubstituteManager
+
+WORDS = ["orc", "goblin", "troll", "dragon", "wolf", "bandit", "guard", "priest", "mage", "knight"]
+VERBS = ["hits", "misses", "slashes", "pierces", "crushes", "bites", "claws", "smites"]
+
+
+def synthetic_substitutes(count: int) -> list[Substitute]:
+    subs = []
+    for i in range(count):
+        word = f"{WORDS[i % len(WORDS)]}{i}"
+        if i % 4 == 0:
+            subs.append(Substitute(None, rf"^The {word} (\w+) you", None, priority=i % 3))
+        else:
+            subs.append(Substitute(None, rf"\b{word}\b", word.upper(), priority=i % 3))
+    return subs
+
+
+def synthetic_lines(count: int, sub_count: int, rnd: random.Random) -> list[str]:
+    lines = []
+    for _ in range(count):
+        word = f"{rnd.choice(WORDS)}{rnd.randrange(sub_count * 20)}"
+        if rnd.random() < 0.9:
+            line = f"The {rnd.choice(WORDS)} {rnd.choice(VERBS)} the {rnd.choice(WORDS)} very hard"
+        else:
+            line = f"The {word} {rnd.choice(VERBS)} you"
+        lines.append(line)
+    return lines
+
+
+def each(subs: list[Substitute], lines: list[str]) -> list[tuple[str, bool]]:
+    ordered = sorted(subs, key=lambda s: s.priority)
+    gags = [s for s in ordered if s.gag]
+    results = []
+    for line in lines:
+        if any(s.compiled_re.search(line) for s in gags):
+            results.append((line, True))
+            continue
+        for s in ordered:
+            if not s.gag:
+                line = s.compiled_re.sub(s.repl, line)
+        results.append((line, False))
+    return results
+
+
+def indexed(manager: SubstituteManager, lines: list[str]) -> list[tuple[str, bool]]:
+    results = []
+    for line in lines:
+        message = OutputMessage(line)
+        manager.process_output(message)
+        results.append((message.message, message.gag))
+    return results
+
+
+def run(line_count: int, sub_counts: list[int]):
+    for sub_count in sub_counts:
+        rnd = random.Random(42)
+        lines = synthetic_lines(line_count, sub_count, rnd)
+        manager = SubstituteManager()
+        for sub in synthetic_substitutes(sub_count):
+            manager.add(sub)
+
+        print(f"substitutions: {sub_count:,}, lines: {line_count:,}")
+        results = {}
+        found = {}
+        for name, fn in (("each regex", lambda: each(manager.substitutes, lines)),
+                         ("indexed", lambda: indexed(manager, lines))):
+            start = time.process_time()
+            found[name] = fn()
+            elapsed = time.process_time() - start
+            results[name] = elapsed
+            print(f"{name:>16}: {elapsed:8.3f}s CPU {elapsed / line_count * 1e6:8.2f} μs/line")
+
+        differ = sum(a != b for a, b in zip(found["each regex"], found["indexed"]))
+        print(f"         gagged: {sum(g for _, g in found['indexed']):,}, lines that differ: {differ}")
+        print(f"         speedup: {results['each regex'] / results['indexed']:.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=20000)
+    ap.add_argument("--substitutes", type=int, nargs="+", default=[10, 50, 200])
+    args = ap.parse_args()
+    run(args.lines, args.substitutes)
@@ -0,0 +1,112 @@
+"""
+Byte-throughput benchmark for the telnet reader
+
+Compares the original one-byte-per-await reader loop with the chunked reader and TelnetParser
+on a synthetic stream of ANSI colored room text, MSDP subnegotiations and GA prompts.
+
+    python benchmarks/telnet_reader.py [--megabytes 4]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from abacura.mud.telnet import TelnetParser, LINE, PROMPT, SUBNEGOTIATION
+
+IAC, SB, SE, GA = b'\xff', b'\xfa', b'\xf0', b'\xf9'
+MSDP = b'\x45'
+
+
+def synthetic_stream(size: int) -> bytes:
+    rnd = random.Random(42)
+    words = ["the", "orc", "hits", "you", "hard", "mountain", "path", "forest", "a", "dark", "cave"]
+    chunks = []
+    total = 0
+    while total < size:
+        for _ in range(rnd.randint(5, 25)):
+            text = " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 14)))
+            chunks.append(b"\x1b[0;37m" + text.encode() + b"\x1b[0m\r\n")
+        var = rnd.choice([b"ROOM_VNUM", b"HEALTH", b"OPPONENT_HEALTH"])
+        chunks.append(IAC + SB + MSDP + b'\x01' + var + b'\x02' + str(rnd.randint(1, 99999)).encode() + IAC + SE)
+        chunks.append(b"\x1b[1;32m<1234hp 567sp 890st>\x1b[0m " + IAC + GA)
+        total = sum(len(c) for c in chunks)
+    return b"".join(chunks)
+
+
+def stream_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=len(data) + 1)
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def legacy_loop(reader: asyncio.StreamReader) -> int:
+    """The per-byte reader loop from TelnetPlugin.telnet_client before the TelnetParser"""
+    lines = 0
+    outb = b''
+    while True:
+        data = await reader.read(1)
+        if data == b'':
+            return lines
+        elif data == b'\n':
+            outb.decode("UTF-8", errors="ignore").replace("\r", " ").replace("\t", "        ")
+            lines += 1
+            outb = b''
+        elif data == b'\xff':
+            data = await reader.read(1)
+            if data in (b'\xfd', b'\xfe', b'\xfb', b'\xfc'):
+                await reader.read(1)
+            elif data == b'\xfa':
+                c = await reader.read(1)
+                buf = b''
+                while c != b'\xf0':
+                    buf = buf + c
+                    c = await reader.read(1)
+            elif data == GA:
+                outb.decode("UTF-8", errors="ignore")
+                lines += 1
+                outb = b''
+        else:
+            outb = outb + data
+
+
+async def chunked_loop(reader: asyncio.StreamReader, read_size: int = 65536) -> int:
+    lines = 0
+    parser = TelnetParser()
+    while True:
+        data = await reader.read(read_size)
+        if data == b'':
+            return lines
+        for evt in parser.feed(data):
+            if evt[0] == LINE:
+                evt[1].decode("UTF-8", errors="ignore").replace("\r", " ").replace("\t", "        ")
+                lines += 1
+            elif evt[0] == PROMPT:
+                evt[1].decode("UTF-8", errors="ignore")
+                lines += 1
+            elif evt[0] == SUBNEGOTIATION:
+                pass
+
+
+async def run(megabytes: float):
+    data = synthetic_stream(int(megabytes * 1024 * 1024))
+    mb = len(data) / (1024 * 1024)
+    print(f"stream: {len(data):,} bytes")
+
+    results = {}
+    for name, loop_fn in (("legacy read(1)", legacy_loop), ("chunked read(65536)", chunked_loop)):
+        reader = stream_reader(data)
+        start = time.perf_counter()
+        lines = await loop_fn(reader)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>20}: {elapsed:8.3f}s {mb / elapsed:9.2f} MB/s {lines / elapsed:12,.0f} lines/s")
+
+    print(f"speedup: {results['legacy read(1)'] / results['chunked read(65536)']:.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--megabytes", type=float, default=4)
+    args = ap.parse_args()
+    asyncio.run(run(args.megabytes))
@@ -0,0 +1,145 @@
+"""
+Per-line CPU benchmark for matching output lines against registered actions
+
+Before: every action was checked in turn, a quick_check substring test then the regex.
+After: the TriggerEngine returns only the actions whose anchored prefix or required literal is
+in the line, and only those regexes run.  The engine must find every match the linear scan does.
+
+    python benchmarks/trigger_engine.py [--lines 20000] [--actions 100 500 2000]
+"""
+import argparse
+import random
+import re
+import time
+
+from abacura.mud import OutputMessage
+from abacura.plugins.actions import Action
+from abacura.plugins.actions.engine import TriggerEngine
+
+WORDS = ["orc", "goblin", "troll", "dragon", "wolf", "bandit", "guard", "priest", "mage", "knight",
+         "forest", "cave", "river", "tower", "castle", "bridge", "market", "temple", "swamp", "ruin"]
+VERBS = ["hits", "misses", "slashes", "pierces", "crushes", "bites", "claws", "smites"]
+
+
+def noop(*_args):
+    pass
+
+
+def synthetic_actions(count: int, rnd: random.Random) -> list[Action]:
+    actions = []
+    for i in range(count):
+        word = f"{rnd.choice(WORDS)}{i}"
+        kind = i % 10
+        if kind < 3:
+            pattern, flags = rf"^You (\w+) the {word}", 0
+        elif kind < 6:
+            pattern, flags = rf"(\w+) tells you '{word} (.*)'", 0
+        elif kind < 8:
+            pattern, flags = rf"The {word} (\w+) you", re.IGNORECASE
+        elif kind < 9:
+            pattern, flags = rf"^\[{word}\] (.*)", 0
+        else:
+            pattern, flags = r"(\w+) " + rnd.choice(VERBS) + r" (\w+)\.", 0
+        actions.append(Action(source=None, pattern=pattern, callback=noop, flags=flags))
+    return actions
+
+
+def synthetic_lines(count: int, action_count: int, rnd: random.Random) -> list[str]:
+    lines = []
+    for _ in range(count):
+        word = f"{rnd.choice(WORDS)}{rnd.randrange(action_count * 2)}"
+        kind = rnd.random()
+        if kind < 0.5:
+            line = f"The {rnd.choice(WORDS)} {rnd.choice(VERBS)} the {rnd.choice(WORDS)} very hard"
+        elif kind < 0.6:
+            line = f"You {rnd.choice(VERBS)} the {word}."
+        elif kind < 0.7:
+            line = f"Grog tells you '{word} is over there'"
+        elif kind < 0.8:
+            line = f"THE {word.upper()} bites you!"
+        elif kind < 0.9:
+            line = f"A path leads north into the {rnd.choice(WORDS)}, past an old {rnd.choice(WORDS)}."
+        else:
+            line = f"[{word}] Someone says hello"
+        lines.append(f"\x1b[0;37m{line}\x1b[0m" if rnd.random() < 0.5 else line)
+    return lines
+
+
+def legacy_quick_check(pattern: str) -> str:
+    """Action._extract_quick_check before the required literal analyzer"""
+    clean = pattern.replace('^', '').replace('$', '')
+    clean = re.sub(r'\\(.)', r'\1', clean)
+    for char in ['(', '[', '*', '+', '?', '.', '|']:
+        if char in clean:
+            clean = clean[:clean.index(char)]
+            break
+    clean = clean.strip()
+    return clean if len(clean) > 3 else ''
+
+
+def linear(actions: list[Action], messages: list[OutputMessage]) -> list[tuple[int, int]]:
+    """ActionManager.process_output before the trigger engine"""
+    quick_checks = {act: legacy_quick_check(act.pattern) for act in actions}
+    matches = []
+    for n, message in enumerate(messages):
+        color_text = message.message
+        stripped_text = message.stripped
+        action_data = [(act.compiled_re, quick_checks[act], act.color, act) for act in actions]
+        for compiled_re, quick_check, use_color, action in action_data:
+            s = color_text if use_color else stripped_text
+            if quick_check and quick_check not in s:
+                continue
+            if compiled_re.search(s):
+                matches.append((n, id(action)))
+    return matches
+
+
+def indexed(engine: TriggerEngine, messages: list[OutputMessage]) -> list[tuple[int, int]]:
+    matches = []
+    for n, message in enumerate(messages):
+        color_text = message.message
+        stripped_text = message.stripped
+        for action in engine.candidates(color_text, stripped_text):
+            if action.compiled_re.search(color_text if action.color else stripped_text):
+                matches.append((n, id(action)))
+    return matches
+
+
+def run(line_count: int, action_counts: list[int]):
+    for action_count in action_counts:
+        rnd = random.Random(42)
+        actions = synthetic_actions(action_count, rnd)
+        messages = [OutputMessage(line) for line in synthetic_lines(line_count, action_count, rnd)]
+        for message in messages:
+            _ = message.stripped
+
+        engine = TriggerEngine()
+        start = time.process_time()
+        for action in actions:
+            engine.add(action)
+        build = time.process_time() - start
+
+        print(f"actions: {action_count:,}, lines: {line_count:,}, engine built in {build * 1000:.1f}ms")
+        results = {}
+        found = {}
+        for name, fn in (("linear scan", lambda: linear(actions, messages)),
+                         ("trigger engine", lambda: indexed(engine, messages))):
+            start = time.process_time()
+            found[name] = fn()
+            elapsed = time.process_time() - start
+            results[name] = elapsed
+            print(f"{name:>16}: {elapsed:8.3f}s CPU {elapsed / line_count * 1e6:8.2f} μs/line")
+
+        # the old quick_check ignored IGNORECASE, so the engine may find matches the linear scan missed
+        missing = set(found["linear scan"]) - set(found["trigger engine"])
+        print(f"         matches: {len(found['trigger engine']):,}, missed by the engine: {len(missing)}")
+        print(f"         speedup: {results['linear scan'] / results['trigger engine']:.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=20000)
+    ap.add_argument("--actions", type=int, nargs="+", default=[100, 500, 2000])
+    args = ap.parse_args()
+    run(args.lines, args.actions)
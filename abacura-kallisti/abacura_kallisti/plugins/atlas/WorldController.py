@@ -21,6 +21,8 @@ class WorldController(LOKPlugin):
         self.wild_grid = WildernessGrid()
         importlib.reload(tblt)
         self.traveling = False
+        # the map is redrawn once a frame, from the last room entered, however fast we move
+        self.defer_event(MapUpdateMessage.event_type)
 
     def dispatch_map_message(self, vnum: str):
         room = self.world.rooms.get(vnum, None)
@@ -462,7 +462,7 @@ class RoomWatcher(LOKPlugin):
             messages = pickle.load(f)
 
         for msg in messages:
-            self.output(Text.from_ansi(msg.message))
+            self.output(msg.text)
 
         rmp = RoomMessageParser(messages)
         self.output(rmp.header)
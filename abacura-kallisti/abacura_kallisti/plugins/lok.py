@@ -39,12 +39,13 @@ class LegendsOfKallisti(LOKPlugin):
         def not_in_combat():
             return self.msdp.opponent_number == 0
 
+        combat = ("OPPONENT_NUMBER",)
         queues = {"priority": TaskQueue(10),
                   "heal": TaskQueue(20),
-                  "combat": TaskQueue(30, lambda: self.msdp.opponent_number > 0),
-                  "nco": TaskQueue(40, not_in_combat),
+                  "combat": TaskQueue(30, lambda: self.msdp.opponent_number > 0, combat),
+                  "nco": TaskQueue(40, not_in_combat, combat),
                   "any": TaskQueue(50),
-                  "move": TaskQueue(60, not_in_combat)
+                  "move": TaskQueue(60, not_in_combat, combat)
                   }
         self.cq.set_queues(queues)
 
@@ -85,7 +86,7 @@ class LegendsOfKallisti(LOKPlugin):
         if account:
             self.send(account, echo_color='')
 
-    @event("core.msdp")
+    @event("core.msdp.*")
     def update_pc(self, msg: MSDPMessage):
         # PC_FIELDS = ["level"]
         # if msg.type in PC_FIELDS:
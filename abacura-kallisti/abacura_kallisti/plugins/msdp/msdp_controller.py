@@ -49,7 +49,7 @@ class LOKMSDPController(LOKPlugin):
 
         self.session.output(panel, highlight=True, actionable=False)
 
-    @event("core.msdp", priority=1)
+    @event("core.msdp.*", priority=1)
     def update_lok_msdp(self, message: MSDPMessage):
         # self.msdp.values[message.type] = message.value
         attr_name = message.subtype.lower()
@@ -16,6 +16,8 @@ class OdometerController(LOKPlugin):
         super().__init__()
         self.last_kill = ""
         self.last_skill = ""
+        # the odometer widget redraws from the whole history, once a second is plenty
+        self.defer_event(OdometerMessage.event_type, hz=1)
 
     @command(name="odometer")
     def odometer_command(self, clear: bool = False, _start: bool = False, _mission: str = "") -> None:
@@ -54,6 +54,7 @@ class KallistiScreen(SessionScreen):
             yield commslog
             with Container(id="mudoutputs"):
                 self.tl.can_focus = False
+                yield self.scrollback
                 yield self.tl
 
             yield InputBar(id="playerinput")
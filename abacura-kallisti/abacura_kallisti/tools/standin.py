@@ -0,0 +1,456 @@
+"""
+Scripted stand-in for the Legends of Kallisti server
+
+Speaks enough telnet for abacura to connect to it locally: MSDP (REPORTABLE_VARIABLES, room
+variables, GROUP, AFFECTS and friends), MCCP2 and GA terminated prompts.  The player walks a
+synthetic grid or the rooms of a world.db, seeing a minimap, a room header in the format the
+RoomWatcher expects, items and mobs.  Commands are answered after a randomized server lag, and
+bystander combat spam can be generated at a fixed rate to load the client.
+
+    python -m abacura_kallisti.tools.standin --port 4000 --spam 500
+    python -m abacura_kallisti.tools.standin --world ~/Documents/abacura/kallisti/world.db --start 3001
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import zlib
+from contextlib import suppress
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional
+
+import click
+
+from abacura.mud.options import IAC, SB, SE, WILL, DO, DONT, GA
+from abacura.mud.options.msdp import VAR, VAL, TABLE_OPEN, TABLE_CLOSE, ARRAY_OPEN, ARRAY_CLOSE
+from abacura.mud.telnet import TelnetParser, LINE, PROMPT, COMMAND, SUBNEGOTIATION
+
+MSDP = 69
+COMPRESS2 = 86
+
+DIRECTIONS = {"n": "north", "s": "south", "e": "east", "w": "west", "u": "up", "d": "down"}
+REVERSE = {"north": "south", "south": "north", "east": "west", "west": "east", "up": "down", "down": "up"}
+COMPASS = {"north": (0, -1), "south": (0, 1), "east": (1, 0), "west": (-1, 0)}
+
+TERRAIN_SYMBOLS = {"City": "+", "Field": ".", "Forest": "*", "Hills": ")", "Inside": "o", "Road": "-"}
+
+ITEMS = ["A small pile of gold coins lies here.", "A rusty longsword has been left here.",
+         "A loaf of bread lies here.", "A wooden shield has been dropped here."]
+MOBS = ["A goblin scout is standing here.", "A mangy wolf prowls about.",
+        "A city guard is standing here, watching you.", "An orc warrior is here, looking for trouble."]
+FOES = ["the goblin scout", "the mangy wolf", "the orc warrior", "the cave troll"]
+ATTACKS = ["slash", "pierce", "crush", "bite", "claw"]
+HITS = ["barely scratches", "hits", "injures", "wounds", "massacres", "obliterates"]
+
+REPORTABLE = ["CHARACTER_NAME", "LEVEL", "CLASS", "RACE", "HEALTH", "HEALTH_MAX", "MANA", "MANA_MAX",
+              "STAMINA", "STAMINA_MAX", "POSITION", "GOLD", "EXPERIENCE", "EXPERIENCE_TNL",
+              "AREA_NAME", "ROOM_NAME", "ROOM_VNUM", "ROOM_TERRAIN", "ROOM_EXITS", "GROUP", "AFFECTS",
+              "OPPONENT_NAME", "OPPONENT_NUMBER", "OPPONENT_HEALTH", "OPPONENT_HEALTH_MAX", "QUEUE"]
+
+
+def msdp_value(value) -> bytes:
+    """Encode a value the way Kallisti does, tables and arrays are empty strings when empty"""
+    if isinstance(value, dict):
+        if not value:
+            return b''
+        pairs = [VAR + str(k).encode() + VAL + msdp_value(v) for k, v in value.items()]
+        return TABLE_OPEN + b''.join(pairs) + TABLE_CLOSE
+
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return b''
+        return ARRAY_OPEN + b''.join(VAL + msdp_value(v) for v in value) + ARRAY_CLOSE
+
+    return str(value).encode("UTF-8")
+
+
+def msdp_sb(name: str, value) -> bytes:
+    return IAC + SB + bytes([MSDP]) + VAR + name.encode() + VAL + msdp_value(value) + IAC + SE
+
+
+def parse_msdp_request(payload: bytes) -> list[tuple[str, list[str]]]:
+    """Split a client MSDP subnegotiation into (command, [arguments])"""
+    requests = []
+    for chunk in payload.split(VAR)[1:]:
+        name, *args = chunk.split(VAL)
+        requests.append((name.decode("UTF-8", errors="ignore"),
+                         [a.decode("UTF-8", errors="ignore") for a in args if a]))
+    return requests
+
+
+@dataclass(slots=True)
+class StandinRoom:
+    vnum: str
+    name: str
+    area_name: str = "Stand-in"
+    terrain_name: str = "City"
+    exits: dict[str, str] = field(default_factory=dict)
+    items: list[str] = field(default_factory=list)
+    mobs: list[str] = field(default_factory=list)
+
+
+class StandinWorld:
+    """The rooms the stand-in player can walk through"""
+
+    def __init__(self, rooms: dict[str, StandinRoom], start_vnum: str = ''):
+        if not rooms:
+            raise ValueError("The stand-in world has no rooms")
+
+        self.rooms = rooms
+        self.start_vnum = start_vnum if start_vnum in rooms else next(iter(rooms))
+
+    @classmethod
+    def synthetic(cls, size: int = 20, seed: Optional[int] = None) -> StandinWorld:
+        """A size x size grid of rooms, split into four areas"""
+        rnd = random.Random(seed)
+        rooms = {}
+        for y in range(size):
+            for x in range(size):
+                vnum = str(3000 + y * size + x)
+                quadrant = ("North" if y < size // 2 else "South") + ("west" if x < size // 2 else "east")
+                terrain_name = rnd.choice(list(TERRAIN_SYMBOLS))
+                room = StandinRoom(vnum=vnum, name=f"{terrain_name} {x},{y}", area_name=f"The {quadrant} Reaches",
+                                   terrain_name=terrain_name,
+                                   items=rnd.sample(ITEMS, rnd.randint(0, 2)), mobs=rnd.sample(MOBS, rnd.randint(0, 2)))
+
+                for direction, (dx, dy) in COMPASS.items():
+                    if 0 <= x + dx < size and 0 <= y + dy < size:
+                        room.exits[direction] = str(3000 + (y + dy) * size + x + dx)
+
+                rooms[vnum] = room
+
+        return cls(rooms, "3000")
+
+    @classmethod
+    def from_world_db(cls, filename: str, start_vnum: str = '', seed: Optional[int] = None) -> StandinWorld:
+        """The rooms and exits known to an abacura world.db, outside the wilderness"""
+        from abacura_kallisti.atlas.world import World
+
+        rnd = random.Random(seed)
+        world = World(filename)
+        rooms = {}
+        for vnum, r in world.rooms.items():
+            exits = {d: e.to_vnum for d, e in r._exits.items() if e.to_vnum in world.rooms}
+            rooms[vnum] = StandinRoom(vnum=vnum, name=r.name, area_name=r.area_name,
+                                      terrain_name=r.terrain_name, exits=exits,
+                                      items=rnd.sample(ITEMS, rnd.randint(0, 1)), mobs=rnd.sample(MOBS, rnd.randint(0, 1)))
+
+        return cls(rooms, start_vnum)
+
+    def minimap(self, vnum: str, radius: int = 3) -> list[str]:
+        """Framed map of the rooms reachable by compass exits within radius steps"""
+        positions = {vnum: (0, 0)}
+        frontier = [vnum]
+        for _ in range(radius):
+            next_frontier = []
+            for v in frontier:
+                x, y = positions[v]
+                for direction, to_vnum in self.rooms[v].exits.items():
+                    if direction in COMPASS and to_vnum not in positions:
+                        dx, dy = COMPASS[direction]
+                        positions[to_vnum] = (x + dx, y + dy)
+                        next_frontier.append(to_vnum)
+            frontier = next_frontier
+
+        width = radius * 4 + 1
+        grid = [[" "] * width for _ in range(width)]
+        for v, (x, y) in positions.items():
+            if abs(x) > radius or abs(y) > radius:
+                continue
+            col, row = (x + radius) * 2, (y + radius) * 2
+            room = self.rooms[v]
+            grid[row][col] = "@" if v == vnum else TERRAIN_SYMBOLS.get(room.terrain_name, "o")
+            if "east" in room.exits and col + 1 < width:
+                grid[row][col + 1] = "-"
+            if "south" in room.exits and row + 1 < width:
+                grid[row + 1][col] = "|"
+
+        border = " \x1b[0;37m+" + "-" * width + "+\x1b[0m"
+        return [border] + [f" \x1b[0;37m|\x1b[0;32m{''.join(r)}\x1b[0;37m|\x1b[0m" for r in grid] + [border]
+
+
+class StandinConnection:
+    """One connected client and the character it is playing"""
+
+    def __init__(self, server: StandinServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.world = server.world
+        self.reader = reader
+        self.writer = writer
+        self.rnd = random.Random(server.seed)
+
+        self.parser = TelnetParser()
+        self.compressor = None
+        self.commands: asyncio.Queue[str] = asyncio.Queue()
+        self.reported: set[str] = set()
+        self.closing = False
+        self.msdp_ready = asyncio.Event()
+
+        self.vnum = self.world.start_vnum
+        self.msdp = {"CHARACTER_NAME": "Standin", "LEVEL": 50, "CLASS": "Paladin", "RACE": "Human",
+                     "HEALTH": 1000, "HEALTH_MAX": 1000, "MANA": 500, "MANA_MAX": 500,
+                     "STAMINA": 400, "STAMINA_MAX": 400, "POSITION": "Standing", "GOLD": 1234,
+                     "EXPERIENCE": 0, "EXPERIENCE_TNL": 100000, "OPPONENT_NAME": "", "OPPONENT_NUMBER": 0,
+                     "OPPONENT_HEALTH": 0, "OPPONENT_HEALTH_MAX": 0, "QUEUE": 0,
+                     "AFFECTS": {"sanctuary": 24, "haste": 12, "bless": 6},
+                     "GROUP": [self.group_member("Standin", "Paladin", leader=True),
+                               self.group_member("Grog", "Warrior"),
+                               self.group_member("Mira", "Cleric")]}
+        self.update_room_msdp()
+
+        self.lines_sent: int = 0
+        self.bytes_sent: int = 0
+        self.connected_at = monotonic()
+
+    @staticmethod
+    def group_member(name: str, cls: str, leader: bool = False) -> dict:
+        return {"name": name, "class": cls, "level": 50, "position": "Standing", "flags": "",
+                "health": 100, "mana": 100, "stamina": 100, "is_leader": int(leader),
+                "is_subleader": 0, "with_leader": 1, "with_you": 1}
+
+    @property
+    def room(self) -> StandinRoom:
+        return self.world.rooms[self.vnum]
+
+    def write(self, data: bytes):
+        if self.compressor is not None:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+    def send_lines(self, lines: list[str], prompt: bool = True):
+        buf = "".join(f"{line}\r\n" for line in lines).encode("UTF-8")
+        if prompt:
+            buf += self.prompt()
+        self.write(buf)
+        self.lines_sent += len(lines) + prompt
+
+    def prompt(self) -> bytes:
+        m = self.msdp
+        return f"\x1b[0;37m<{m['HEALTH']}hp {m['MANA']}mp {m['STAMINA']}sp>\x1b[0m ".encode() + IAC + GA
+
+    def set_msdp(self, name: str, value):
+        self.msdp[name] = value
+        if name in self.reported:
+            self.write(msdp_sb(name, value))
+
+    def update_room_msdp(self):
+        room = self.room
+        for name, value in (("AREA_NAME", room.area_name), ("ROOM_NAME", room.name),
+                            ("ROOM_TERRAIN", room.terrain_name), ("ROOM_EXITS", room.exits),
+                            ("ROOM_VNUM", room.vnum)):
+            self.set_msdp(name, value)
+
+    def room_lines(self) -> list[str]:
+        room = self.room
+        exits = " ".join(d[0].upper() for d in REVERSE if d in room.exits) or "No exits!"
+        lines = self.world.minimap(self.vnum)
+        lines.append(f"\x1b[1;35m{room.name}\x1b[0m \x1b[0;37m[ {exits} ]\x1b[0m")
+        lines += [f"\x1b[0;37m{item}\x1b[0m" for item in room.items]
+        lines += [f"\x1b[1;37m{mob}\x1b[0m" for mob in room.mobs]
+        return lines
+
+    async def run(self):
+        self.write(IAC + WILL + bytes([MSDP]))
+        if self.server.mccp:
+            self.write(IAC + WILL + bytes([COMPRESS2]))
+        self.send_lines(["Welcome to the Legends of Kallisti stand-in server.", ""], prompt=False)
+
+        tasks = [asyncio.create_task(self.process_commands())]
+        if self.server.spam > 0:
+            tasks.append(asyncio.create_task(self.spam()))
+        if self.server.wander > 0:
+            tasks.append(asyncio.create_task(self.wander()))
+
+        try:
+            while not self.closing:
+                data = await self.reader.read(4096)
+                if not data:
+                    break
+                self.handle_events(self.parser.feed(data))
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.writer.close()
+
+        elapsed = monotonic() - self.connected_at
+        click.echo(f"Disconnected after {elapsed:.1f}s, {self.lines_sent:,} lines, {self.bytes_sent:,} bytes sent")
+
+    def handle_events(self, events: list[tuple]):
+        for event in events:
+            if event[0] == LINE or event[0] == PROMPT:
+                self.commands.put_nowait(event[1].decode("UTF-8", errors="ignore").strip())
+            elif event[0] == COMMAND:
+                self.handle_command(event[1], event[2])
+            elif event[0] == SUBNEGOTIATION and event[1][:1] == bytes([MSDP]):
+                self.handle_msdp(event[1][1:])
+
+    def handle_command(self, verb: int, option: int):
+        if option != COMPRESS2:
+            return
+
+        if verb == DO[0] and self.server.mccp and self.compressor is None:
+            self.write(IAC + SB + bytes([COMPRESS2]) + IAC + SE)
+            self.compressor = zlib.compressobj()
+        elif verb == DONT[0] and self.compressor is not None:
+            self.writer.write(self.compressor.flush(zlib.Z_FINISH))
+            self.compressor = None
+
+    def handle_msdp(self, payload: bytes):
+        for request, args in parse_msdp_request(payload):
+            if request == "LIST" and "REPORTABLE_VARIABLES" in args:
+                self.write(msdp_sb("REPORTABLE_VARIABLES", REPORTABLE))
+            elif request == "REPORT":
+                for name in args:
+                    if name in REPORTABLE:
+                        self.reported.add(name)
+                        self.write(msdp_sb(name, self.msdp[name]))
+                self.msdp_ready.set()
+            elif request == "UNREPORT":
+                self.reported.difference_update(args)
+            elif request == "SEND":
+                for name in [n for n in args if n in self.msdp]:
+                    self.write(msdp_sb(name, self.msdp[name]))
+
+    def server_lag(self) -> float:
+        return max(0.0, self.rnd.gauss(self.server.lag, self.server.jitter))
+
+    async def process_commands(self):
+        """Run commands one at a time, each after the server lag"""
+        # enter the game once the client has asked for its MSDP variables, like the real login
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.msdp_ready.wait(), 2.0)
+        self.send_lines(self.room_lines())
+
+        while True:
+            cmd = await self.commands.get()
+            self.set_msdp("QUEUE", self.commands.qsize())
+            await asyncio.sleep(self.server_lag())
+            self.execute(cmd)
+
+    def execute(self, cmd: str):
+        verb, _, _arg = cmd.partition(" ")
+        verb = verb.lower()
+
+        if verb == "":
+            self.write(self.prompt())
+        elif verb in DIRECTIONS or verb in REVERSE:
+            self.move(DIRECTIONS.get(verb, verb))
+        elif verb in ("l", "look"):
+            self.send_lines(self.room_lines())
+        elif verb == "quit":
+            self.send_lines(["Goodbye, friend.. Come back soon!"], prompt=False)
+            self.closing = True
+            self.reader.feed_eof()
+        else:
+            self.send_lines(["Huh?!?"])
+
+    def move(self, direction: str, follow: str = ''):
+        to_vnum = self.room.exits.get(direction, '')
+        if to_vnum not in self.world.rooms:
+            self.send_lines(["Alas, you cannot go that way..."])
+            return
+
+        self.vnum = to_vnum
+        self.set_msdp("STAMINA", max(0, self.msdp["STAMINA"] - 1))
+        self.update_room_msdp()
+        lines = [f"You follow {follow} {direction}.", ""] if follow else []
+        self.send_lines(lines + self.room_lines())
+
+    async def wander(self):
+        """Follow a group member through the world as if grouped with a leader"""
+        while True:
+            await asyncio.sleep(self.server.wander)
+            directions = list(self.room.exits)
+            if directions:
+                self.move(self.rnd.choice(directions), follow="Grog")
+
+    def combat_line(self) -> str:
+        member = self.rnd.choice(self.msdp["GROUP"])["name"]
+        foe = self.rnd.choice(FOES)
+        attack = self.rnd.choice(ATTACKS)
+        hit = self.rnd.choice(HITS)
+        if self.rnd.random() < 0.5:
+            return f"\x1b[0;33m{member}'s {attack} {hit} {foe}.\x1b[0m"
+        return f"\x1b[0;31m{foe.capitalize()}'s {attack} {hit} {member}.\x1b[0m"
+
+    async def spam(self):
+        """Bystander combat at the configured lines/sec, sent in 100ms server pulses with prompts"""
+        pulse = 0.1
+        budget = 0.0
+        next_pulse = monotonic()
+        while True:
+            next_pulse += pulse
+            await asyncio.sleep(max(0.0, next_pulse - monotonic()))
+
+            budget += self.server.spam * pulse
+            count, budget = int(budget), budget % 1
+            if not count:
+                continue
+
+            lines = [self.combat_line() for _ in range(count)]
+            if self.rnd.random() < 0.05:
+                lines.append(f"\x1b[1;31m{self.rnd.choice(FOES).capitalize()} is dead!  R.I.P.\x1b[0m")
+
+            group = [dict(m, health=self.rnd.randint(40, 100)) for m in self.msdp["GROUP"]]
+            self.set_msdp("GROUP", group)
+            self.send_lines(lines)
+            await self.writer.drain()
+
+
+class StandinServer:
+    """Accept abacura connections and play a scripted character for each one"""
+
+    def __init__(self, world: StandinWorld, lag: float = 0.1, jitter: float = 0.03, spam: float = 0,
+                 wander: float = 0, mccp: bool = True, seed: Optional[int] = None):
+        self.world = world
+        self.lag = lag
+        self.jitter = jitter
+        self.spam = spam
+        self.wander = wander
+        self.mccp = mccp
+        self.seed = seed
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        click.echo(f"Connection from {writer.get_extra_info('peername')}")
+        await StandinConnection(self, reader, writer).run()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        click.echo(f"Stand-in server with {len(self.world.rooms):,} rooms listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("-p", "--port", default=4000, type=int)
+@click.option("--world", "world_db", type=click.Path(exists=True, dir_okay=False), help="Walk the rooms of a world.db")
+@click.option("--start", default='', help="Starting vnum")
+@click.option("--size", default=20, type=int, help="Width of the synthetic grid when no world.db is given")
+@click.option("--lag", default=0.1, type=float, help="Mean seconds before each command is answered")
+@click.option("--jitter", default=0.03, type=float, help="Standard deviation of the command lag")
+@click.option("--spam", default=0.0, type=float, help="Combat lines per second, 0 for none")
+@click.option("--wander", default=0.0, type=float, help="Follow a leader to a random room every N seconds")
+@click.option("--mccp/--no-mccp", default=True, help="Offer MCCP2 compression")
+@click.option("--seed", default=None, type=int)
+def main(host, port, world_db, start, size, lag, jitter, spam, wander, mccp, seed):
+    if world_db:
+        world = StandinWorld.from_world_db(world_db, start, seed)
+    else:
+        world = StandinWorld.synthetic(size, seed)
+        world.start_vnum = start if start in world.rooms else world.start_vnum
+
+    server = StandinServer(world, lag=lag, jitter=jitter, spam=spam, wander=wander, mccp=mccp, seed=seed)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
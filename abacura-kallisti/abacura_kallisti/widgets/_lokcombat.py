@@ -175,7 +175,7 @@ class LOKCombat(Static):
         else:
             self.opponent_block.add_row("", "", "",  "")
 
-    @event("core.msdp")
+    @event("core.msdp.*")
     def update_combat_values(self, msg: MSDPMessage):
         if msg.subtype == "POSITION":
             self.combat_top.c_position = msg.value
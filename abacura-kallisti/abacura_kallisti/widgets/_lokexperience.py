@@ -64,7 +64,7 @@ class LOKExperience(Static):
         if not self.c_level:
             self.display = False
 
-    @event("core.msdp")
+    @event("core.msdp.*")
     def update_reactives(self, message: MSDPMessage):
         """Update reactive values for this widget"""
         
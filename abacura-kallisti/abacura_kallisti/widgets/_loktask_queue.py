@@ -28,7 +28,7 @@ class LOKTaskQueue(Static):
         self.queue_display.add_column("Duration", key="duration")
         self.queue_display.add_column("Queue", key="queue")
 
-    @event("core.msdp", priority=1)
+    @event("core.msdp.*", priority=1)
     def update_mud_queue(self, message: MSDPMessage):
         if message.subtype == "QUEUE":
             self.queue_title.update(f"Task Queue [{message.value}]")